@@ -1,5 +1,6 @@
 import React from "react";
 import { Link } from "react-router-dom";
+import { posterImageProps } from "@/lib/utils";
 
 export default function MovieList({ movies, loading, error }) {
   if (loading) {
@@ -31,7 +32,11 @@ export default function MovieList({ movies, loading, error }) {
             <div className="h-64 bg-gray-200 overflow-hidden">
               {movie.poster_url ? (
                 <img
-                  src={`http://localhost:8000${movie.poster_url}`}
+                  {...posterImageProps(
+                    movie,
+                    "(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+                  )}
+                  loading="lazy"
                   alt={movie.title}
                   className="w-full h-full object-cover"
                 />
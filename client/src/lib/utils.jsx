@@ -4,3 +4,52 @@ import { twMerge } from "tailwind-merge";
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+/**
+ * Decode a base64 seat map into the set of taken seat IDs.
+ * Seats are numbered row-major; bit i (lowest bit first within each byte)
+ * is set when seat i is taken.
+ * @param {string} seatMap - Base64 encoded seat map bitmap
+ * @param {Array<string>} rows - Row labels of the seat layout
+ * @param {number} seatsPerRow - Number of seats in each row
+ * @returns {Set<string>} Taken seat IDs (e.g. "A1", "B5")
+ */
+export function decodeSeatMap(seatMap, rows, seatsPerRow) {
+  const taken = new Set();
+  if (!seatMap) return taken;
+
+  const bytes = atob(seatMap);
+  for (let i = 0; i < bytes.length; i++) {
+    let byte = bytes.charCodeAt(i);
+    while (byte) {
+      const index = i * 8 + (31 - Math.clz32(byte & -byte));
+      const row = rows[Math.floor(index / seatsPerRow)];
+      if (row) taken.add(`${row}${(index % seatsPerRow) + 1}`);
+      byte &= byte - 1;
+    }
+  }
+  return taken;
+}
+
+const MEDIA_HOST = "http://localhost:8000";
+
+/**
+ * Image attributes for a movie poster: the resized WebP variants as a srcset,
+ * falling back to the original upload when the movie has none.
+ * @param {Object} movie - Movie with poster_url and poster_variants
+ * @param {string} sizes - Rendered width of the image, as an img sizes attribute
+ * @returns {Object} src, srcSet and sizes props for an img element
+ */
+export function posterImageProps(movie, sizes) {
+  const variants = Object.entries(movie.poster_variants || {});
+  if (!variants.length) {
+    return { src: `${MEDIA_HOST}${movie.poster_url}` };
+  }
+  return {
+    src: `${MEDIA_HOST}${variants[variants.length - 1][1]}`,
+    srcSet: variants
+      .map(([width, url]) => `${MEDIA_HOST}${url} ${width}w`)
+      .join(", "),
+    sizes,
+  };
+}
@@ -61,6 +61,12 @@ export default function BookingConfirmation() {
         amount_paid: selectedSeats.length * 190, // ₹190 per ticket
       };
 
+      // Convert the seat hold taken on the seat selection page, if any
+      const storedHold = sessionStorage.getItem("seatHold");
+      if (storedHold) {
+        bookingData.hold = JSON.parse(storedHold).token;
+      }
+
       // Send booking request
       const response = await createBooking(bookingData);
 
@@ -74,6 +80,7 @@ export default function BookingConfirmation() {
       setTimeout(() => {
         sessionStorage.removeItem("selectedSeats");
         sessionStorage.removeItem("showtime");
+        sessionStorage.removeItem("seatHold");
         navigate("/booking-history");
       }, 3000);
     } catch (err) {
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from "react";
-import { getUserBookings } from "@/services/api";
+import { cancelBooking, getUserBookings } from "@/services/api";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
@@ -13,6 +13,7 @@ export default function BookingHistory() {
   const [error, setError] = useState(null);
   const [userEmail, setUserEmail] = useState("");
   const [searchSubmitted, setSearchSubmitted] = useState(false);
+  const [cancellingId, setCancellingId] = useState(null);
 
   useEffect(() => {
     // Check if user email is stored in local storage
@@ -44,6 +45,26 @@ export default function BookingHistory() {
     }
   };
 
+  const handleCancel = async (booking) => {
+    if (!window.confirm("Cancel this booking? Your seats will be released.")) {
+      return;
+    }
+    setCancellingId(booking.id);
+    setError(null);
+    try {
+      const cancelled = await cancelBooking(booking.id, booking.user_email);
+      setBookings((prev) =>
+        prev.map((b) =>
+          b.id === cancelled.id ? { ...b, status: cancelled.status } : b
+        )
+      );
+    } catch (err) {
+      setError(err.message || "Failed to cancel booking");
+    } finally {
+      setCancellingId(null);
+    }
+  };
+
   const handleInputChange = (e) => {
     setUserEmail(e.target.value);
   };
@@ -172,6 +193,24 @@ export default function BookingHistory() {
                             </p>
                           </div>
                         </div>
+                        <div className="flex justify-end items-center gap-4 mt-4">
+                          {booking.status === "confirmed" ? (
+                            <Button
+                              variant="outline"
+                              size="sm"
+                              onClick={() => handleCancel(booking)}
+                              disabled={cancellingId === booking.id}
+                            >
+                              {cancellingId === booking.id
+                                ? "Cancelling..."
+                                : "Cancel Booking"}
+                            </Button>
+                          ) : (
+                            <span className="text-sm font-medium text-red-500 capitalize">
+                              {booking.status}
+                            </span>
+                          )}
+                        </div>
                       </div>
                     </div>
                   ))}
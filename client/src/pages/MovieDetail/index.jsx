@@ -1,15 +1,19 @@
 import React, { useEffect, useState } from "react";
 import { useParams, Link, useNavigate } from "react-router-dom";
-import { getMovieById, getShowtimes } from "@/services/api";
+import { posterImageProps } from "@/lib/utils";
+import { getMovieById, getUpcomingSchedule, showtimesOn } from "@/services/api";
 import { Button } from "@/components/ui/button";
 import { motion } from "framer-motion";
 import { format } from "date-fns";
 
+// Days of showtimes offered, starting today
+const DAYS = 7;
+
 export default function MovieDetail() {
   const { movieId } = useParams();
   const navigate = useNavigate();
   const [movie, setMovie] = useState(null);
-  const [showtimes, setShowtimes] = useState([]);
+  const [schedule, setSchedule] = useState([]);
   const [selectedDate, setSelectedDate] = useState(
     format(new Date(), "yyyy-MM-dd")
   );
@@ -31,13 +35,12 @@ export default function MovieDetail() {
     fetchMovieDetails();
   }, [movieId]);
 
+  // Every date's showtimes in one request; switching dates needs no further requests
   useEffect(() => {
     const fetchShowtimes = async () => {
       if (movie) {
         try {
-          const response = await getShowtimes(movieId, selectedDate);
-          // Update to handle the new response format with results array
-          setShowtimes(response.results || []);
+          setSchedule(await getUpcomingSchedule({ days: DAYS, movie: movieId }));
         } catch (err) {
           console.error("Failed to fetch showtimes:", err);
         }
@@ -45,7 +48,9 @@ export default function MovieDetail() {
     };
 
     fetchShowtimes();
-  }, [movieId, selectedDate, movie]);
+  }, [movieId, movie]);
+
+  const showtimes = showtimesOn(schedule, selectedDate);
 
   const handleShowtimeSelect = (showtimeId) => {
     navigate(`/seat-selection/${showtimeId}`);
@@ -56,7 +61,7 @@ export default function MovieDetail() {
     const dates = [];
     const today = new Date();
 
-    for (let i = 0; i < 7; i++) {
+    for (let i = 0; i < DAYS; i++) {
       const date = new Date(today);
       date.setDate(today.getDate() + i);
       dates.push({
@@ -145,7 +150,10 @@ export default function MovieDetail() {
               <div className="relative h-full">
                 <div className="absolute inset-0 bg-gradient-to-t from-black/60 to-transparent z-10"></div>
                 <img
-                  src={`http://localhost:8000${movie.poster_url}`}
+                  {...posterImageProps(
+                    movie,
+                    "(min-width: 1024px) 33vw, (min-width: 768px) 40vw, 100vw"
+                  )}
                   alt={movie.title}
                   className="w-full h-full object-cover"
                 />
@@ -54,7 +54,7 @@ export default function Movies() {
       const fetchMovies = async () => {
         setLoading(true);
         try {
-          const data = await getAllMovies(filters);
+          const data = await getAllMovies({ ...filters, approximateCount: true });
 
           // Check if response has pagination structure
           if (data.results) {
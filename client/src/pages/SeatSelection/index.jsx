@@ -1,9 +1,15 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useMemo } from "react";
 import { useParams, useNavigate, Link } from "react-router-dom";
-import { getShowtimeDetails } from "@/services/api";
+import {
+  getShowtimeDetails,
+  holdSeats,
+  holdBestSeats,
+  subscribeToSeatEvents,
+} from "@/services/api";
 import { Button } from "@/components/ui/button";
 import { motion } from "framer-motion";
 import { format } from "date-fns";
+import { decodeSeatMap, posterImageProps } from "@/lib/utils";
 
 export default function SeatSelection() {
   const { showtimeId } = useParams();
@@ -12,6 +18,9 @@ export default function SeatSelection() {
   const [selectedSeats, setSelectedSeats] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [holdError, setHoldError] = useState(null);
+  const [isHolding, setIsHolding] = useState(false);
+  const [partySize, setPartySize] = useState(2);
 
   useEffect(() => {
     const fetchShowtimeDetails = async () => {
@@ -28,8 +37,46 @@ export default function SeatSelection() {
     fetchShowtimeDetails();
   }, [showtimeId]);
 
+  // Keep the seat map live: apply seat deltas pushed by the server
+  useEffect(() => {
+    const close = subscribeToSeatEvents(showtimeId, {
+      onSnapshot: ({ version, seat_map }) => {
+        setShowtime((prev) => prev && { ...prev, version, seat_map });
+      },
+      onSeats: ({ version, booked, held, released }) => {
+        setShowtime((prev) => {
+          if (!prev || (prev.version && version <= prev.version)) return prev;
+          const taken = decodeSeatMap(
+            prev.seat_map,
+            prev.seat_layout.rows.split(","),
+            prev.seat_layout.seats_per_row
+          );
+          if (!prev.seat_map) prev.booked_seats.forEach((id) => taken.add(id));
+          released.forEach((id) => taken.delete(id));
+          [...booked, ...held].forEach((id) => taken.add(id));
+          return { ...prev, version, seat_map: null, booked_seats: [...taken] };
+        });
+        // Drop seats someone else just took from the current selection
+        const taken = new Set([...booked, ...held]);
+        setSelectedSeats((prev) => prev.filter((id) => !taken.has(id)));
+      },
+    });
+    return close;
+  }, [showtimeId]);
+
+  // Taken seats as a Set, decoded from the compact seat map when available
+  const bookedSeats = useMemo(() => {
+    if (!showtime?.seat_layout) return new Set();
+    if (!showtime.seat_map) return new Set(showtime.booked_seats);
+    return decodeSeatMap(
+      showtime.seat_map,
+      showtime.seat_layout.rows.split(","),
+      showtime.seat_layout.seats_per_row
+    );
+  }, [showtime]);
+
   const handleSeatClick = (seatId) => {
-    if (showtime.booked_seats.includes(seatId)) return; // Can't select booked seats
+    if (bookedSeats.has(seatId)) return; // Can't select booked seats
 
     const isSelected = selectedSeats.includes(seatId);
 
@@ -41,7 +88,7 @@ export default function SeatSelection() {
   };
 
   const getSeatStatus = (seatId) => {
-    if (showtime.booked_seats.includes(seatId)) {
+    if (bookedSeats.has(seatId)) {
       return "booked";
     }
 
@@ -52,14 +99,34 @@ export default function SeatSelection() {
     return "available";
   };
 
+  const proceedWithHold = async (requestHold) => {
+    setIsHolding(true);
+    setHoldError(null);
+
+    try {
+      // Hold the seats so nobody else can take them during checkout
+      const hold = await requestHold();
+
+      // Store selected seats, showtime and hold in session storage for the booking confirmation page
+      sessionStorage.setItem("selectedSeats", JSON.stringify(hold.seats));
+      sessionStorage.setItem("showtime", JSON.stringify(showtime));
+      sessionStorage.setItem("seatHold", JSON.stringify(hold));
+
+      navigate("/booking-confirmation");
+    } catch (err) {
+      setHoldError(err.message || "Failed to hold seats");
+      setIsHolding(false);
+    }
+  };
+
   const handleProceedToBooking = () => {
     if (selectedSeats.length === 0) return;
+    proceedWithHold(() => holdSeats(showtime.id, selectedSeats));
+  };
 
-    // Store selected seats and showtime in session storage for the booking confirmation page
-    sessionStorage.setItem("selectedSeats", JSON.stringify(selectedSeats));
-    sessionStorage.setItem("showtime", JSON.stringify(showtime));
-
-    navigate("/booking-confirmation");
+  // The server picks the best free block, so busy shows don't end in seat races
+  const handleBestAvailable = () => {
+    proceedWithHold(() => holdBestSeats(showtime.id, partySize));
   };
 
   // Format movie duration to hours and minutes
@@ -153,7 +220,10 @@ export default function SeatSelection() {
               {/* Movie Poster */}
               <div className="w-full md:w-1/4 flex-shrink-0">
                 <img
-                  src={`http://localhost:8000${showtime.movie.poster_url}`}
+                  {...posterImageProps(
+                    showtime.movie,
+                    "(min-width: 768px) 25vw, 100vw"
+                  )}
                   alt={showtime.movie.title}
                   className="w-full h-auto rounded-lg shadow-md object-cover"
                 />
@@ -306,6 +376,36 @@ export default function SeatSelection() {
               ))}
             </div>
 
+            {/* Best Available */}
+            <div className="flex justify-center items-center gap-3 mb-8">
+              <span className="text-sm text-slate-600">
+                Or let us pick the best
+              </span>
+              <select
+                value={partySize}
+                onChange={(e) => setPartySize(Number(e.target.value))}
+                className="border border-slate-300 rounded-md px-2 py-1 text-sm"
+              >
+                {Array.from(
+                  { length: Math.min(10, seatsPerRow) },
+                  (_, i) => i + 1
+                ).map((n) => (
+                  <option key={n} value={n}>
+                    {n}
+                  </option>
+                ))}
+              </select>
+              <span className="text-sm text-slate-600">seats together</span>
+              <Button
+                variant="outline"
+                size="sm"
+                onClick={handleBestAvailable}
+                disabled={isHolding}
+              >
+                Pick for me
+              </Button>
+            </div>
+
             {/* Seat Legend */}
             <div className="flex justify-center gap-6 mb-8">
               <div className="flex items-center gap-2">
@@ -350,12 +450,16 @@ export default function SeatSelection() {
               </div>
             </div>
 
+            {holdError && (
+              <p className="text-red-500 text-sm mb-4">{holdError}</p>
+            )}
+
             <Button
               onClick={handleProceedToBooking}
-              disabled={selectedSeats.length === 0}
+              disabled={selectedSeats.length === 0 || isHolding}
               className="w-full"
             >
-              Proceed to Payment
+              {isHolding ? "Holding seats..." : "Proceed to Payment"}
             </Button>
           </div>
         </div>
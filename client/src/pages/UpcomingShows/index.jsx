@@ -1,24 +1,29 @@
 import React, { useState, useEffect } from "react";
-import { getUpcomingShowtimes } from "@/services/api";
+import { getUpcomingSchedule, showtimesOn } from "@/services/api";
 import { Link } from "react-router-dom";
+import { posterImageProps } from "@/lib/utils";
 import { motion } from "framer-motion";
 import { format, addDays } from "date-fns";
 import { Button } from "@/components/ui/button";
 
+// Days of showtimes offered, starting today
+const DAYS = 14;
+
 export default function UpcomingShows() {
-  const [showtimes, setShowtimes] = useState([]);
+  const [schedule, setSchedule] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [selectedDate, setSelectedDate] = useState(
     format(new Date(), "yyyy-MM-dd")
   );
 
+  // One request covers every date; switching dates needs no further requests
   useEffect(() => {
     const fetchUpcomingShowtimes = async () => {
       setLoading(true);
       try {
-        const data = await getUpcomingShowtimes({ date: selectedDate });
-        setShowtimes(data);
+        const data = await getUpcomingSchedule({ days: DAYS });
+        setSchedule(data);
         setLoading(false);
       } catch (err) {
         setError(err.message || "Failed to fetch upcoming showtimes");
@@ -27,14 +32,16 @@ export default function UpcomingShows() {
     };
 
     fetchUpcomingShowtimes();
-  }, [selectedDate]);
+  }, []);
+
+  const showtimes = showtimesOn(schedule, selectedDate);
 
   // Generate dates for the next 14 days
   const getDates = () => {
     const dates = [];
     const today = new Date();
 
-    for (let i = 0; i < 14; i++) {
+    for (let i = 0; i < DAYS; i++) {
       const date = addDays(today, i);
       dates.push({
         date: format(date, "yyyy-MM-dd"),
@@ -112,7 +119,11 @@ export default function UpcomingShows() {
                   {showtime.movie.poster_url ? (
                     <div className="relative h-full">
                       <img
-                        src={`http://localhost:8000${showtime.movie.poster_url}`}
+                        {...posterImageProps(
+                          showtime.movie,
+                          "(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+                        )}
+                        loading="lazy"
                         alt={showtime.movie.title}
                         className="w-full h-full object-cover"
                       />
@@ -230,16 +241,37 @@ export default function UpcomingShows() {
                       </svg>
                       <span>{showtime.screen}</span>
                     </div>
+                    {showtime.capacity > 0 && (
+                      <div
+                        className={`text-sm font-medium ${
+                          showtime.is_sold_out
+                            ? "text-red-500"
+                            : showtime.seats_left <= 10
+                            ? "text-amber-600"
+                            : "text-emerald-600"
+                        }`}
+                      >
+                        {showtime.is_sold_out
+                          ? "Sold out"
+                          : `${showtime.seats_left} seats left`}
+                      </div>
+                    )}
                   </div>
                 </div>
 
                 <div className="p-4 pt-0">
                   <div className="flex gap-4">
-                    <Button asChild className="w-full">
-                      <Link to={`/seat-selection/${showtime.id}`}>
-                        Book Tickets
-                      </Link>
-                    </Button>
+                    {showtime.is_sold_out ? (
+                      <Button disabled className="w-full">
+                        Sold Out
+                      </Button>
+                    ) : (
+                      <Button asChild className="w-full">
+                        <Link to={`/seat-selection/${showtime.id}`}>
+                          Book Tickets
+                        </Link>
+                      </Button>
+                    )}
                     <Button variant="outline" asChild className="w-full">
                       <Link to={`/movies/${showtime.movie.id}`}>
                         View Details
@@ -16,6 +16,7 @@ const api = axios.create({
  * @param {string} filters.genre - Filter by genre
  * @param {string} filters.release_date - Filter by release date
  * @param {number} filters.page - Page number for pagination
+ * @param {boolean} filters.approximateCount - Let the server estimate large totals instead of counting every row
  * @returns {Promise<Object>} List of movies with pagination data
  */
 export const getAllMovies = async (filters = {}) => {
@@ -46,6 +47,10 @@ export const getAllMovies = async (filters = {}) => {
       params.append("ordering", filters.ordering);
     }
 
+    if (filters.approximateCount) {
+      params.append("count", "approximate");
+    }
+
     const response = await api.get(
       `/api/movies/${params.toString() ? `?${params.toString()}` : ""}`
     );
@@ -113,6 +118,23 @@ export const getShowtimeDetails = async (showtimeId) => {
   }
 };
 
+/**
+ * Subscribe to live seat availability changes for a showtime
+ * @param {string|number} showtimeId - The ID of the showtime
+ * @param {Object} handlers - Event callbacks
+ * @param {Function} handlers.onSnapshot - Called with { version, seat_map } on (re)connect
+ * @param {Function} handlers.onSeats - Called with { version, booked, held, released } deltas
+ * @returns {Function} Call to close the subscription
+ */
+export const subscribeToSeatEvents = (showtimeId, { onSnapshot, onSeats }) => {
+  const source = new EventSource(
+    `${BACKEND_BASE_URL}/api/movies/showtimes/${showtimeId}/events/`
+  );
+  source.addEventListener("snapshot", (e) => onSnapshot(JSON.parse(e.data)));
+  source.addEventListener("seats", (e) => onSeats(JSON.parse(e.data)));
+  return () => source.close();
+};
+
 /**
  * Create a new booking
  * @param {Object} bookingData - The booking data
@@ -121,6 +143,7 @@ export const getShowtimeDetails = async (showtimeId) => {
  * @param {number} bookingData.showtime - Showtime ID
  * @param {Array<string>} bookingData.seats - Array of seat IDs (e.g. ["A1", "B5"])
  * @param {number} bookingData.amount_paid - Amount paid
+ * @param {string} [bookingData.hold] - Seat hold token from holdSeats
  * @returns {Promise<Object>} Created booking
  */
 export const createBooking = async (bookingData) => {
@@ -131,7 +154,88 @@ export const createBooking = async (bookingData) => {
     );
     return response.data;
   } catch (error) {
-    const message = error.response?.data?.detail || "Failed to create booking";
+    const data = error.response?.data;
+    const message =
+      data?.detail ||
+      data?.hold?.[0] ||
+      data?.seats?.[0] ||
+      "Failed to create booking";
+    throw new Error(message);
+  }
+};
+
+/**
+ * Cancel a booking and release its seats
+ * @param {string|number} bookingId - The ID of the booking
+ * @param {string} userEmail - Email the booking was made with
+ * @returns {Promise<Object>} The cancelled booking
+ */
+export const cancelBooking = async (bookingId, userEmail) => {
+  try {
+    const response = await api.post(
+      `/api/movies/bookings/${bookingId}/cancel/`,
+      { user_email: userEmail, refund: true }
+    );
+    return response.data;
+  } catch (error) {
+    const message =
+      error.response?.data?.detail || "Failed to cancel booking";
+    throw new Error(message);
+  }
+};
+
+/**
+ * Hold seats for a showtime while the user completes checkout
+ * @param {string|number} showtimeId - The ID of the showtime
+ * @param {Array<string>} seats - Array of seat IDs (e.g. ["A1", "B5"])
+ * @returns {Promise<Object>} Seat hold with its token and expires_at
+ */
+export const holdSeats = async (showtimeId, seats) => {
+  try {
+    const response = await api.post(
+      `/api/movies/showtimes/${showtimeId}/holds/`,
+      { seats }
+    );
+    return response.data;
+  } catch (error) {
+    const data = error.response?.data;
+    const message =
+      data?.detail || data?.seats?.[0] || "Failed to hold seats";
+    throw new Error(message);
+  }
+};
+
+/**
+ * Let the server pick and hold the best block of adjacent free seats
+ * @param {string|number} showtimeId - The ID of the showtime
+ * @param {number} count - Number of seats together
+ * @returns {Promise<Object>} Seat hold with the chosen seats, its token and expires_at
+ */
+export const holdBestSeats = async (showtimeId, count) => {
+  try {
+    const response = await api.post(
+      `/api/movies/showtimes/${showtimeId}/holds/`,
+      { count }
+    );
+    return response.data;
+  } catch (error) {
+    const data = error.response?.data;
+    const message =
+      data?.detail || data?.seats?.[0] || "Failed to find seats";
+    throw new Error(message);
+  }
+};
+
+/**
+ * Release a seat hold before it expires
+ * @param {string} token - The seat hold token
+ * @returns {Promise<void>}
+ */
+export const releaseHold = async (token) => {
+  try {
+    await api.delete(`/api/movies/holds/${token}/`);
+  } catch (error) {
+    const message = error.response?.data?.detail || "Failed to release seats";
     throw new Error(message);
   }
 };
@@ -161,7 +265,8 @@ export const getUserBookings = async (userEmail) => {
  * Get all upcoming showtimes
  * @param {Object} filters - Optional filters
  * @param {string} filters.date - Optional date filter (YYYY-MM-DD)
- * @returns {Promise<Array>} List of upcoming showtimes with movie details
+ * @param {number} filters.availableMin - Only shows with at least this many seats left
+ * @returns {Promise<Array>} List of upcoming showtimes with movie details and seats left
  */
 export const getUpcomingShowtimes = async (filters = {}) => {
   try {
@@ -172,6 +277,10 @@ export const getUpcomingShowtimes = async (filters = {}) => {
       params.append("date", filters.date);
     }
 
+    if (filters.availableMin) {
+      params.append("available_min", filters.availableMin);
+    }
+
     // Request movie details to be included in response
     params.append("movieDetails", "true");
 
@@ -193,4 +302,51 @@ export const getUpcomingShowtimes = async (filters = {}) => {
   }
 };
 
+/**
+ * Get every showtime of the next days grouped by movie and date, in one request
+ * @param {Object} filters - Optional filters
+ * @param {number} filters.days - How many days from today (default 14)
+ * @param {string|number} filters.movie - Only this movie's showtimes
+ * @returns {Promise<Array>} Movies, each with dates and each date with its
+ * showtimes ({ id, time, screen, capacity, seats_left, is_sold_out })
+ */
+export const getUpcomingSchedule = async (filters = {}) => {
+  try {
+    const params = new URLSearchParams();
+
+    if (filters.days) {
+      params.append("days", filters.days);
+    }
+
+    if (filters.movie) {
+      params.append("movie", filters.movie);
+    }
+
+    const response = await api.get(
+      `/api/movies/showtimes/upcoming/?${params.toString()}`
+    );
+    return response.data.movies;
+  } catch (error) {
+    const message =
+      error.response?.data?.detail || "Failed to fetch upcoming showtimes";
+    throw new Error(message);
+  }
+};
+
+/**
+ * The showtimes of a grouped schedule on one date, in time order, each with
+ * its date and movie
+ * @param {Array} movies - As returned by getUpcomingSchedule
+ * @param {string} date - YYYY-MM-DD
+ * @returns {Array} Showtimes
+ */
+export const showtimesOn = (movies, date) =>
+  movies
+    .flatMap((movie) =>
+      (movie.dates.find((day) => day.date === date)?.showtimes || []).map(
+        (showtime) => ({ ...showtime, date, movie })
+      )
+    )
+    .sort((a, b) => a.time.localeCompare(b.time));
+
 export { api };
@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import Movie, SeatLayout, Showtime, Booking
+from django.contrib import admin, messages
+from .booking import BookingStatusError, cancel_booking, cancel_showtime
+from .models import Movie, SeatLayout, Showtime, Booking, SeatHold, SeatReservation, MovieDailySales, ScreenDailySales
 
 @admin.register(Movie)
 class MovieAdmin(admin.ModelAdmin):
@@ -13,16 +14,73 @@ class SeatLayoutAdmin(admin.ModelAdmin):
 
 @admin.register(Showtime)
 class ShowtimeAdmin(admin.ModelAdmin):
-    list_display = ('movie', 'date', 'time', 'screen', 'seat_layout')
-    list_filter = ('date', 'movie', 'seat_layout')
+    list_display = ('movie', 'date', 'time', 'screen', 'seat_layout', 'booked_count', 'capacity', 'is_cancelled')
+    list_select_related = ('movie', 'seat_layout')
+    list_filter = ('date', 'movie', 'seat_layout', 'is_cancelled')
     search_fields = ('movie__title',)
+    actions = ['cancel_and_refund']
+
+    @admin.action(description='Cancel selected showtimes and refund their bookings')
+    def cancel_and_refund(self, request, queryset):
+        cancelled = sum(cancel_showtime(pk) for pk in queryset.values_list('pk', flat=True))
+        self.message_user(request, f'Cancelled and refunded {cancelled} bookings')
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
-    list_display = ('user_name', 'user_email', 'showtime', 'booking_time', 'amount_paid', 'display_seats')
-    list_filter = ('booking_time',)
+    list_display = ('user_name', 'user_email', 'showtime', 'booking_time', 'amount_paid', 'display_seats', 'status')
+    list_select_related = ('showtime__movie',)
+    list_filter = ('booking_time', 'status')
     search_fields = ('user_name', 'user_email', 'showtime__movie__title')
+    actions = ['cancel', 'cancel_and_refund']
+    
+    def cancel_bookings(self, request, queryset, refund):
+        done = 0
+        for pk in queryset.values_list('pk', flat=True):
+            try:
+                cancel_booking(pk, refund=refund)
+                done += 1
+            except BookingStatusError as e:
+                self.message_user(request, str(e), messages.WARNING)
+        self.message_user(request, f"{'Refunded' if refund else 'Cancelled'} {done} bookings")
+    
+    @admin.action(description='Cancel selected bookings and release their seats')
+    def cancel(self, request, queryset):
+        self.cancel_bookings(request, queryset, refund=False)
+    
+    @admin.action(description='Cancel and refund selected bookings')
+    def cancel_and_refund(self, request, queryset):
+        self.cancel_bookings(request, queryset, refund=True)
     
     def display_seats(self, obj):
         return ", ".join(obj.seats)
     display_seats.short_description = 'Seats'
+
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    list_display = ('token', 'showtime', 'user_email', 'created_at', 'expires_at')
+    list_select_related = ('showtime__movie',)
+    list_filter = ('expires_at',)
+    search_fields = ('user_email', 'showtime__movie__title')
+    raw_id_fields = ('showtime',)
+
+@admin.register(SeatReservation)
+class SeatReservationAdmin(admin.ModelAdmin):
+    list_display = ('seat_id', 'showtime', 'booking', 'state')
+    list_select_related = ('showtime__movie', 'booking__showtime__movie')
+    list_filter = ('state',)
+    search_fields = ('seat_id', 'showtime__movie__title', 'booking__user_email')
+    raw_id_fields = ('showtime', 'booking', 'hold')
+
+@admin.register(MovieDailySales)
+class MovieDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('date', 'movie', 'showtimes', 'tickets_sold', 'capacity', 'revenue')
+    list_select_related = ('movie',)
+    list_filter = ('date',)
+    search_fields = ('movie__title',)
+    readonly_fields = ('date', 'movie', 'showtimes', 'capacity', 'tickets_sold', 'revenue')
+
+@admin.register(ScreenDailySales)
+class ScreenDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('date', 'screen', 'showtimes', 'tickets_sold', 'capacity', 'revenue')
+    list_filter = ('date', 'screen')
+    readonly_fields = ('date', 'screen', 'showtimes', 'capacity', 'tickets_sold', 'revenue')
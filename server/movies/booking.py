@@ -0,0 +1,597 @@
+"""
+Seat booking engine.
+
+Reserves seats for a showtime in a single transaction so that concurrent
+bookings can never sell the same seat twice. Every seat taken is a
+``SeatReservation`` row and the unique (showtime, seat_id) constraint is the
+final arbiter: a seat that is already taken makes the insert fail.
+
+Writers to the same showtime are serialised on the showtime row. PostgreSQL
+locks it with ``select_for_update``; SQLite has no row locks, so the version
+bump is issued as the first statement to take the database write lock up
+front, and lock timeouts are retried. Under that lock the showtime's seat map
+bitmap is checked first, so most conflicts are caught with one bitwise AND,
+and is updated in the same transaction as the reservation rows.
+
+A booking therefore costs a fixed handful of statements: lock (and load) the
+showtime with its layout, insert the booking, insert its reservation rows in
+one batch and save the showtime.
+
+Seats can also be held for a few minutes during checkout. Held seats are
+reservations too, so they are unavailable to everyone else until the hold is
+booked, released or expires. Expired holds are released lazily whenever the
+showtime is next locked (or read, see ``ShowtimeDetailAPIView``) and by the
+``expire_seat_holds`` management command.
+
+Group orders book seats on several showtimes at once (``book_batch``). The
+showtimes are locked together in ascending id order, so two batches can never
+wait on each other's locks, and every booking and seat of the batch is written
+with bulk inserts in one transaction: all of it commits or none of it does.
+
+Cancelling a booking releases its seats the same way. Cancelling a whole
+showtime cancels all of its bookings with set-based statements, whatever
+their number, and stops it taking new ones.
+
+Bookings and cancellations also update the sales rollups (see ``sales.py``)
+in the same transaction.
+
+Every change publishes a seat delta to live subscribers once its transaction
+commits (see ``realtime.py``) and invalidates the cached upcoming showtimes
+listing (see ``upcoming.py``); rolled back attempts do neither.
+"""
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Case, Count, F, Min, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_schedule_version
+from .models import Booking, SeatLayout, Showtime, SeatHold, SeatReservation
+from .realtime import publish_seat_event
+from .sales import record_sales, refresh_daily_sales, refresh_days
+from .seatmap import InvalidSeatError
+
+# How many times a reservation is retried when the database is locked
+MAX_ATTEMPTS = 25
+# Upper bound (in seconds) for the randomised backoff between attempts
+MAX_BACKOFF = 0.05
+# Showtime fields written back after every locked operation
+LOCKED_FIELDS = [
+    'seat_map', 'version', 'holds_expire_at', 'capacity', 'booked_count', 'is_sold_out', 'tickets_sold', 'revenue',
+]
+
+
+class SeatUnavailableError(Exception):
+    """Raised when one or more of the requested seats are already booked"""
+
+    def __init__(self, seats):
+        self.seats = list(seats)
+        super().__init__(f"Seats already booked: {', '.join(self.seats)}")
+
+
+class BookingConflictError(Exception):
+    """Raised when a reservation keeps losing the race to other bookings"""
+
+
+class HoldExpiredError(Exception):
+    """Raised when a seat hold does not exist (any more) or does not match the booking"""
+
+
+class ShowtimeCancelledError(Exception):
+    """Raised when booking or holding seats on a cancelled showtime"""
+
+
+class BookingStatusError(Exception):
+    """Raised when a booking cannot move to the requested status, e.g. cancelling it twice"""
+
+
+class NoSeatsTogetherError(Exception):
+    """Raised when best-available allocation finds no block of enough adjacent free seats"""
+
+    def __init__(self, count):
+        self.count = count
+        super().__init__(f"No {count} adjacent seats are available")
+
+
+class BatchBookingError(Exception):
+    """Raised when items of a batch cannot be booked; nothing in the batch was booked"""
+
+    def __init__(self, errors):
+        # {item index: Showtime.DoesNotExist, InvalidSeatError or SeatUnavailableError}
+        self.errors = errors
+        super().__init__(f"{len(errors)} batch item(s) could not be booked")
+
+
+def run_locked(showtime_id, operation):
+    """
+    Run ``operation(showtime)`` in a transaction holding the showtime's write
+    lock and return its result.
+
+    Expired holds are released before the operation runs, and the showtime's
+    seat map, version, hold expiry and occupancy counters are saved after it. The whole
+    transaction is retried when SQLite reports the database as locked.
+    """
+    def locked():
+        showtime = _lock_showtime(showtime_id)
+        release_expired_holds(showtime)
+        result = operation(showtime)
+        showtime.update_occupancy()
+        showtime.save(update_fields=LOCKED_FIELDS)
+        return result
+
+    return _retry_locked(locked, f"showtime {showtime_id}")
+
+
+def run_locked_many(showtime_ids, operation):
+    """
+    Like run_locked, for several showtimes in one transaction.
+
+    ``operation(showtimes)`` gets a dict of the locked showtimes by id; ids
+    that do not exist are missing from it. The locks are taken in ascending
+    id order and the showtimes are saved with one bulk update.
+    """
+    def locked():
+        showtimes = _lock_showtimes(showtime_ids)
+        for showtime in showtimes.values():
+            release_expired_holds(showtime)
+        result = operation(showtimes)
+        for showtime in showtimes.values():
+            showtime.update_occupancy()
+        Showtime.objects.bulk_update(list(showtimes.values()), LOCKED_FIELDS)
+        return result
+
+    return _retry_locked(locked, f"showtimes {', '.join(map(str, sorted(set(showtime_ids))))}")
+
+
+def refresh_locked_fields(showtime):
+    """
+    Take a showtime's write lock and reload the fields the engine owns into
+    it, so that a full save() of an instance read earlier cannot undo
+    bookings, holds or a cancellation. Call inside a transaction. Returns
+    the locked copy of the showtime, or None if it no longer exists.
+    """
+    try:
+        locked = _lock_showtime(showtime.pk)
+    except Showtime.DoesNotExist:
+        return None  # Deleted meanwhile; save() inserts it afresh
+    for name in [*LOCKED_FIELDS, 'is_cancelled']:
+        setattr(showtime, name, getattr(locked, name))
+    return locked
+
+
+def _retry_locked(locked, description):
+    """Run locked() in a transaction, retrying while SQLite reports the database as locked"""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return locked()
+        except OperationalError as e:
+            # SQLite reports write contention as "database is locked"; that is
+            # retryable unless we are nested inside a caller's transaction
+            if 'locked' not in str(e) or transaction.get_connection().in_atomic_block:
+                raise
+        time.sleep(random.uniform(0, min(MAX_BACKOFF, 0.002 * 2 ** attempt)))
+    raise BookingConflictError(f"Could not lock {description} after {MAX_ATTEMPTS} attempts")
+
+
+def reserve_seats(showtime_id, seat_ids, create_booking=None):
+    """
+    Atomically reserve ``seat_ids`` on a showtime.
+
+    ``create_booking(showtime)`` runs inside the same transaction before the
+    seats are inserted and returns the Booking the reservations belong to, so
+    the booking and its seats commit or roll back together. Returns the
+    updated showtime. Raises InvalidSeatError for seats outside the layout and
+    SeatUnavailableError for seats that are already taken.
+    """
+    seat_ids = list(dict.fromkeys(seat_ids))
+
+    def reserve(showtime):
+        mask = _check_seat_map(showtime, seat_ids)
+        booking = create_booking(showtime) if create_booking else None
+        _insert_reservations(showtime, seat_ids, booking=booking)
+        _take_seats(showtime, mask)
+        if booking:
+            record_sales([(showtime, len(seat_ids), booking.amount_paid)])
+        _publish(showtime, booked=seat_ids)
+        return showtime
+
+    try:
+        return run_locked(showtime_id, reserve)
+    except IntegrityError:
+        _raise_if_taken(showtime_id, seat_ids)
+        raise
+
+
+def book_batch(bookings):
+    """
+    Book a group order: a list of unsaved Bookings, possibly on different
+    showtimes, all in one transaction.
+
+    Every item is checked before anything is written, so a batch with
+    problems raises BatchBookingError listing each failing item and books
+    nothing. Returns the saved bookings.
+    """
+    items = [(booking, list(dict.fromkeys(booking.seats))) for booking in bookings]
+
+    def book(showtimes):
+        errors = {}
+        claimed = {}  # Seats taken by earlier items of this batch, per showtime
+        masks = {}
+        for i, (booking, seat_ids) in enumerate(items):
+            showtime = showtimes.get(booking.showtime_id)
+            if showtime is None:
+                errors[i] = Showtime.DoesNotExist(f"Showtime {booking.showtime_id} does not exist")
+                continue
+            seats = claimed.setdefault(showtime.pk, set())
+            try:
+                doubled = [seat_id for seat_id in seat_ids if seat_id in seats]
+                if doubled:
+                    raise SeatUnavailableError(doubled)
+                mask = _check_seat_map(showtime, seat_ids)
+            except (SeatUnavailableError, InvalidSeatError, ShowtimeCancelledError) as e:
+                errors[i] = e
+                continue
+            seats.update(seat_ids)
+            masks[showtime.pk] = masks.get(showtime.pk, 0) | mask
+        if errors:
+            raise BatchBookingError(errors)
+
+        for booking, _ in items:
+            booking.showtime = showtimes[booking.showtime_id]
+        Booking.objects.bulk_create([booking for booking, _ in items])
+        SeatReservation.objects.bulk_create([
+            SeatReservation(showtime=booking.showtime, seat_id=seat_id, booking=booking)
+            for booking, seat_ids in items
+            for seat_id in seat_ids
+        ])
+        for showtime_id, mask in masks.items():
+            _take_seats(showtimes[showtime_id], mask)
+        record_sales([(booking.showtime, len(seat_ids), booking.amount_paid) for booking, seat_ids in items])
+        for showtime_id, seat_ids in claimed.items():
+            _publish(showtimes[showtime_id], booked=seat_ids)
+        return [booking for booking, _ in items]
+
+    try:
+        return run_locked_many([booking.showtime_id for booking in bookings], book)
+    except IntegrityError:
+        # A stale seat map let a taken seat through; report it per item
+        taken = set(SeatReservation.objects.filter(
+            showtime_id__in=[booking.showtime_id for booking, _ in items],
+            seat_id__in={seat_id for _, seat_ids in items for seat_id in seat_ids},
+        ).values_list('showtime_id', 'seat_id'))
+        errors = {}
+        for i, (booking, seat_ids) in enumerate(items):
+            conflicts = [seat_id for seat_id in seat_ids if (booking.showtime_id, seat_id) in taken]
+            if conflicts:
+                errors[i] = SeatUnavailableError(conflicts)
+        if errors:
+            raise BatchBookingError(errors)
+        raise
+
+
+def hold_seats(showtime_id, seat_ids=None, user_email='', minutes=None, count=None):
+    """
+    Hold seat_ids on a showtime for ``minutes`` (SEAT_HOLD_MINUTES by default) and return the SeatHold.
+
+    Given count instead of seat_ids, the best available block of count
+    adjacent seats is chosen under the lock (see SeatGrid.best_seats), so
+    parties are spread over the house instead of racing for the same seats.
+    Raises NoSeatsTogetherError if there is no such block.
+    """
+    seat_ids = list(dict.fromkeys(seat_ids or []))
+    expires_at = timezone.now() + timedelta(minutes=minutes or settings.SEAT_HOLD_MINUTES)
+
+    def hold(showtime):
+        nonlocal seat_ids
+        if count:
+            seat_ids = _best_seats(showtime, count)
+        mask = _check_seat_map(showtime, seat_ids)
+        seat_hold = SeatHold.objects.create(
+            showtime=showtime, seats=seat_ids, user_email=user_email, expires_at=expires_at
+        )
+        _insert_reservations(showtime, seat_ids, hold=seat_hold, state=SeatReservation.HELD)
+        _take_seats(showtime, mask)
+        _publish(showtime, held=seat_ids)
+        if showtime.holds_expire_at is None or expires_at < showtime.holds_expire_at:
+            showtime.holds_expire_at = expires_at
+        return seat_hold
+
+    try:
+        return run_locked(showtime_id, hold)
+    except IntegrityError:
+        _raise_if_taken(showtime_id, seat_ids)
+        raise
+
+
+def book_hold(token, booking):
+    """
+    Convert a seat hold into the given (unsaved) booking.
+
+    The held seats are already reserved, so they are not checked again: the
+    booking is inserted and the hold's reservations are handed over to it.
+    Raises HoldExpiredError if the hold has lapsed or does not match.
+    """
+    def convert(showtime):
+        seat_hold = SeatHold.objects.filter(token=token, showtime=showtime).first()
+        if seat_hold is None:
+            raise HoldExpiredError("Seat hold has expired")
+        if set(seat_hold.seats) != set(booking.seats):
+            raise HoldExpiredError("Seats do not match the seat hold")
+        if booking.showtime_id not in (None, showtime.pk):
+            raise HoldExpiredError("Showtime does not match the seat hold")
+
+        # bulk_create inserts the row without going through Booking.save,
+        # which would try to reserve the (already held) seats again
+        booking.showtime = showtime
+        type(booking).objects.bulk_create([booking])
+        seat_hold.reservations.update(state=SeatReservation.BOOKED, booking=booking, hold=None)
+        seat_hold.delete()
+        record_sales([(showtime, len(seat_hold.seats), booking.amount_paid)])
+        _publish(showtime, booked=seat_hold.seats)
+        return booking
+
+    return run_locked(_hold_showtime_id(token), convert)
+
+
+def release_hold(token):
+    """Release a seat hold early; returns False if it had already expired"""
+    def release(showtime):
+        seat_hold = SeatHold.objects.filter(token=token, showtime=showtime).first()
+        if seat_hold is None:
+            return False
+        seat_ids = list(seat_hold.reservations.values_list('seat_id', flat=True))
+        _release_seats(showtime, seat_ids)
+        seat_hold.delete()
+        _publish(showtime, released=seat_ids)
+        return True
+
+    return run_locked(_hold_showtime_id(token), release)
+
+
+def cancel_booking(booking_id, refund=False):
+    """
+    Cancel a confirmed booking and release its seats, or with refund mark it
+    refunded as well. A cancelled booking can be refunded later; its seats are
+    already free by then. Returns the updated booking. Raises
+    Booking.DoesNotExist, or BookingStatusError if the booking has already
+    been cancelled (or refunded).
+    """
+    booking = Booking.objects.get(pk=booking_id)
+    status = Booking.REFUNDED if refund else Booking.CANCELLED
+    seat_ids = list(dict.fromkeys(booking.seats))
+
+    if refund and booking.status == Booking.CANCELLED:
+        # Only the status changes; the seats were released on cancellation
+        if Booking.objects.filter(pk=booking.pk, status=Booking.CANCELLED).update(status=status):
+            booking.status = status
+            return booking
+    if booking.status != Booking.CONFIRMED:
+        raise BookingStatusError(f"Booking {booking.pk} is already {booking.status}")
+
+    def cancel(showtime):
+        # Conditional, so a cancellation that lost the race to the lock fails
+        now = timezone.now()
+        if not Booking.objects.filter(pk=booking.pk, status=Booking.CONFIRMED).update(status=status, cancelled_at=now):
+            raise BookingStatusError(f"Booking {booking.pk} has already been cancelled")
+        SeatReservation.objects.filter(booking=booking).delete()
+        _release_seats(showtime, seat_ids)
+        record_sales([(showtime, -len(seat_ids), -Decimal(str(booking.amount_paid)))])
+        _publish(showtime, released=seat_ids)
+        booking.status, booking.cancelled_at, booking.showtime = status, now, showtime
+        return booking
+
+    return run_locked(booking.showtime_id, cancel)
+
+
+def cancel_showtime(showtime_id, refund=True):
+    """
+    Cancel a showtime: every confirmed booking is cancelled (and refunded, by
+    default), every seat and hold is released and no further bookings are
+    taken. Runs a fixed number of set-based statements however many bookings
+    there are. Returns the number of bookings cancelled.
+    """
+    def cancel(showtime):
+        seat_ids = showtime.get_booked_seats()
+        cancelled = Booking.objects.filter(showtime=showtime, status=Booking.CONFIRMED).update(
+            status=Booking.REFUNDED if refund else Booking.CANCELLED, cancelled_at=timezone.now(),
+        )
+        SeatReservation.objects.filter(showtime=showtime).delete()
+        SeatHold.objects.filter(showtime=showtime).delete()
+        Showtime.objects.filter(pk=showtime.pk).update(is_cancelled=True)
+        showtime.is_cancelled = True
+        showtime.seat_map = showtime.seat_layout.get_grid().to_bytes(0) if showtime.seat_layout else b''
+        showtime.holds_expire_at = None
+        # Every sale is gone and the showtime no longer counts towards capacity
+        showtime.tickets_sold, showtime.revenue = 0, 0
+        refresh_daily_sales(showtime, pending=True)
+        _publish(showtime, released=seat_ids)
+        return cancelled
+
+    return run_locked(showtime_id, cancel)
+
+
+def release_expired_holds(showtime, now=None):
+    """Release the lapsed holds of a locked showtime; returns the number of seats freed"""
+    now = now or timezone.now()
+    if not showtime.has_expired_holds(now):
+        return 0
+
+    expired = SeatHold.objects.filter(showtime=showtime, expires_at__lte=now)
+    seat_ids = list(
+        SeatReservation.objects.filter(hold__in=expired).values_list('seat_id', flat=True)
+    )
+    expired.delete()
+    _release_seats(showtime, seat_ids)
+    _publish(showtime, released=seat_ids)
+    showtime.holds_expire_at = (
+        SeatHold.objects.filter(showtime=showtime).aggregate(Min('expires_at'))['expires_at__min']
+    )
+    return len(seat_ids)
+
+
+def reconcile_occupancy(showtimes=None, dry_run=False):
+    """
+    Recompute the occupancy counters of showtimes (all by default) from their
+    layouts and reservation rows, in bulk. Returns the ids of the showtimes
+    whose counters were out of date.
+
+    The booking engine keeps the counters in step with the seat map, so a
+    showtime found out of date here likely has a stale seat map as well;
+    rebuild it with Showtime.rebuild_seat_map under run_locked.
+    """
+    showtimes = Showtime.objects.all() if showtimes is None else showtimes
+    capacity = Case(
+        *[When(seat_layout_id=layout.pk, then=Value(layout.get_grid().size)) for layout in SeatLayout.objects.all()],
+        default=Value(0),
+    )
+    taken = SeatReservation.objects.filter(showtime=OuterRef('pk')).order_by().values('showtime').annotate(
+        count=Count('*')
+    ).values('count')
+    # Occupancy is only tracked for showtimes with a seat layout
+    booked_count = Case(When(seat_layout=None, then=Value(0)), default=Coalesce(Subquery(taken), Value(0)))
+
+    stale = showtimes.alias(expected_capacity=capacity, expected_booked=booked_count).exclude(
+        capacity=F('expected_capacity'), booked_count=F('expected_booked'),
+        is_sold_out=Q(expected_capacity__gt=0, expected_booked__gte=F('expected_capacity')),
+    )
+    stale_ids = list(stale.values_list('pk', flat=True))
+    if stale_ids and not dry_run:
+        with transaction.atomic():
+            Showtime.objects.filter(pk__in=stale_ids).update(capacity=capacity, booked_count=booked_count)
+            Showtime.objects.filter(pk__in=stale_ids).update(
+                is_sold_out=Q(capacity__gt=0, booked_count__gte=F('capacity'))
+            )
+            transaction.on_commit(bump_schedule_version)
+    return stale_ids
+
+
+def rebuild_layout_seat_maps(layout_id):
+    """
+    Rebuild the seat maps of every showtime on a seat layout, each under its
+    own lock, after the layout's rows or seats per row were edited: the
+    bitmaps are numbered by the layout's grid.
+    """
+    def rebuild(showtime):
+        showtime.rebuild_seat_map()
+        return showtime
+
+    showtimes = []
+    for showtime_id in Showtime.objects.filter(seat_layout_id=layout_id).values_list('pk', flat=True):
+        try:
+            showtimes.append(run_locked(showtime_id, rebuild))
+        except Showtime.DoesNotExist:
+            pass  # Deleted meanwhile
+    refresh_days(showtimes)
+    transaction.on_commit(bump_schedule_version)
+
+
+def _hold_showtime_id(token):
+    showtime_id = SeatHold.objects.filter(token=token).values_list('showtime_id', flat=True).first()
+    if showtime_id is None:
+        raise HoldExpiredError("Seat hold has expired")
+    return showtime_id
+
+
+def _lock_showtime(showtime_id):
+    """Take the per-showtime write lock and bump its version"""
+    showtimes = Showtime.objects.select_related('seat_layout')
+    if transaction.get_connection().features.has_select_for_update:
+        showtime = showtimes.select_for_update(of=('self',)).get(pk=showtime_id)
+        showtime.version += 1
+        return showtime
+
+    if not Showtime.objects.filter(pk=showtime_id).update(version=F('version') + 1):
+        raise Showtime.DoesNotExist(f"Showtime {showtime_id} does not exist")
+    return showtimes.get(pk=showtime_id)
+
+
+def _lock_showtimes(showtime_ids):
+    """Take the write locks of several showtimes, in ascending id order, and bump their versions"""
+    showtime_ids = sorted(set(showtime_ids))
+    showtimes = Showtime.objects.select_related('seat_layout').filter(pk__in=showtime_ids).order_by('pk')
+    if transaction.get_connection().features.has_select_for_update:
+        locked = {showtime.pk: showtime for showtime in showtimes.select_for_update(of=('self',))}
+        for showtime in locked.values():
+            showtime.version += 1
+        return locked
+
+    # One statement takes SQLite's database-wide write lock for all of them
+    Showtime.objects.filter(pk__in=showtime_ids).update(version=F('version') + 1)
+    return {showtime.pk: showtime for showtime in showtimes}
+
+
+def _best_seats(showtime, count):
+    if showtime.is_cancelled:
+        raise ShowtimeCancelledError(f"Showtime {showtime.pk} has been cancelled")
+    grid = showtime.seat_layout.get_grid() if showtime.seat_layout else None
+    mask = grid.best_seats(showtime.taken_seats_bitmap, count) if grid else 0
+    if not mask:
+        raise NoSeatsTogetherError(count)
+    return grid.seats(mask)
+
+
+def _check_seat_map(showtime, seat_ids):
+    """Return the bitmap of seat_ids, raising if any is unknown or already taken"""
+    if showtime.is_cancelled:
+        raise ShowtimeCancelledError(f"Showtime {showtime.pk} has been cancelled")
+    if not showtime.seat_layout:
+        return 0
+    grid = showtime.seat_layout.get_grid()
+    mask = grid.mask(seat_ids)
+    conflicts = mask & showtime.taken_seats_bitmap
+    if conflicts:
+        raise SeatUnavailableError(grid.seats(conflicts))
+    return mask
+
+
+def _take_seats(showtime, mask):
+    if mask:
+        grid = showtime.seat_layout.get_grid()
+        showtime.seat_map = grid.to_bytes(showtime.taken_seats_bitmap | mask)
+
+
+def _release_seats(showtime, seat_ids):
+    if not showtime.seat_layout:
+        return
+    grid = showtime.seat_layout.get_grid()
+    mask = grid.mask(seat_id for seat_id in seat_ids if seat_id in grid.index)
+    showtime.seat_map = grid.to_bytes(showtime.taken_seats_bitmap & ~mask)
+
+
+def _publish(showtime, booked=(), held=(), released=()):
+    """Publish a seat delta to live subscribers and invalidate listings once the transaction commits"""
+    event = {
+        'showtime': showtime.pk,
+        'version': showtime.version,
+        'booked': list(booked),
+        'held': list(held),
+        'released': list(released),
+    }
+    transaction.on_commit(lambda: publish_seat_event(showtime.pk, event))
+    transaction.on_commit(bump_schedule_version)
+
+
+def _insert_reservations(showtime, seat_ids, **fields):
+    # No savepoint: the seat map has already ruled out conflicts, so a unique
+    # constraint violation here means the map was stale, and the whole locked
+    # transaction is rolled back (see _raise_if_taken)
+    SeatReservation.objects.bulk_create([
+        SeatReservation(showtime=showtime, seat_id=seat_id, **fields)
+        for seat_id in seat_ids
+    ])
+
+
+def _raise_if_taken(showtime_id, seat_ids):
+    """After a rolled back reservation, raise SeatUnavailableError for the seats already taken"""
+    taken = set(
+        SeatReservation.objects.filter(showtime_id=showtime_id, seat_id__in=seat_ids)
+        .values_list('seat_id', flat=True)
+    )
+    if taken:
+        raise SeatUnavailableError([seat_id for seat_id in seat_ids if seat_id in taken])
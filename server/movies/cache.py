@@ -0,0 +1,111 @@
+"""
+Response cache for the movie catalogue.
+
+Catalogue responses are cached with Django's cache framework under keys that
+embed a catalogue version number. Saving or deleting a Movie bumps the version
+(see ``signals.py``), which makes every cached entry unreachable at once; the
+stale entries simply age out of the cache.
+
+The upcoming showtimes listing (see ``upcoming.py``) is cached the same way
+under a schedule version as well, which every booking, hold and release bumps
+once its transaction commits, as do edits to showtimes.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+CATALOGUE_VERSION_KEY = 'movies:catalogue-version'
+SCHEDULE_VERSION_KEY = 'movies:schedule-version'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a version evicted from the cache can never
+        # come back with a number that old entries were stored under
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_catalogue_version():
+    return get_version(CATALOGUE_VERSION_KEY)
+
+
+def bump_catalogue_version():
+    """Invalidate every cached catalogue response"""
+    bump_version(CATALOGUE_VERSION_KEY)
+
+
+def get_schedule_version():
+    return get_version(SCHEDULE_VERSION_KEY)
+
+
+def bump_schedule_version():
+    """Invalidate every cached upcoming showtimes listing"""
+    bump_version(SCHEDULE_VERSION_KEY)
+
+
+def catalogue_cached(name, compute):
+    """Return compute(), cached under the current catalogue version"""
+    key = f'movies:catalogue:{get_catalogue_version()}:{name}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, settings.CATALOGUE_CACHE_TIMEOUT)
+    return value
+
+
+def normalize_query_params(query_params, names):
+    """Return the listed query params as a canonical, sorted query string"""
+    params = []
+    for name in names:
+        value = ' '.join(query_params.get(name, '').split())
+        if name == 'search':
+            value = value.lower()
+        if name == 'page' and value == '1':
+            value = ''
+        if value:
+            params.append((name, value))
+    return urlencode(sorted(params))
+
+
+class CatalogueCacheMixin:
+    """
+    Serve GET responses from the catalogue cache.
+
+    ``cache_query_params`` lists the query params that change the response;
+    any others are ignored when building the cache key.
+    """
+    cache_query_params = ()
+
+    def get_cache_key(self, request):
+        raw = '|'.join([
+            request.get_host(),
+            request.path,
+            normalize_query_params(request.query_params, self.cache_query_params),
+        ])
+        digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+        return f'movies:catalogue:{get_catalogue_version()}:{digest}'
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CATALOGUE_CACHE_TIMEOUT)
+        return response
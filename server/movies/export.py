@@ -0,0 +1,124 @@
+"""
+Streaming export of bookings as CSV or NDJSON.
+
+Rows are read as tuples from one query joining the booking to its showtime
+and movie, so there are no per-row lookups and no model instances. They are
+fetched in chunks of ``EXPORT_CHUNK_SIZE``: through a server-side cursor
+(``QuerySet.iterator``) where the database supports one, else, as with
+PgBouncer transaction pooling, in keyset batches on the primary key. Output is
+encoded a chunk at a time as well, so memory use does not grow with the size
+of the export.
+"""
+import csv
+import datetime
+import decimal
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+# (column, lookup) pairs, in output order; computed columns come last
+EXPORT_COLUMNS = [
+    ('booking_id', 'id'),
+    ('booking_time', 'booking_time'),
+    ('status', 'status'),
+    ('cancelled_at', 'cancelled_at'),
+    ('user_email', 'user_email'),
+    ('user_name', 'user_name'),
+    ('seats', 'seats'),
+    ('amount_paid', 'amount_paid'),
+    ('showtime_id', 'showtime_id'),
+    ('showtime_date', 'showtime__date'),
+    ('showtime_time', 'showtime__time'),
+    ('screen', 'showtime__screen'),
+    ('movie_id', 'showtime__movie_id'),
+    ('movie_title', 'showtime__movie__title'),
+    ('seat_count', None),  # Worked out from seats
+]
+LOOKUPS = [lookup for _, lookup in EXPORT_COLUMNS if lookup]
+SEATS = LOOKUPS.index('seats')
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_rows(queryset):
+    """Yield the export columns of each booking in queryset, in primary key order"""
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    rows = queryset.order_by('pk').values_list(*LOOKUPS)
+    if connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        # Without a server-side cursor the driver would read the whole result
+        last = None
+        while True:
+            batch = list((rows if last is None else rows.filter(pk__gt=last))[:chunk_size])
+            for row in batch:
+                yield with_seat_count(row)
+            if len(batch) < chunk_size:
+                return
+            last = batch[-1][0]
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield with_seat_count(row)
+
+
+def with_seat_count(row):
+    return (*row, len(row[SEATS] or []))
+
+
+def plain(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def encode_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    for n, row in enumerate(rows, 1):
+        row = [plain(value) for value in row]
+        row[SEATS] = ' '.join(row[SEATS] or [])
+        writer.writerow(row)
+        if n % settings.EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_ndjson(rows):
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, map(plain, row)))) + '\n')
+        if len(lines) == settings.EXPORT_CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+
+def export_bookings(queryset, file_format):
+    """The encoded export of queryset, as an iterator of text chunks"""
+    encode = encode_csv if file_format == 'csv' else encode_ndjson
+    return encode(export_rows(queryset))
+
+
+async def aiterate(chunks):
+    """
+    Serve a sync iterator asynchronously, one chunk per thread hop.
+
+    Under ASGI, StreamingHttpResponse would otherwise read a sync iterator to
+    the end before sending anything. The hops are thread sensitive, so the
+    cursor stays on the connection of the thread that opened it.
+    """
+    sentinel = object()
+    while True:
+        chunk = await sync_to_async(next)(chunks, sentinel)
+        if chunk is sentinel:
+            return
+        yield chunk
@@ -0,0 +1,371 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import NoReverseMatch, reverse
+
+from movies.models import Movie, Showtime, SeatLayout
+
+SCENARIOS = ['catalogue', 'showtimes', 'seat-map', 'booking-rush', 'best-available']
+QUERY_COUNT = re.compile(r'db;[^,]*desc="(\d+) queries')
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-tests the API routes in-process against the configured database and reports '
+        'latency percentiles, throughput, query counts and error/conflict rates'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help='Scenario to run (repeatable; default: all)')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for the request mix')
+        parser.add_argument('--cold-cache', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+        parser.add_argument('--async', action='store_true', dest='use_async',
+                            help='Drive the app through its ASGI handler, using the async endpoints where they exist')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+        showtime = Showtime.objects.exclude(seat_layout=None).order_by('id').first()
+        if showtime is None or not Movie.objects.exists():
+            raise CommandError('Not enough data to benchmark; run create_dependency_data first')
+
+        self.options = options
+        self.random = random.Random(options['seed'])
+        self.movie_ids = list(Movie.objects.values_list('id', flat=True)[:1000])
+        self.genres = list(Movie.objects.exclude(genre=None).values_list('genre', flat=True).distinct()[:50])
+        self.showtimes = list(Showtime.objects.exclude(seat_layout=None).values_list('id', 'movie_id', 'date')[:1000])
+
+        # Expected 4xx responses (conflicts) would otherwise be logged one by one
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            results = self.run_scenarios(options)
+        finally:
+            request_logger.setLevel(level)
+
+        if options['compare']:
+            self.compare(results, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\nResults written to {options['output']}"))
+
+    def run_scenarios(self, options):
+        results = {
+            'commit': self.git_commit(),
+            'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'mode': 'async' if options['use_async'] else 'sync',
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'scenarios': {},
+        }
+        for name in options['scenario'] or SCENARIOS:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            stats = getattr(self, f"scenario_{name.replace('-', '_')}")()
+            results['scenarios'][name] = stats
+            self.report(stats)
+        return results
+
+    def url(self, name, *args):
+        """The route for name; its async version instead in --async mode, if there is one"""
+        if self.options['use_async']:
+            try:
+                return reverse(f'async-{name}', args=args)
+            except NoReverseMatch:
+                pass
+        return reverse(name, args=args)
+
+    # Scenarios: each defines one request and runs it from concurrent clients.
+    # Requests are awaited in --async mode, where the clients are AsyncClients.
+
+    def scenario_catalogue(self):
+        """Browsing the movie list with the filters and pages the UI offers"""
+        url = self.url('movie-list')
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        pages = max(1, min(3, -(-Movie.objects.count() // page_size)))
+
+        def browse(client):
+            if self.random.random() < 0.3:
+                return client.get(self.url('movie-detail', self.random.choice(self.movie_ids)))
+            choice = self.random.random()
+            if choice < 0.3 and self.genres:
+                params = {'genre': self.random.choice(self.genres)}
+            elif choice < 0.5:
+                params = {'search': self.random.choice(['the', 'love', 'night', 'man'])}
+            elif choice < 0.6:
+                params = {'ordering': self.random.choice(['title', '-release_date'])}
+            else:
+                # Filtered results may not reach a second page; the full list does
+                params = {'page': self.random.randint(1, pages)}
+            return client.get(url, params)
+
+        return self.run(browse)
+
+    def scenario_showtimes(self):
+        """Showtime listings with embedded movie details, by movie or by date"""
+        url = self.url('showtime-list')
+
+        def listing(client):
+            _, movie_id, date = self.random.choice(self.showtimes)
+            params = {'movieDetails': 'true'}
+            if self.random.random() < 0.5:
+                params['movie'] = movie_id
+            else:
+                params['date'] = date.isoformat()
+            return client.get(url, params)
+
+        return self.run(listing)
+
+    def scenario_seat_map(self):
+        """Clients polling seat maps with If-None-Match, as the seat selection page does"""
+        etags = {}
+        lock = threading.Lock()
+
+        def poll(client):
+            showtime_id = self.random.choice(self.showtimes[:20])[0]
+            with lock:
+                etag = etags.get((client, showtime_id))
+            headers = {'If-None-Match': etag} if etag else {}
+            return remember(client, showtime_id, client.get(self.url('showtime-detail', showtime_id), headers=headers))
+
+        def remember(client, showtime_id, response):
+            if asyncio.iscoroutine(response):
+                async def remember_later():
+                    return remember(client, showtime_id, await response)
+                return remember_later()
+            if response.has_header('ETag'):
+                with lock:
+                    etags[(client, showtime_id)] = response['ETag']
+            return response
+
+        return self.run(poll)
+
+    def rush_showtime(self):
+        """A fresh, empty showtime to rush; the caller deletes it"""
+        template = Showtime.objects.exclude(seat_layout=None).order_by('id').first()
+        return Showtime.objects.create(
+            movie_id=template.movie_id, date=template.date, time=template.time,
+            screen='Benchmark', seat_layout=SeatLayout.objects.filter(pk=template.seat_layout_id).first(),
+        )
+
+    def scenario_booking_rush(self):
+        """Everyone books a few seats on one fresh showtime at the same time"""
+        showtime = self.rush_showtime()
+        seat_ids = showtime.seat_layout.get_all_seats()
+        url = self.url('booking-create')
+
+        def book(client):
+            seats = self.random.sample(seat_ids, self.random.randint(1, min(4, len(seat_ids))))
+            return client.post(url, {
+                'user_email': 'rush@example.com', 'user_name': 'Rush', 'showtime': showtime.pk, 'seats': seats,
+            }, content_type='application/json')
+
+        def is_conflict(response):
+            # Seats taken by someone else, or the engine gave up retrying the lock
+            body = response.content.decode()
+            return response.status_code == 400 and ('already booked' in body or 'high demand' in body)
+
+        try:
+            stats = self.run(book, is_conflict=is_conflict)
+            # A seat in two successful bookings would mean the engine oversold it
+            booked = [seat for seats in showtime.bookings.values_list('seats', flat=True) for seat in seats]
+            stats['seats_booked'] = len(booked)
+            stats['oversold'] = len(booked) != len(set(booked))
+        finally:
+            # Bookings and reservations cascade
+            showtime.delete()
+        return stats
+
+    def scenario_best_available(self):
+        """The booking rush, but everyone asks the server for the best seats together"""
+        showtime = self.rush_showtime()
+        url = reverse('seat-hold-create', args=[showtime.pk])
+
+        def hold(client):
+            return client.post(url, {'count': self.random.randint(1, 4)}, content_type='application/json')
+
+        def is_conflict(response):
+            # Sold out, or the engine gave up retrying the lock
+            body = response.content.decode()
+            return response.status_code == 400 and ('seats together' in body or 'high demand' in body)
+
+        try:
+            stats = self.run(hold, is_conflict=is_conflict)
+            held = [seat for seats in showtime.holds.values_list('seats', flat=True) for seat in seats]
+            stats['seats_booked'] = len(held)
+            stats['oversold'] = len(held) != len(set(held))
+        finally:
+            showtime.delete()
+        return stats
+
+    # Runner
+
+    def run(self, request, is_conflict=lambda response: False):
+        """Issue options['requests'] calls of request(client) from concurrent clients"""
+        if self.options['use_async']:
+            return self.run_async(request, is_conflict)
+        total = self.options['requests']
+        concurrency = min(self.options['concurrency'], total)
+        samples = []
+        lock = threading.Lock()
+        counter = iter(range(total))
+        barrier = threading.Barrier(concurrency)
+
+        def worker():
+            # Server errors come back as 500 responses, as they would over HTTP
+            client = Client(raise_request_exception=False)
+            barrier.wait()
+            try:
+                while True:
+                    with lock:
+                        if next(counter, None) is None:
+                            return
+                    if self.options['cold_cache']:
+                        cache.clear()
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        response = request(client)
+                        elapsed = time.perf_counter() - start
+                    with lock:
+                        samples.append(self.sample(response, elapsed, is_conflict, len(queries)))
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.summarize(samples, time.perf_counter() - started)
+
+    def run_async(self, request, is_conflict):
+        """
+        Issue the requests from concurrent tasks on one event loop, as an ASGI
+        server would. Each request gets its own thread-sensitive context, as
+        under ASGIHandler, and its queries are counted from the Server-Timing
+        header since they run on other threads.
+        """
+        total = self.options['requests']
+        concurrency = min(self.options['concurrency'], total)
+        samples = []
+        counter = iter(range(total))
+
+        async def worker():
+            client = AsyncClient(raise_request_exception=False)
+            while next(counter, None) is not None:
+                if self.options['cold_cache']:
+                    cache.clear()
+                async with ThreadSensitiveContext():
+                    start = time.perf_counter()
+                    response = await request(client)
+                    elapsed = time.perf_counter() - start
+                match = QUERY_COUNT.search(response.get('Server-Timing', ''))
+                samples.append(self.sample(response, elapsed, is_conflict, int(match[1]) if match else 0))
+
+        async def main():
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+        started = time.perf_counter()
+        with override_settings(PERF_METRICS_SAMPLE_RATE=1.0):
+            asyncio.run(main())
+        return self.summarize(samples, time.perf_counter() - started)
+
+    def sample(self, response, elapsed, is_conflict, queries):
+        exception = response.exc_info[1] if response.exc_info else None
+        return (
+            elapsed, response.status_code, is_conflict(response), queries,
+            type(exception).__name__ if exception else None,
+        )
+
+    def summarize(self, samples, duration):
+        latencies = sorted(elapsed * 1000 for elapsed, _, _, _, _ in samples)
+        queries = [count for _, _, _, count, _ in samples]
+        conflicts = sum(1 for _, _, conflict, _, _ in samples if conflict)
+        errors = sum(1 for _, status, conflict, _, _ in samples if not conflict and status >= 400)
+        statuses = Counter(str(status) for _, status, _, _, _ in samples)
+        exceptions = Counter(exception for _, _, _, _, exception in samples if exception)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))], 3)
+
+        return {
+            'requests': len(samples),
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(len(samples) / duration, 1) if duration else 0,
+            'p50_ms': percentile(50),
+            'p95_ms': percentile(95),
+            'p99_ms': percentile(99),
+            'max_ms': round(latencies[-1], 3),
+            'queries_mean': round(statistics.mean(queries), 2),
+            'queries_max': max(queries),
+            'error_rate': round(errors / len(samples), 4),
+            'conflict_rate': round(conflicts / len(samples), 4),
+            'statuses': dict(statuses),
+            'exceptions': dict(exceptions),
+        }
+
+    def report(self, stats):
+        self.stdout.write(
+            f"{stats['requests']} requests in {stats['duration_s']}s ({stats['throughput_rps']} req/s)\n"
+            f"latency p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, p99 {stats['p99_ms']} ms, "
+            f"max {stats['max_ms']} ms\n"
+            f"queries/request mean {stats['queries_mean']}, max {stats['queries_max']}\n"
+            f"errors {stats['error_rate']:.2%}, conflicts {stats['conflict_rate']:.2%}, statuses {stats['statuses']}"
+        )
+        if stats['exceptions']:
+            self.stdout.write(self.style.ERROR(f"server errors: {stats['exceptions']}"))
+        if 'seats_booked' in stats:
+            style = self.style.ERROR if stats['oversold'] else self.style.SUCCESS
+            self.stdout.write(style(f"{stats['seats_booked']} seats booked, oversold: {stats['oversold']}"))
+
+    def compare(self, results, path):
+        try:
+            with open(path) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nCompared with {baseline.get('commit') or path}"))
+        for name, stats in results['scenarios'].items():
+            before = baseline.get('scenarios', {}).get(name)
+            if not before:
+                continue
+            changes = []
+            for metric in ['p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'queries_mean', 'error_rate', 'conflict_rate']:
+                if before.get(metric):
+                    change = (stats[metric] - before[metric]) / before[metric]
+                    changes.append(f'{metric} {before[metric]} -> {stats[metric]} ({change:+.0%})')
+            self.stdout.write(f"{name}: " + ', '.join(changes))
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,63 @@
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from movies.models import Movie, Showtime, Booking
+
+
+class Command(BaseCommand):
+    help = 'Reports EXPLAIN plans and timings for the hot API queries (seed a large dataset first)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--no-explain', action='store_true', help='Only report timings')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        movie = Movie.objects.exclude(release_date=None).exclude(genre=None).order_by('id').first()
+        showtime = Showtime.objects.order_by('id').first()
+        user_email = Booking.objects.order_by('id').values_list('user_email', flat=True).first()
+        if movie is None or showtime is None or user_email is None:
+            raise CommandError('Not enough data to benchmark; run create_dependency_data first')
+
+        self.stdout.write(
+            f'{connection.vendor}: {Movie.objects.count()} movies, '
+            f'{Showtime.objects.count()} showtimes, {Booking.objects.count()} bookings'
+        )
+
+        year = movie.release_date.year
+        for name, queryset in [
+            # The queries behind the list endpoints and their filters
+            ('movies by genre and year', Movie.objects.filter(
+                genre=movie.genre, release_date__gte=date(year, 1, 1), release_date__lt=date(year + 1, 1, 1),
+            ).order_by('release_date')),
+            ('movies ordered by title', Movie.objects.order_by('title')[:10]),
+            ('showtimes by movie and date', Showtime.objects.defer('seat_map').filter(
+                movie_id=showtime.movie_id, date=showtime.date,
+            ).order_by('time')),
+            ('showtimes by date', Showtime.objects.defer('seat_map').filter(date=showtime.date).order_by('time')),
+            ('bookings by user', Booking.objects.filter(user_email=user_email).order_by('-booking_time')[:10]),
+        ]:
+            self.benchmark(name, queryset, options)
+
+    def benchmark(self, name, queryset, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+        if not options['no_explain']:
+            self.stdout.write(queryset.explain())
+
+        timings = []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            rows = len(list(queryset.all()))
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows} rows: median {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms, max {timings[-1]:.2f} ms'
+        ))
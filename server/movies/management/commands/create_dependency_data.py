@@ -1,160 +1,251 @@
+import json
 import random
-from django.core.management.base import BaseCommand
+import time as clock
+from datetime import date, timedelta
 
-from movies.models import Movie, SeatLayout, Showtime, Booking
-from datetime import date, timedelta, time
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from movies.cache import bump_catalogue_version, bump_schedule_version
+from movies.models import Movie, SeatLayout, Showtime, Booking, SeatHold, SeatReservation
+from movies.sales import rebuild_sales
+from movies.scheduling import Schedule, plan_schedule
+from movies.search import rebuild_search_index
+
+LAYOUTS = [
+    {"name": "Standard", "rows": "A,B,C,D,E,F,G,H", "seats_per_row": 10},
+    {"name": "IMAX", "rows": "A,B,C,D,E,F,G,H,I,J", "seats_per_row": 15},
+    {"name": "VIP", "rows": "A,B,C,D", "seats_per_row": 8},
+]
+# Every fifth screen is VIP and the one before it IMAX; the rest are standard
+SCREEN_LAYOUTS = ["Standard", "Standard", "Standard", "IMAX", "VIP"]
+
+USER_NAMES = [
+    "Ganesh Kumar", "Saraswathi Selvam", "Murugan Mani", "Kaveri Kannan",
+    "Rajesh Ramasamy", "Shanthi Shanmugam", "Thamizhselvan Thanapalan", "Priya Balasubramanian",
+    "Karthikeyan Kannan", "Nithya Narayanan", "Sathya Shanmugam", "Parvathi Balakrishnan"
+]
+EMAIL_DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "hotmail.com", "example.com"]
+GENRES = ["Action", "Comedy", "Drama", "Thriller", "Romance", "Science Fiction", "Animation"]
+TICKET_PRICE = 190  # ₹190 per ticket
 
 
 class Command(BaseCommand):
-    help = 'Creates dummy movie data using existing poster files'
+    help = 'Creates sample showtimes and bookings; scales to millions of rows for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=0,
+                            help='Movies to schedule; synthetic movies are added if the catalogue has fewer (default: all existing)')
+        parser.add_argument('--days', type=int, default=7, help='Days of showtimes starting today')
+        parser.add_argument('--screens', type=int, default=5, help='Screens, each packed with back-to-back shows every day')
+        parser.add_argument('--bookings', type=int, default=40, help='Bookings to create (stops early if every show sells out)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
 
     def handle(self, *args, **options):
-        # Clear existing data
+        for name in ['days', 'screens', 'batch_size']:
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1")
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        # Clear existing data, dependent tables first
         self.stdout.write(self.style.WARNING('Clearing existing data...'))
-        Booking.objects.all().delete()
-        Showtime.objects.all().delete()
-        SeatLayout.objects.all().delete()
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in [SeatReservation, SeatHold, Booking, Showtime, SeatLayout]:
+                cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
         # We're keeping the movies
-        
-        self.create_seat_layouts()
-        self.create_showtimes()
-        self.create_bookings()
-        
-        self.stdout.write(self.style.SUCCESS('Successfully created all sample data'))
 
-    def create_seat_layouts(self):
-        # Create different seat layouts
-        layouts = [
-            {"name": "Standard", "rows": "A,B,C,D,E,F,G,H", "seats_per_row": 10},
-            {"name": "IMAX", "rows": "A,B,C,D,E,F,G,H,I,J", "seats_per_row": 15},
-            {"name": "VIP", "rows": "A,B,C,D", "seats_per_row": 8},
-        ]
-        
-        for layout_data in layouts:
-            SeatLayout.objects.create(
-                name=layout_data["name"],
-                rows=layout_data["rows"],
-                seats_per_row=layout_data["seats_per_row"]
-            )
-            
-        self.stdout.write(self.style.SUCCESS(f'Successfully created {len(layouts)} seat layouts'))
-        
-    def create_showtimes(self):
-        movies = Movie.objects.all()
+        started = clock.monotonic()
+        movies = self.create_movies(options['movies'])
         if not movies:
             self.stdout.write(self.style.ERROR('No movies found. Please create movies first.'))
             return
-            
-        seat_layouts = SeatLayout.objects.all()
-        if not seat_layouts:
-            self.stdout.write(self.style.ERROR('No seat layouts found. Please create seat layouts first.'))
-            return
-            
-        screens = ["Screen 1", "Screen 2", "Screen 3", "IMAX", "VIP"]
-        show_times = [
-            time(10, 0),  # 10:00 AM
-            time(13, 0),  # 1:00 PM
-            time(16, 0),  # 4:00 PM
-            time(19, 0),  # 7:00 PM
-            time(22, 0),  # 10:00 PM
-        ]
-        
-        # Create showtimes for the next 7 days
-        showtimes_created = 0
-        today = date.today()
-        
-        for movie in movies:
-            # Each movie gets 1-3 showtimes per day for the next 7 days
-            for day_offset in range(7):
-                showtime_date = today + timedelta(days=day_offset)
-                num_showtimes = random.randint(1, 3)
-                
-                # Randomly select times for this movie on this day
-                selected_times = random.sample(show_times, num_showtimes)
-                selected_screens = random.sample(screens, num_showtimes)
-                
-                for i in range(num_showtimes):
-                    # Select appropriate seat layout based on screen
-                    if selected_screens[i] == "IMAX":
-                        seat_layout = SeatLayout.objects.get(name="IMAX")
-                    elif selected_screens[i] == "VIP":
-                        seat_layout = SeatLayout.objects.get(name="VIP")
-                    else:
-                        seat_layout = SeatLayout.objects.get(name="Standard")
-                    
-                    Showtime.objects.create(
-                        movie=movie,
-                        date=showtime_date,
-                        time=selected_times[i],
-                        screen=selected_screens[i],
-                        seat_layout=seat_layout,
-                        booked_seats=[]  # Initially no seats are booked
-                    )
-                    showtimes_created += 1
-                    
-        self.stdout.write(self.style.SUCCESS(f'Successfully created {showtimes_created} showtimes'))
-        
-    def create_bookings(self):
-        showtimes = Showtime.objects.all()
-        if not showtimes:
-            self.stdout.write(self.style.ERROR('No showtimes found. Please create showtimes first.'))
-            return
-            
-        # Sample user data
-        user_names = [
-            "Ganesh Kumar", "Saraswathi Selvam", "Murugan Mani", "Kaveri Kannan",
-            "Rajesh Ramasamy", "Shanthi Shanmugam", "Thamizhselvan Thanapalan", "Priya Balasubramanian",
-            "Karthikeyan Kannan", "Nithya Narayanan", "Sathya Shanmugam", "Parvathi Balakrishnan"
-        ]
-        
-        email_domains = ["gmail.com", "yahoo.com", "outlook.com", "hotmail.com", "example.com"]
-        
+        layouts = self.create_seat_layouts()
+        showtimes = self.create_showtimes(movies, layouts, options['days'], options['screens'])
+        self.create_bookings(showtimes, options['bookings'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully created all sample data in {clock.monotonic() - started:.1f}s'
+        ))
+
+    def create_movies(self, count):
+        """Return (id, duration) of the movies to schedule, topping up the catalogue to count"""
+        # A stream of its own, so the schedule for a seed does not depend on
+        # whether the movies had to be created first
+        rng = random.Random(self.random.random())
+        movies = list(Movie.objects.order_by('id').values_list('id', 'duration'))
+        if count <= 0:
+            return movies
+        if count <= len(movies):
+            return movies[:count]
+
+        # Synthetic movies reuse the posters (and so the resized variants)
+        # already uploaded
+        posters = list(Movie.objects.values_list('poster', 'poster_hash').distinct()) or [('movie-posters/placeholder.jpg', '')]
+        missing = count - len(movies)
+        for start in range(0, missing, self.batch_size):
+            batch = []
+            for i in range(start, min(start + self.batch_size, missing)):
+                poster, poster_hash = rng.choice(posters)
+                batch.append(Movie(
+                    title=f"Sample Movie {len(movies) + i + 1}",
+                    description="A synthetic movie generated for load testing.",
+                    short_description="Generated for load testing.",
+                    genre=rng.choice(GENRES),
+                    duration=rng.randint(80, 180),
+                    release_date=date(2000, 1, 1) + timedelta(days=rng.randint(0, 9000)),
+                    language="Tamil",
+                    poster=poster,
+                    poster_hash=poster_hash,
+                ))
+            movies.extend((movie.pk, movie.duration) for movie in Movie.objects.bulk_create(batch))
+        # bulk_create skips the signals that maintain the search index and cache
+        rebuild_search_index()
+        bump_catalogue_version()
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully created {missing} synthetic movies'))
+        return movies
+
+    def create_seat_layouts(self):
+        layouts = {layout.name: layout for layout in SeatLayout.objects.bulk_create(
+            [SeatLayout(**layout_data) for layout_data in LAYOUTS]
+        )}
+        self.stdout.write(self.style.SUCCESS(f'Successfully created {len(layouts)} seat layouts'))
+        return layouts
+
+    def create_showtimes(self, movies, layouts, days, screens):
+        """Pack every screen with back-to-back shows of random movies each day, without overlaps"""
+        screen_layouts = {}
+        for screen in range(1, screens + 1):
+            layout = layouts[SCREEN_LAYOUTS[(screen - 1) % len(SCREEN_LAYOUTS)]]
+            screen_layouts[f"Screen {screen}" if layout.name == "Standard" else f"{layout.name} {screen}"] = layout
+        # The showtimes were cleared, so there is no existing schedule to load
+        slots = plan_schedule(
+            movies, list(screen_layouts), date.today(), days, choose=self.random.randrange, schedule=Schedule(),
+        )
+
+        showtimes = []
+        for start in range(0, len(slots), self.batch_size):
+            batch = []
+            for slot in slots[start:start + self.batch_size]:
+                layout = screen_layouts[slot.screen]
+                batch.append(Showtime(
+                    movie_id=slot.movie_id,
+                    date=slot.date,
+                    time=slot.time,
+                    screen=slot.screen,
+                    seat_layout=layout,
+                    capacity=layout.get_grid().size,
+                ))
+            showtimes.extend(Showtime.objects.bulk_create(batch))
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully created {len(showtimes)} showtimes'))
+        return showtimes
+
+    def create_bookings(self, showtimes, count):
+        """
+        Book random seats straight into the tables.
+
+        Seat availability is tracked in memory (a list of free seat indexes and
+        a bitmap per showtime) instead of being read back per booking, rows are
+        written with executemany and explicit ids rather than through model
+        instances, and the seat maps are written once at the end.
+        """
+        grids = [showtime.seat_layout.get_grid() for showtime in showtimes]
+        free = [None] * len(showtimes)  # Free seat indexes, filled in on first use
+        bitmaps = [0] * len(showtimes)
+        open_shows = list(range(len(showtimes)))
+        # Spread bookings over enough users that per-user lookups stay realistic
+        users = max(len(USER_NAMES), count // 5)
+        emails = {}
+
+        booking_sql = self.insert_sql(Booking, ['id', 'user_email', 'user_name', 'showtime', 'seats', 'booking_time', 'amount_paid', 'status'])
+        reservation_sql = self.insert_sql(SeatReservation, ['showtime', 'seat_id', 'booking', 'state'])
+        booking_id = (Booking.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        amounts = [self.prep_value(Booking, 'amount_paid', seats * TICKET_PRICE) for seats in range(5)]
+
         bookings_created = 0
-        
-        # Create 30-50 bookings
-        num_bookings = random.randint(30, 50)
-        
-        for _ in range(num_bookings):
-            try:
-                # Select a random showtime
-                showtime = random.choice(showtimes)
-                
-                # Skip if no seat layout
-                if not showtime.seat_layout:
-                    continue
-                    
-                # Get available seats for this showtime
-                available_seats = showtime.get_available_seats()
-                
-                if len(available_seats) < 1:
-                    continue  # Skip if no available seats
-                    
-                # Select 1-4 random seats (or as many as available)
-                num_seats = min(random.randint(1, 4), len(available_seats))
-                selected_seats = random.sample(available_seats, num_seats)
-                
-                # Create a random user
-                user_name = random.choice(user_names)
-                email_domain = random.choice(email_domains)
-                email = f"{user_name.lower().replace(' ', '.')}@{email_domain}"
-                
-                # Create the booking
-                Booking.objects.create(
-                    user_name=user_name,
-                    user_email=email,
-                    showtime=showtime,
-                    seats=selected_seats,
-                    amount_paid=num_seats * 190.00  # ₹190 per ticket
-                )
-                
-                bookings_created += 1
-                
-                # Print progress every 10 bookings
-                if bookings_created % 10 == 0:
-                    self.stdout.write(f"Created {bookings_created} bookings so far...")
-                    
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Error creating booking: {str(e)}"))
-                continue
-                
-        self.stdout.write(self.style.SUCCESS(f'Successfully created {bookings_created} bookings')) 
\ No newline at end of file
+        started = clock.monotonic()
+        while bookings_created < count and open_shows:
+            booked_at = self.prep_value(Booking, 'booking_time', timezone.now())
+            bookings, reservations = [], []
+            while len(bookings) < min(self.batch_size, count - bookings_created) and open_shows:
+                position = self.random.randrange(len(open_shows))
+                i = open_shows[position]
+                if free[i] is None:
+                    free[i] = list(range(grids[i].size))
+                seats = free[i]
+
+                # Take 1-4 random free seats (or as many as are left)
+                taken = []
+                for _ in range(min(self.random.randint(1, 4), len(seats))):
+                    j = self.random.randrange(len(seats))
+                    seats[j], seats[-1] = seats[-1], seats[j]
+                    taken.append(seats.pop())
+                if not seats:
+                    open_shows[position] = open_shows[-1]
+                    open_shows.pop()
+
+                user = self.random.randrange(users)
+                user_name = USER_NAMES[user % len(USER_NAMES)]
+                email = emails.get(user)
+                if email is None:
+                    email = emails[user] = (
+                        f"{user_name.lower().replace(' ', '.')}.{user}@{EMAIL_DOMAINS[user % len(EMAIL_DOMAINS)]}"
+                    )
+                showtime_id = showtimes[i].pk
+                seat_ids = [grids[i].seat_ids[index] for index in taken]
+                for index, seat_id in zip(taken, seat_ids):
+                    bitmaps[i] |= 1 << index
+                    reservations.append((showtime_id, seat_id, booking_id, SeatReservation.BOOKED))
+                bookings.append((
+                    booking_id, email, user_name, showtime_id, json.dumps(seat_ids), booked_at, amounts[len(seat_ids)],
+                    Booking.CONFIRMED,
+                ))
+                booking_id += 1
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(booking_sql, bookings)
+                cursor.executemany(reservation_sql, reservations)
+            bookings_created += len(bookings)
+
+            elapsed = clock.monotonic() - started
+            self.stdout.write(
+                f"Created {bookings_created}/{count} bookings so far... "
+                f"({bookings_created / elapsed if elapsed else 0:.0f}/s)"
+            )
+
+        # Explicit ids leave PostgreSQL sequences behind; move them past the new rows
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Booking, SeatReservation]):
+                cursor.execute(sql)
+            cursor.executemany(
+                f"UPDATE {connection.ops.quote_name(Showtime._meta.db_table)} "
+                f"SET seat_map = %s, booked_count = %s, is_sold_out = %s WHERE id = %s",
+                [
+                    (grids[i].to_bytes(bitmap), bitmap.bit_count(), bitmap == grids[i].full, showtimes[i].pk)
+                    for i, bitmap in enumerate(bitmaps) if bitmap
+                ],
+            )
+
+        # The raw inserts bypass the engine that maintains the sales rollups
+        # and invalidates the upcoming showtimes listing
+        rebuild_sales()
+        bump_schedule_version()
+
+        if bookings_created < count:
+            self.stdout.write(self.style.WARNING('Every showtime is sold out; add --days or --screens for more bookings'))
+        self.stdout.write(self.style.SUCCESS(f'Successfully created {bookings_created} bookings'))
+
+    def insert_sql(self, model, fields):
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(model._meta.get_field(field).column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        return f"INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})"
+
+    def prep_value(self, model, field, value):
+        return model._meta.get_field(field).get_db_prep_save(value, connection)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from movies.booking import run_locked
+from movies.models import Showtime
+
+
+class Command(BaseCommand):
+    help = 'Releases seats whose checkout holds have expired'
+
+    def handle(self, *args, **options):
+        # Only showtimes whose earliest hold has lapsed need sweeping; locking
+        # one releases its expired holds before the (no-op) operation runs
+        showtime_ids = list(
+            Showtime.objects.filter(holds_expire_at__lte=timezone.now()).values_list('id', flat=True)
+        )
+        for showtime_id in showtime_ids:
+            run_locked(showtime_id, lambda showtime: None)
+
+        self.stdout.write(self.style.SUCCESS(f'Released expired seat holds on {len(showtime_ids)} showtimes'))
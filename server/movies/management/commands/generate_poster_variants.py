@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from movies.cache import bump_catalogue_version
+from movies.models import Movie
+from movies.posters import content_hash, generate_variants
+
+
+class Command(BaseCommand):
+    help = 'Hashes movie posters that have no content hash yet and writes their missing resized variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rehash', action='store_true', help='Recompute the hash of every poster, not just missing ones')
+
+    def handle(self, *args, **options):
+        # Movies often share a poster file (synthetic load-test movies always
+        # do), so each file is hashed and resized once
+        movies = Movie.objects.exclude(poster='').only('poster', 'poster_hash').order_by('poster', 'id')
+        posters = {}
+        for movie in movies.iterator():
+            posters.setdefault(movie.poster.name, movie)
+
+        hashed = written = failed = 0
+        for name, movie in posters.items():
+            try:
+                if options['rehash'] or not movie.poster_hash:
+                    with movie.poster.open('rb') as file:
+                        digest = content_hash(file)
+                    # New variant URLs change the movie responses, so their
+                    # Last-Modified and the showtime ETags must change too
+                    hashed += Movie.objects.filter(poster=name).exclude(poster_hash=digest).update(
+                        poster_hash=digest, updated_at=timezone.now(),
+                    )
+                    movie.poster_hash = digest
+                written += generate_variants(movie)
+            except OSError as e:
+                failed += 1
+                self.stderr.write(f'Skipping {name}: {e}')
+
+        if hashed:
+            # update() skips the signals that invalidate cached responses
+            bump_catalogue_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Hashed {hashed} movies, wrote {written} variants of {len(posters) - failed} posters'
+            + (f', {failed} unreadable' if failed else '')
+        ))
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from movies.cache import bump_schedule_version
+from movies.models import Movie, SeatLayout, Showtime
+from movies.sales import refresh_days
+from movies.scheduling import plan_schedule, run_time
+
+
+class Command(BaseCommand):
+    help = 'Packs showtimes onto screens for a range of days, around the showtimes already scheduled'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, default=None, help='First day, YYYY-MM-DD (default: tomorrow)')
+        parser.add_argument('--days', type=int, default=7, help='Days to schedule')
+        parser.add_argument('--screen', action='append', dest='screens', metavar='NAME=LAYOUT',
+                            help='A screen to fill and the name of its seat layout; repeat for more screens '
+                                 '(default: every screen already in use, with the layout it uses)')
+        parser.add_argument('--movie', action='append', type=int, dest='movies', metavar='ID',
+                            help='A movie to show; repeat for more (default: every movie)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be scheduled')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        start = options['start'] or date.today() + timedelta(days=1)
+        screens = self.get_screens(options['screens'])
+        movies = Movie.objects.order_by('id')
+        if options['movies']:
+            movies = movies.filter(pk__in=options['movies'])
+        movies = list(movies.values_list('id', 'duration'))
+        if not screens or not movies:
+            raise CommandError('Nothing to schedule: no screens or no movies')
+
+        slots = plan_schedule(movies, list(screens), start, options['days'])
+        busy = sum(run_time(slot.duration) for slot in slots)
+        self.stdout.write(
+            f"Planned {len(slots)} showtimes on {len(screens)} screens over {options['days']} days "
+            f"({busy / 60 / len(screens) / options['days']:.1f} screen hours a day per screen)"
+        )
+        if options['dry_run']:
+            return
+
+        showtimes = [
+            Showtime(
+                movie_id=slot.movie_id, date=slot.date, time=slot.time, screen=slot.screen,
+                seat_layout=screens[slot.screen], capacity=screens[slot.screen].get_grid().size,
+            )
+            for slot in slots
+        ]
+        with transaction.atomic():
+            showtimes = Showtime.objects.bulk_create(showtimes, batch_size=1000)
+            # bulk_create skips the signals that keep the daily sales rows and
+            # the upcoming showtimes listing in step
+            refresh_days(showtimes)
+            transaction.on_commit(bump_schedule_version)
+        self.stdout.write(self.style.SUCCESS(f'Successfully created {len(showtimes)} showtimes'))
+
+    def get_screens(self, specs):
+        """{screen name: SeatLayout}"""
+        if not specs:
+            in_use = Showtime.objects.exclude(seat_layout=None).values('screen').annotate(layout=Max('seat_layout'))
+            layouts = SeatLayout.objects.in_bulk({row['layout'] for row in in_use})
+            return {row['screen']: layouts[row['layout']] for row in in_use.order_by('screen')}
+
+        screens = {}
+        for spec in specs:
+            name, _, layout_name = spec.partition('=')
+            layout = SeatLayout.objects.filter(name=layout_name.strip()).order_by('id').first()
+            if not name.strip() or layout is None:
+                raise CommandError(f'Unknown screen or seat layout in --screen {spec!r}; use NAME=LAYOUT')
+            screens[name.strip()] = layout
+        return screens
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies.sales import rebuild_sales
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the sales rollups (per showtime, per movie per day, per screen per day) from the bookings in bulk'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = rebuild_sales()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {written} daily sales rows in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from movies.booking import reconcile_occupancy, run_locked
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the showtime occupancy counters (capacity, booked_count, is_sold_out) in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the showtimes that are out of date')
+        parser.add_argument('--rebuild-seat-maps', action='store_true',
+                            help='Also rebuild the seat maps of out of date showtimes from their reservations')
+
+    def handle(self, *args, **options):
+        stale_ids = reconcile_occupancy(dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f'{len(stale_ids)} showtimes have out of date occupancy: {stale_ids[:20]}')
+            return
+
+        if options['rebuild_seat_maps']:
+            for showtime_id in stale_ids:
+                run_locked(showtime_id, lambda showtime: showtime.rebuild_seat_map())
+        self.stdout.write(self.style.SUCCESS(f'Reconciled occupancy of {len(stale_ids)} showtimes'))
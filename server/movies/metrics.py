@@ -0,0 +1,250 @@
+"""
+Per-request performance metrics.
+
+``PerformanceMiddleware`` times a sample of requests (``PERF_METRICS_SAMPLE_RATE``)
+and records, per view:
+
+* wall time,
+* database time and query count, from an execute wrapper on every connection,
+* duplicate queries (the same SQL with the same parameters run more than once,
+  the usual sign of an N+1 lookup),
+* serializer time, the time spent building ``serializer.data``, for views
+  that opt in with ``SerializerTimingMixin`` or call ``serializer_data``.
+
+Sampled responses carry the numbers in a ``Server-Timing`` header, so they
+show up in the browser's network panel. Each process keeps the most recent
+samples in a ring buffer plus running totals per view, which the staff-only
+``/api/movies/metrics/`` endpoint renders in the Prometheus text format.
+"""
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+# Timings of the request being sampled in this context, if any
+_current = ContextVar('perf_request_timings', default=None)
+
+QUANTILES = [0.5, 0.95, 0.99]
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall = 0.0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.queries = Counter()
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_queries(self):
+        return sum(count - 1 for count in self.queries.values())
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper: time the query and remember it for duplicate detection"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            try:
+                self.queries[(sql, repr(params))] += 1
+            except TypeError:
+                self.queries[(sql, None)] += 1
+
+    @contextmanager
+    def capture_queries(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield
+
+    def server_timing(self):
+        return ', '.join([
+            f'total;dur={self.wall * 1000:.1f}',
+            f'db;dur={self.db * 1000:.1f};desc="{self.query_count} queries, {self.duplicate_queries} duplicates"',
+            f'serializer;dur={self.serializer * 1000:.1f}',
+        ])
+
+
+class MetricsRecorder:
+    """Recent samples in a ring buffer plus running totals per (view, method)"""
+
+    def __init__(self, size=None):
+        self.samples = deque(maxlen=size or settings.PERF_METRICS_BUFFER_SIZE)
+        self.totals = defaultdict(lambda: defaultdict(float))
+        self.lock = threading.Lock()
+
+    def record(self, view, method, status, timings):
+        key = (view, method)
+        with self.lock:
+            self.samples.append((key, timings.wall))
+            totals = self.totals[key]
+            totals['requests'] += 1
+            totals['errors'] += status >= 500
+            totals['wall'] += timings.wall
+            totals['db'] += timings.db
+            totals['serializer'] += timings.serializer
+            totals['queries'] += timings.query_count
+            totals['duplicates'] += timings.duplicate_queries
+
+    def render_prometheus(self):
+        """The totals and the ring buffer's latency quantiles in Prometheus text format"""
+        with self.lock:
+            totals = {key: dict(values) for key, values in self.totals.items()}
+            samples = list(self.samples)
+
+        recent = defaultdict(list)
+        for key, wall in samples:
+            recent[key].append(wall)
+
+        def labels(key, **extra):
+            pairs = {'view': key[0], 'method': key[1], **extra}
+            return ','.join(f'{name}="{value}"' for name, value in pairs.items())
+
+        lines = [
+            '# HELP movies_request_seconds Wall time of sampled requests; quantiles over the most recent samples',
+            '# TYPE movies_request_seconds summary',
+        ]
+        for key in sorted(totals):
+            walls = sorted(recent.get(key, []))
+            for quantile in QUANTILES if walls else []:
+                value = walls[min(len(walls) - 1, int(len(walls) * quantile))]
+                lines.append(f'movies_request_seconds{{{labels(key, quantile=quantile)}}} {value:.6f}')
+            lines.append(f"movies_request_seconds_sum{{{labels(key)}}} {totals[key]['wall']:.6f}")
+            lines.append(f"movies_request_seconds_count{{{labels(key)}}} {int(totals[key]['requests'])}")
+
+        for name, total, kind, help_text in [
+            ('movies_request_errors_total', 'errors', 'counter', 'Sampled requests that returned a 5xx status'),
+            ('movies_db_seconds_total', 'db', 'counter', 'Database time of sampled requests'),
+            ('movies_db_queries_total', 'queries', 'counter', 'Queries run by sampled requests'),
+            ('movies_db_duplicate_queries_total', 'duplicates', 'counter', 'Repeated identical queries in sampled requests'),
+            ('movies_serializer_seconds_total', 'serializer', 'counter', 'Serializer time of sampled requests'),
+        ]:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key in sorted(totals):
+                value = totals[key][total]
+                lines.append(f'{name}{{{labels(key)}}} {value:.6f}' if total in ('db', 'serializer')
+                             else f'{name}{{{labels(key)}}} {int(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.totals.clear()
+
+
+_recorder = None
+
+
+def get_recorder():
+    global _recorder
+    if _recorder is None:
+        _recorder = MetricsRecorder()
+    return _recorder
+
+
+def serializer_data(serializer):
+    """``serializer.data``, timed when the request is sampled"""
+    timings = _current.get()
+    if timings is None:
+        return serializer.data
+    start = time.perf_counter()
+    try:
+        return serializer.data
+    finally:
+        timings.serializer += time.perf_counter() - start
+
+
+class TimedSerializer:
+    """A serializer whose ``data`` is timed; everything else is passed through"""
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+
+    def __getattr__(self, name):
+        return getattr(self.serializer, name)
+
+    @property
+    def data(self):
+        return serializer_data(self.serializer)
+
+
+class SerializerTimingMixin:
+    """
+    For DRF generic views: time the output of the serializers they build.
+
+    Nested serializers use to_representation rather than ``data``, so each
+    response is counted exactly once.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        return TimedSerializer(super().get_serializer(*args, **kwargs))
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name if match else None) or 'unresolved'
+
+
+class PerformanceMiddleware:
+    """Sample requests into the metrics recorder and add a Server-Timing header"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = settings.PERF_METRICS_SAMPLE_RATE
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            with timings.capture_queries():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        # Sync ORM work runs in the request's thread-sensitive executor thread,
+        # where the connections (and so the execute wrappers) live
+        timings = RequestTimings()
+        token = _current.set(timings)
+        stack = ExitStack()
+        await sync_to_async(stack.enter_context)(timings.capture_queries())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        timings.wall = time.perf_counter() - timings.started
+        get_recorder().record(view_name(request), request.method, response.status_code, timings)
+        response['Server-Timing'] = timings.server_timing()
+        return response
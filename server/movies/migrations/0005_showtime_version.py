@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_seatlayout_showtime_booking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_showtime_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seat_id', models.CharField(max_length=10)),
+                ('state', models.CharField(choices=[('booked', 'Booked')], default='booked', max_length=10)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='movies.booking')),
+                ('showtime', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='movies.showtime')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='seatreservation',
+            constraint=models.UniqueConstraint(fields=('showtime', 'seat_id'), name='unique_showtime_seat'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def forwards(apps, schema_editor):
+    """Copy Showtime.booked_seats into SeatReservation rows, linking each seat to its booking"""
+    Showtime = apps.get_model('movies', 'Showtime')
+    Booking = apps.get_model('movies', 'Booking')
+    SeatReservation = apps.get_model('movies', 'SeatReservation')
+
+    for showtime in Showtime.objects.exclude(booked_seats=[]).iterator():
+        seat_bookings = {}
+        for booking_id, seats in Booking.objects.filter(showtime=showtime).order_by('id').values_list('id', 'seats'):
+            for seat_id in seats or []:
+                seat_bookings.setdefault(seat_id, booking_id)
+
+        SeatReservation.objects.bulk_create([
+            SeatReservation(showtime=showtime, seat_id=seat_id, booking_id=seat_bookings.get(seat_id))
+            for seat_id in dict.fromkeys(showtime.booked_seats)
+        ])
+
+
+def backwards(apps, schema_editor):
+    Showtime = apps.get_model('movies', 'Showtime')
+    SeatReservation = apps.get_model('movies', 'SeatReservation')
+
+    for showtime in Showtime.objects.all().iterator():
+        showtime.booked_seats = list(
+            SeatReservation.objects.filter(showtime=showtime).order_by('id').values_list('seat_id', flat=True)
+        )
+        showtime.save(update_fields=['booked_seats'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_seatreservation'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_migrate_booked_seats'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='showtime',
+            name='booked_seats',
+        ),
+    ]
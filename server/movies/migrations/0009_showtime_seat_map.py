@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+from movies.seatmap import get_grid
+
+
+def build_seat_maps(apps, schema_editor):
+    """Fill seat_map from the existing reservation rows"""
+    Showtime = apps.get_model('movies', 'Showtime')
+    SeatReservation = apps.get_model('movies', 'SeatReservation')
+
+    for showtime in Showtime.objects.exclude(seat_layout=None).select_related('seat_layout').iterator():
+        grid = get_grid(showtime.seat_layout.rows, showtime.seat_layout.seats_per_row)
+        bitmap = 0
+        for seat_id in SeatReservation.objects.filter(showtime=showtime).values_list('seat_id', flat=True):
+            if seat_id in grid.index:
+                bitmap |= 1 << grid.index[seat_id]
+        if bitmap:
+            showtime.seat_map = grid.to_bytes(bitmap)
+            showtime.save(update_fields=['seat_map'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_remove_showtime_booked_seats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='seat_map',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.RunPython(build_seat_maps, migrations.RunPython.noop),
+    ]
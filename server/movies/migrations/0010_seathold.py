@@ -0,0 +1,46 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:11
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_showtime_seat_map'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='holds_expire_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='seatreservation',
+            name='state',
+            field=models.CharField(choices=[('held', 'Held'), ('booked', 'Booked')], default='booked', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('seats', models.JSONField()),
+                ('user_email', models.EmailField(blank=True, max_length=254)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('showtime', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='movies.showtime')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='seatreservation',
+            name='hold',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='movies.seathold'),
+        ),
+        migrations.AddIndex(
+            model_name='seathold',
+            index=models.Index(fields=['showtime', 'expires_at'], name='movies_seat_showtim_5f9531_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_FIELDS = ['title', 'director', 'cast', 'writers', 'short_description', 'description']
+
+
+def create_search_index(apps, schema_editor):
+    """Create and fill the full-text index for the current database"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        Movie = apps.get_model('movies', 'Movie')
+        Movie.objects.update(search_vector=(
+            SearchVector('title', weight='A', config='english')
+            + SearchVector('director', 'cast', 'writers', weight='B', config='english')
+            + SearchVector('short_description', 'description', weight='C', config='english')
+        ))
+        schema_editor.execute(
+            "CREATE INDEX movies_movie_search_gin ON movies_movie USING gin (search_vector)"
+        )
+    elif vendor == 'sqlite':
+        columns = ', '.join(f'"{field}"' for field in SEARCH_FIELDS)
+        sources = ', '.join(f'COALESCE("{field}", \'\')' for field in SEARCH_FIELDS)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE movies_movie_fts USING fts5({columns}, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO movies_movie_fts (rowid, {columns}) SELECT id, {sources} FROM movies_movie"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS movies_movie_search_gin")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS movies_movie_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_movie_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
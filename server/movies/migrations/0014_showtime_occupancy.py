@@ -0,0 +1,46 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_occupancy(apps, schema_editor):
+    """Set the counters from the layouts and the reservation rows"""
+    Showtime = apps.get_model('movies', 'Showtime')
+    SeatLayout = apps.get_model('movies', 'SeatLayout')
+    SeatReservation = apps.get_model('movies', 'SeatReservation')
+    taken = SeatReservation.objects.filter(showtime=OuterRef('pk')).order_by().values('showtime').annotate(
+        count=Count('*')
+    ).values('count')
+    for layout in SeatLayout.objects.all():
+        capacity = len(layout.rows.split(',')) * layout.seats_per_row
+        showtimes = Showtime.objects.filter(seat_layout=layout)
+        showtimes.update(capacity=capacity, booked_count=Coalesce(Subquery(taken), Value(0)))
+        showtimes.filter(capacity__gt=0, booked_count__gte=capacity).update(is_sold_out=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0013_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='booked_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='showtime',
+            name='capacity',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='showtime',
+            name='is_sold_out',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(fill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0014_showtime_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], default='confirmed', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='showtime',
+            name='is_cancelled',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0015_booking_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='poster_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0016_movie_poster_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['booking_time'], name='booking_time_idx'),
+        ),
+    ]
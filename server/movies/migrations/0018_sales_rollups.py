@@ -0,0 +1,95 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:56
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_sales(apps, schema_editor):
+    """Roll up the existing bookings, as sales.rebuild_sales does"""
+    Showtime = apps.get_model('movies', 'Showtime')
+    Booking = apps.get_model('movies', 'Booking')
+    SeatReservation = apps.get_model('movies', 'SeatReservation')
+    zero = Value(Decimal('0.00'), output_field=DecimalField())
+    tickets = SeatReservation.objects.filter(
+        showtime=OuterRef('pk'), state='booked', booking__isnull=False,
+    ).order_by().values('showtime').annotate(count=Count('*')).values('count')
+    revenue = Booking.objects.filter(showtime=OuterRef('pk'), status='confirmed').order_by().values(
+        'showtime'
+    ).annotate(total=Sum('amount_paid')).values('total')
+    Showtime.objects.update(tickets_sold=Coalesce(Subquery(tickets), 0), revenue=Coalesce(Subquery(revenue), zero))
+
+    running = Q(is_cancelled=False)
+    totals = {
+        'showtimes': Count('pk', filter=running),
+        'capacity': Coalesce(Sum('capacity', filter=running), 0),
+        'tickets_sold': Coalesce(Sum('tickets_sold'), 0),
+        'revenue': Coalesce(Sum('revenue'), zero),
+    }
+    for name, key in [('MovieDailySales', ['movie_id', 'date']), ('ScreenDailySales', ['screen', 'date'])]:
+        model = apps.get_model('movies', name)
+        rows = Showtime.objects.order_by().values(*key).annotate(**totals)
+        model.objects.bulk_create((model(**row) for row in rows.iterator(chunk_size=1000)), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0017_booking_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='showtime',
+            name='tickets_sold',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='MovieDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('showtimes', models.PositiveIntegerField(default=0)),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('tickets_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='movies.movie')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScreenDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('showtimes', models.PositiveIntegerField(default=0)),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('tickets_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('screen', models.CharField(max_length=50)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='screen_daily_sales_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='screendailysales',
+            constraint=models.UniqueConstraint(fields=('screen', 'date'), name='unique_screen_daily_sales'),
+        ),
+        migrations.AddIndex(
+            model_name='moviedailysales',
+            index=models.Index(fields=['date'], name='movie_daily_sales_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='moviedailysales',
+            constraint=models.UniqueConstraint(fields=('movie', 'date'), name='unique_movie_daily_sales'),
+        ),
+        migrations.RunPython(fill_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0018_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movie',
+            name='poster_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=16),
+        ),
+    ]
@@ -1,4 +1,11 @@
-from django.db import models
+import uuid
+
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
+
+from .seatmap import from_bytes, get_grid
 
 
 class Movie(models.Model):
@@ -16,7 +23,20 @@ class Movie(models.Model):
     cast = models.TextField(blank=True, null=True)
     writers = models.TextField(blank=True, null=True)
     poster = models.ImageField(upload_to='movie-posters/')
+    # Content hash of the poster, naming its resized variants (see posters.py)
+    poster_hash = models.CharField(max_length=16, blank=True, default='', editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Weighted full-text index, maintained on PostgreSQL only (see search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    class Meta:
+        indexes = [
+            # ?genre= with ?release_date= (a year range) and the sortable columns
+            models.Index(fields=['genre', 'release_date'], name='movie_genre_release_idx'),
+            models.Index(fields=['release_date'], name='movie_release_date_idx'),
+            models.Index(fields=['title'], name='movie_title_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -27,6 +47,11 @@ class Movie(models.Model):
             return self.poster.url
         return None
 
+    @property
+    def poster_variants(self):
+        from .posters import variant_urls
+        return variant_urls(self.poster_hash) if self.poster else {}
+
 class SeatLayout(models.Model):
     name = models.CharField(max_length=50)  # e.g., "Standard", "IMAX", "VIP"
     rows = models.CharField(max_length=50)  # e.g., "A,B,C,D,E,F,G,H"
@@ -38,13 +63,13 @@ class SeatLayout(models.Model):
     def get_rows(self):
         return self.rows.split(',')
     
+    def get_grid(self):
+        """Returns the cached seat numbering used by seat map bitmaps"""
+        return get_grid(self.rows, self.seats_per_row)
+    
     def get_all_seats(self):
         """Returns a list of all seat identifiers in this layout"""
-        seats = []
-        for row in self.get_rows():
-            for num in range(1, self.seats_per_row + 1):
-                seats.append(f"{row}{num}")
-        return seats
+        return list(self.get_grid().seat_ids)
 
 class Showtime(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='showtimes')
@@ -52,46 +77,260 @@ class Showtime(models.Model):
     time = models.TimeField()
     screen = models.CharField(max_length=50)
     seat_layout = models.ForeignKey(SeatLayout, on_delete=models.CASCADE, related_name='showtimes', null=True, blank=True)
-    booked_seats = models.JSONField(default=list)  # Stores a list of booked seat IDs like ["A1", "B5", "C3"]
+    version = models.PositiveIntegerField(default=0)  # Bumped on every reservation
+    seat_map = models.BinaryField(default=bytes, editable=False)  # Bitmap of taken (booked or held) seats, see seatmap.py
+    holds_expire_at = models.DateTimeField(blank=True, null=True, editable=False, db_index=True)  # Earliest expiry among active seat holds
+    # Occupancy for listings, kept in step with seat_map by the booking engine
+    # (see update_occupancy) and recomputed by the reconcile_occupancy command
+    capacity = models.PositiveIntegerField(default=0, editable=False)
+    booked_count = models.PositiveIntegerField(default=0, editable=False)  # Booked or held seats
+    is_sold_out = models.BooleanField(default=False, editable=False)
+    # Cancelled showtimes take no bookings; see booking.cancel_showtime
+    is_cancelled = models.BooleanField(default=False, editable=False)
+    # Sales rollup: seats and takings of confirmed bookings (see sales.py)
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    
+    class Meta:
+        indexes = [
+            # Showtime list filters: ?movie=&date= and ?date= on its own
+            models.Index(fields=['movie', 'date', 'time'], name='showtime_movie_date_time_idx'),
+            models.Index(fields=['date', 'time'], name='showtime_date_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.movie.title} - {self.date} {self.time} - {self.screen}"
     
+    def clean(self):
+        # Two showtimes may not share a screen at the same time (cleaning included)
+        if self.movie_id and self.date and self.time and self.screen and not self.is_cancelled:
+            from .scheduling import check_showtime
+            conflict = check_showtime(self)
+            if conflict:
+                raise ValidationError({'time': f"{self.screen} is not free: {conflict}"})
+    
+    def save(self, *args, **kwargs):
+        # A new or re-laid-out showtime needs its capacity; the engine saves
+        # the counters itself with update_fields
+        if kwargs.get('update_fields') is not None:
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get('using')):
+            relaid = False
+            if not self._state.adding:
+                # Never write back a stale copy of the seat map and counters
+                from .booking import refresh_locked_fields
+                locked = refresh_locked_fields(self)
+                # The seat map is numbered by the layout it was taken on
+                relaid = locked is not None and locked.seat_layout_id != self.seat_layout_id
+            if relaid:
+                self.rebuild_seat_map()
+            else:
+                self.update_occupancy()
+            super().save(*args, **kwargs)
+    
+    @property
+    def seats_left(self):
+        return max(self.capacity - self.booked_count, 0)
+    
+    @property
+    def fill_rate(self):
+        return round(self.tickets_sold / self.capacity, 4) if self.capacity else 0.0
+    
+    def update_occupancy(self):
+        """Recompute capacity, booked_count and is_sold_out from the layout and seat map, without a query"""
+        if not self.seat_layout_id:
+            self.capacity = self.booked_count = 0
+            self.is_sold_out = False
+            return
+        grid = self.seat_layout.get_grid()
+        self.capacity = grid.size
+        self.booked_count = (self.taken_seats_bitmap & grid.full).bit_count()
+        self.is_sold_out = self.booked_count >= self.capacity
+    
+    @property
+    def taken_seats_bitmap(self):
+        return from_bytes(self.seat_map)
+    
+    def has_expired_holds(self, now=None):
+        """Check, without a query, whether any seat hold on this showtime has lapsed"""
+        return self.holds_expire_at is not None and self.holds_expire_at <= (now or timezone.now())
+    
     def is_seat_booked(self, seat_id):
         """Check if a specific seat is booked"""
-        return seat_id in self.booked_seats
+        if not self.seat_layout:
+            return self.reservations.filter(seat_id=seat_id).exists()
+        i = self.seat_layout.get_grid().index.get(seat_id)
+        return i is not None and bool(self.taken_seats_bitmap >> i & 1)
     
     def book_seats(self, seat_ids):
-        """Book multiple seats"""
-        for seat_id in seat_ids:
-            if seat_id not in self.booked_seats:
-                self.booked_seats.append(seat_id)
-        self.save()
+        """Atomically book multiple seats, raising SeatUnavailableError if any is taken"""
+        from .booking import reserve_seats
+
+        showtime = reserve_seats(self.pk, seat_ids)
+        self.seat_map = showtime.seat_map
+        self.version = showtime.version
     
     def get_available_seats(self):
         """Get a list of available seat IDs"""
         if not self.seat_layout:
             return []
-        all_seats = self.seat_layout.get_all_seats()
-        return [seat for seat in all_seats if seat not in self.booked_seats]
+        grid = self.seat_layout.get_grid()
+        return grid.seats(grid.available(self.taken_seats_bitmap))
     
     def get_booked_seats(self):
-        """Get a list of booked seat IDs"""
-        return self.booked_seats
+        """Get a list of booked (or held) seat IDs"""
+        if not self.seat_layout:
+            return list(self.reservations.order_by('id').values_list('seat_id', flat=True))
+        return self.seat_layout.get_grid().seats(self.taken_seats_bitmap)
+    
+    def get_seat_map(self):
+        """Get the taken-seat bitmap in its base64 wire format"""
+        if not self.seat_layout:
+            return None
+        return self.seat_layout.get_grid().encode(self.taken_seats_bitmap)
+    
+    def rebuild_seat_map(self):
+        """Recompute seat_map from the reservation rows (e.g. after a layout change)"""
+        seat_ids = self.reservations.values_list('seat_id', flat=True)
+        grid = self.seat_layout.get_grid() if self.seat_layout else None
+        bitmap = 0
+        if grid:
+            for seat_id in seat_ids:
+                i = grid.index.get(seat_id)
+                if i is not None:
+                    bitmap |= 1 << i
+        self.seat_map = grid.to_bytes(bitmap) if grid else b''
+        self.update_occupancy()
 
 class Booking(models.Model):
+    CONFIRMED = 'confirmed'
+    CANCELLED = 'cancelled'
+    REFUNDED = 'refunded'
+    STATUS_CHOICES = [
+        (CONFIRMED, 'Confirmed'),
+        (CANCELLED, 'Cancelled'),
+        (REFUNDED, 'Refunded'),
+    ]
+
     user_email = models.EmailField()
     user_name = models.CharField(max_length=100)
     showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE, related_name='bookings')
     seats = models.JSONField()  # Stores a list of seat IDs like ["A1", "B5", "C3"]
     booking_time = models.DateTimeField(auto_now_add=True)
     amount_paid = models.DecimalField(max_digits=8, decimal_places=2, default=190.00)
+    # Cancelling releases the seats; see booking.cancel_booking
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=CONFIRMED, editable=False)
+    cancelled_at = models.DateTimeField(blank=True, null=True, editable=False)
+    
+    class Meta:
+        indexes = [
+            # A user's bookings, newest first
+            models.Index(fields=['user_email', 'booking_time'], name='booking_user_time_idx'),
+            # Date range exports (see export.py)
+            models.Index(fields=['booking_time'], name='booking_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user_name} - {self.showtime}"
     
     def save(self, *args, **kwargs):
-        # Book the seats in the showtime
-        if not self.pk:  # Only when creating a new booking
-            self.showtime.book_seats(self.seats)
-        super().save(*args, **kwargs)
+        if self.pk:
+            return super().save(*args, **kwargs)
+
+        # New bookings reserve their seats and insert the booking row in the
+        # same transaction, so a failed reservation never leaves a booking behind
+        from .booking import reserve_seats
+
+        def insert_booking(showtime):
+            self.pk = None  # The engine may retry after a rolled back attempt
+            self.showtime = showtime
+            super(Booking, self).save(*args, **kwargs)
+            return self
+
+        reserve_seats(self.showtime_id, self.seats, create_booking=insert_booking)
+
+class SeatHold(models.Model):
+    """Seats held for a user during checkout; released once expires_at has passed"""
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE, related_name='holds')
+    seats = models.JSONField()  # Stores a list of seat IDs like ["A1", "B5", "C3"]
+    user_email = models.EmailField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['showtime', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.token} - {self.showtime_id} (until {self.expires_at})"
+
+    def is_expired(self, now=None):
+        return self.expires_at <= (now or timezone.now())
+
+class SeatReservation(models.Model):
+    """A single seat taken for a showtime; the unique constraint rules out double-booking"""
+    HELD = 'held'
+    BOOKED = 'booked'
+    STATE_CHOICES = [
+        (HELD, 'Held'),
+        (BOOKED, 'Booked'),
+    ]
+
+    showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE, related_name='reservations')
+    seat_id = models.CharField(max_length=10)
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='reservations', null=True, blank=True)
+    hold = models.ForeignKey(SeatHold, on_delete=models.CASCADE, related_name='reservations', null=True, blank=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=BOOKED)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['showtime', 'seat_id'], name='unique_showtime_seat'),
+        ]
+
+    def __str__(self):
+        return f"{self.seat_id} - {self.showtime_id} ({self.state})"
+
+class DailySales(models.Model):
+    """Sales and capacity of a day's showtimes, rolled up for reporting (see sales.py)"""
+    date = models.DateField()  # The showtimes' date
+    showtimes = models.PositiveIntegerField(default=0)  # Not cancelled
+    capacity = models.PositiveIntegerField(default=0)
+    tickets_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def fill_rate(self):
+        return round(self.tickets_sold / self.capacity, 4) if self.capacity else 0.0
+
+class MovieDailySales(DailySales):
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='daily_sales')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'date'], name='unique_movie_daily_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='movie_daily_sales_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.movie_id} - {self.date}"
+
+class ScreenDailySales(DailySales):
+    screen = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['screen', 'date'], name='unique_screen_daily_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='screen_daily_sales_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.screen} - {self.date}"
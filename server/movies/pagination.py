@@ -0,0 +1,243 @@
+"""
+Pagination for the list endpoints.
+
+Lists are paginated by page number by default, as before. Clients can opt in
+per request to:
+
+* keyset (cursor) pagination with ``?pagination=cursor``: pages are fetched
+  with ``WHERE (key1, key2, ...) > (last row's keys)`` on an indexed,
+  unique ordering instead of ``OFFSET``, and there is no ``COUNT(*)``. The
+  response has ``next``/``previous`` links carrying an opaque ``cursor``.
+* an approximate total with ``?count=approximate``: rows are counted up to
+  ``APPROXIMATE_COUNT_LIMIT`` and above that the total is estimated (from the
+  query planner on PostgreSQL). The response then includes
+  ``"count_approximate": true``. Works in both modes.
+"""
+import base64
+import datetime
+import decimal
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connection
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Rows counted exactly before the total is estimated
+APPROXIMATE_COUNT_LIMIT = 10000
+
+
+def approximate_count(queryset, limit=None):
+    """Return (count, exact): the exact count up to limit, an estimate above it"""
+    limit = limit or APPROXIMATE_COUNT_LIMIT
+    queryset = queryset.order_by()
+    count = queryset[:limit + 1].count()
+    if count <= limit:
+        return count, True
+    if connection.vendor == 'postgresql':
+        plan = json.loads(queryset.explain(format='json'))
+        return max(limit, int(plan[0]['Plan']['Plan Rows'])), False
+    return limit, False
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Page number paginator whose total may be estimated.
+
+    Pages are not clipped to the (estimated) count; each page fetches one row
+    more than it shows to tell whether there is a next page.
+    """
+
+    @cached_property
+    def count(self):
+        count, self.count_exact = approximate_count(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return LookaheadPage(rows[:self.per_page], number, self, has_more=len(rows) > self.per_page)
+
+
+class LookaheadPage(Page):
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+
+def encode_key(value):
+    # Full precision: DjangoJSONEncoder would cut datetimes to milliseconds
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def count_requested(request):
+    return request.query_params.get('count') == 'approximate'
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite, unique ordering.
+
+    The keys come from ``?ordering=`` (through the view's OrderingFilter), else
+    the ordering already on the queryset (e.g. search relevance), else the
+    view's ``keyset_ordering``; the primary key is appended as a tiebreaker.
+    Nulls sort as the smallest value in every direction.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 12
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.keys = self.get_keys(request, queryset, view)
+        self.count = approximate_count(queryset) if count_requested(request) else None
+
+        position, reverse = self.decode_cursor(request)
+        keys = [(name, not descending if reverse else descending) for name, descending in self.keys]
+        queryset = queryset.order_by(*[
+            F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_first=True)
+            for name, descending in keys
+        ])
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(keys, position))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound('Invalid cursor')
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.rows = rows
+        return rows
+
+    def get_keys(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering and all(isinstance(field, str) for field in queryset.query.order_by):
+            ordering = queryset.query.order_by
+        if not ordering:
+            ordering = view.keyset_ordering
+
+        keys = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        keys = [('id' if name == 'pk' else name, descending) for name, descending in keys]
+        if 'id' not in [name for name, _ in keys]:
+            keys.append(('id', keys[-1][1] if keys else False))
+        return keys
+
+    def after(self, keys, position):
+        """Rows strictly after position in the (name, descending) key order"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(keys, position):
+            if value is None:
+                # Null is the smallest value: everything non-null follows it
+                # going up, nothing does going down
+                later = Q(pk__in=[]) if descending else Q(**{f'{name}__isnull': False})
+                same = Q(**{f'{name}__isnull': True})
+            elif descending:
+                later = Q(**{f'{name}__lt': value}) | Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            else:
+                later = Q(**{f'{name}__gt': value})
+                same = Q(**{name: value})
+            condition |= equal & later
+            equal &= same
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = cursor['k'], bool(cursor.get('r'))
+            if not isinstance(position, list) or len(position) != len(self.keys):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound('Invalid cursor')
+        return position, reverse
+
+    def encode_cursor(self, row, reverse=False):
+        position = [encode_key(getattr(row, name)) for name, _ in self.keys]
+        cursor = json.dumps({'k': position, 'r': True} if reverse else {'k': position})
+        url = remove_query_param(self.base_url, 'page')
+        return replace_query_param(url, self.cursor_query_param, base64.urlsafe_b64encode(cursor.encode()).decode())
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.rows:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        body = {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+        if self.count is not None:
+            body['count'], exact = self.count
+            body['count_approximate'] = not exact
+        body['results'] = data
+        return Response(body)
+
+
+class ListPagination(PageNumberPagination):
+    """
+    Page number pagination with per-request opt-ins for keyset pagination
+    (``?pagination=cursor``) and approximate totals (``?count=approximate``).
+    Views set ``keyset_ordering`` to the unique, indexed key to page over.
+    """
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+            self.keyset = KeysetPagination()
+            self.keyset.page_size = self.get_page_size(request)
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        self.keyset = None
+        self.django_paginator_class = ApproximateCountPaginator if count_requested(request) else Paginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        response = super().get_paginated_response(data)
+        if isinstance(self.page.paginator, ApproximateCountPaginator):
+            response.data['count_approximate'] = not self.page.paginator.count_exact
+        return response
@@ -0,0 +1,94 @@
+"""
+Resized WebP variants of movie posters.
+
+Each poster is identified by a hash of its content (``Movie.poster_hash``),
+worked out when a new poster is saved (see ``signals.py``). Variants are
+WebP images scaled to each of ``POSTER_WIDTHS`` and stored next to the
+originals under ``poster-variants/<hash>/<width>.webp``:
+
+* eagerly, right after a new poster is uploaded,
+* lazily, the first time a variant URL is requested (posters uploaded before
+  the pipeline existed, or a width added later), and
+* in bulk by the ``generate_poster_variants`` command.
+
+Variant URLs embed the content hash, so a new poster gets new URLs and the
+responses can be cached by browsers and CDNs forever.
+"""
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+VARIANT_PATH = 'poster-variants/{digest}/{width}.webp'
+
+# Far-future caching for content-addressed URLs
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def content_hash(file):
+    """Hash of an uploaded or stored file's content, for use in URLs"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()[:16]
+
+
+def variant_name(digest, width):
+    return VARIANT_PATH.format(digest=digest, width=width)
+
+
+def variant_urls(digest):
+    """{width: url} of a poster's variants; srcset-ready, generated on demand"""
+    if not digest:
+        return {}
+    return {width: reverse('poster-variant', args=[digest, width]) for width in settings.POSTER_WIDTHS}
+
+
+def render_variant(image, width):
+    """WebP bytes of image scaled down (never up) to width"""
+    image = image.copy()
+    image.thumbnail((width, width * 10), Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, 'WEBP', quality=settings.POSTER_WEBP_QUALITY, method=4)
+    return output.getvalue()
+
+
+def open_poster(poster):
+    with poster.open('rb') as file:
+        image = Image.open(file)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    return image if image.mode in ('RGB', 'RGBA') else image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+
+def generate_variants(movie, widths=None):
+    """
+    Write the missing variants of a movie's poster; returns how many were written.
+
+    The original is decoded at most once, and only if some variant is missing.
+    """
+    if not movie.poster or not movie.poster_hash:
+        return 0
+    missing = [
+        width for width in widths or settings.POSTER_WIDTHS
+        if not default_storage.exists(variant_name(movie.poster_hash, width))
+    ]
+    if not missing:
+        return 0
+    image = open_poster(movie.poster)
+    for width in missing:
+        save_variant(variant_name(movie.poster_hash, width), render_variant(image, width))
+    return len(missing)
+
+
+def save_variant(name, content):
+    saved = default_storage.save(name, ContentFile(content))
+    # Another request wrote the same variant first; the storage kept both
+    if saved != name:
+        default_storage.delete(saved)
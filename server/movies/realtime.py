@@ -0,0 +1,69 @@
+"""
+Live seat availability events.
+
+The booking engine publishes a small delta for every committed change to a
+showtime's seats::
+
+    {"showtime": 1, "version": 7, "booked": ["A1"], "held": [], "released": []}
+
+Subscribers (the server-sent events stream in ``views.showtime_events``)
+receive the deltas through a broker. The default broker fans out in-process,
+which is enough for a single ASGI server; set ``SEAT_EVENTS_BROKER`` to the
+dotted path of another class with the same ``publish``/``subscribe``
+interface (e.g. one backed by Redis pub/sub) to fan out across processes.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_broker = None
+
+
+class InProcessBroker:
+    """Fans events out to subscribers in this process"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, showtime_id, event):
+        """Deliver event to every subscriber of the showtime; safe to call from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(showtime_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    @asynccontextmanager
+    async def subscribe(self, showtime_id):
+        """Async context manager yielding an asyncio.Queue of the showtime's events"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[showtime_id].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers[showtime_id].discard(subscriber)
+                if not self._subscribers[showtime_id]:
+                    del self._subscribers[showtime_id]
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.SEAT_EVENTS_BROKER)()
+    return _broker
+
+
+def set_broker(broker):
+    """Replace the broker, e.g. with a local stand-in in tests; None reloads it from settings"""
+    global _broker
+    _broker = broker
+
+
+def publish_seat_event(showtime_id, event):
+    get_broker().publish(showtime_id, event)
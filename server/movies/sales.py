@@ -0,0 +1,171 @@
+"""
+Sales and occupancy rollups for reporting.
+
+Working out revenue and fill rate per movie per day from the bookings means
+reading every booking (and counting the seats in each one's JSON list).
+Instead, sales are rolled up as they happen:
+
+* per showtime, in ``Showtime.tickets_sold`` and ``Showtime.revenue``, saved
+  with the other counters under the showtime lock;
+* per movie per day (``MovieDailySales``) and per screen per day
+  (``ScreenDailySales``), by showtime date, together with the number of
+  showtimes and their capacity for fill rates.
+
+Only confirmed bookings are sales. The booking engine adds each booking as it
+is made and takes it off again when it is cancelled, in the same transaction
+(``record_sales``). The showtime counts and capacities of the daily rows are
+recomputed from the day's showtimes when a showtime is saved, deleted or
+cancelled (``refresh_daily_sales``). ``rebuild_sales`` recomputes every
+rollup in bulk, e.g. after loading data with raw SQL.
+"""
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Booking, MovieDailySales, ScreenDailySales, SeatReservation, Showtime
+
+# Rows written per bulk insert when rebuilding
+REBUILD_BATCH_SIZE = 1000
+
+ZERO = Value(Decimal('0.00'), output_field=DecimalField())
+
+
+def daily_keys(showtime):
+    """The (rollup model, key) pairs a showtime counts towards; keys are Showtime lookups too"""
+    return [
+        (MovieDailySales, {'movie_id': showtime.movie_id, 'date': showtime.date}),
+        (ScreenDailySales, {'screen': showtime.screen, 'date': showtime.date}),
+    ]
+
+
+def daily_totals():
+    """Aggregates of a group of showtimes matching the DailySales columns"""
+    running = Q(is_cancelled=False)
+    return {
+        'showtimes': Count('pk', filter=running),
+        'capacity': Coalesce(Sum('capacity', filter=running), 0),
+        'tickets_sold': Coalesce(Sum('tickets_sold'), 0),
+        'revenue': Coalesce(Sum('revenue'), ZERO),
+    }
+
+
+def record_sales(sales):
+    """
+    Add sales to the rollups of locked showtimes: sales is a list of
+    (showtime, tickets, revenue), with negative numbers for cancellations.
+    The showtimes' own counters are saved by the engine; each daily table
+    gets one UPDATE however many showtimes and days there are.
+    """
+    deltas = {MovieDailySales: {}, ScreenDailySales: {}}
+    for showtime, tickets, revenue in sales:
+        revenue = Decimal(str(revenue))
+        showtime.tickets_sold += tickets
+        showtime.revenue += revenue
+        for model, key in daily_keys(showtime):
+            entry = deltas[model].setdefault(tuple(key.items()), [0, Decimal(0), []])
+            entry[0] += tickets
+            entry[1] += revenue
+            entry[2].append(showtime)
+
+    for model, keyed in deltas.items():
+        matches = [(Q(**dict(key)), tickets, revenue) for key, (tickets, revenue, _) in keyed.items()]
+        rows = model.objects.filter(reduce(or_, [match for match, _, _ in matches]))
+        updated = rows.update(
+            tickets_sold=F('tickets_sold') + Case(
+                *[When(match, then=Value(tickets)) for match, tickets, _ in matches], default=Value(0),
+            ),
+            revenue=F('revenue') + Case(
+                *[When(match, then=Value(revenue)) for match, _, revenue in matches], default=ZERO,
+                output_field=DecimalField(),
+            ),
+        )
+        if updated < len(keyed):
+            # Days whose showtimes were inserted in bulk and never rolled up
+            fields = [name for name, _ in next(iter(keyed))]
+            existing = set(rows.values_list(*fields))
+            for key, (_, _, showtimes) in keyed.items():
+                if tuple(value for _, value in key) not in existing:
+                    _refresh(model, dict(key), pending=showtimes)
+
+
+def refresh_daily_sales(showtime, pending=False):
+    """
+    Recompute the daily rows a showtime counts towards from that day's
+    showtimes. With pending, the showtime's unsaved counters are used in place
+    of its row, for callers holding the showtime lock.
+    """
+    for model, key in daily_keys(showtime):
+        _refresh(model, key, pending=[showtime] if pending else ())
+
+
+def refresh_days(showtimes):
+    """refresh_daily_sales for saved showtimes inserted in bulk, each daily row once"""
+    keys = dict.fromkeys(
+        (model, tuple(key.items())) for showtime in showtimes for model, key in daily_keys(showtime)
+    )
+    for model, key in keys:
+        _refresh(model, dict(key))
+
+
+def _refresh(model, key, pending=()):
+    pending = list({showtime.pk: showtime for showtime in pending}.values())
+    totals = Showtime.objects.filter(**key).exclude(pk__in=[showtime.pk for showtime in pending]).aggregate(
+        scheduled=Count('pk'), **daily_totals()
+    )
+    if not totals.pop('scheduled') and not pending:
+        # The day's last showtime moved or was deleted
+        model.objects.filter(**key).delete()
+        return
+    for showtime in pending:
+        if not showtime.is_cancelled:
+            totals['showtimes'] += 1
+            totals['capacity'] += showtime.capacity
+        totals['tickets_sold'] += showtime.tickets_sold
+        totals['revenue'] += showtime.revenue
+
+    if model.objects.filter(**key).update(**totals):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **totals)
+    except IntegrityError:
+        # Created concurrently for another showtime of the same day
+        model.objects.filter(**key).update(**totals)
+
+
+def rebuild_sales():
+    """
+    Recompute every rollup from the bookings with set-based statements.
+
+    Tickets are counted from the booked reservation rows rather than the
+    bookings' seat lists, so nothing is read into Python but the grouped daily
+    rows. Returns the number of daily rows written.
+    """
+    tickets = SeatReservation.objects.filter(
+        showtime=OuterRef('pk'), state=SeatReservation.BOOKED, booking__isnull=False,
+    ).order_by().values('showtime').annotate(count=Count('*')).values('count')
+    revenue = Booking.objects.filter(showtime=OuterRef('pk'), status=Booking.CONFIRMED).order_by().values(
+        'showtime'
+    ).annotate(total=Sum('amount_paid')).values('total')
+
+    written = 0
+    with transaction.atomic():
+        Showtime.objects.update(
+            tickets_sold=Coalesce(Subquery(tickets), 0),
+            revenue=Coalesce(Subquery(revenue), ZERO),
+        )
+        for model, key in [(MovieDailySales, ['movie_id', 'date']), (ScreenDailySales, ['screen', 'date'])]:
+            model.objects.all().delete()
+            rows = Showtime.objects.order_by().values(*key).annotate(**daily_totals())
+            batch = []
+            for row in rows.iterator(chunk_size=REBUILD_BATCH_SIZE):
+                batch.append(model(**row))
+                if len(batch) == REBUILD_BATCH_SIZE:
+                    written += len(model.objects.bulk_create(batch))
+                    batch = []
+            written += len(model.objects.bulk_create(batch))
+    return written
@@ -0,0 +1,225 @@
+"""
+Screen scheduling.
+
+A showtime occupies its screen from its start until the movie ends plus
+``SCHEDULE_CLEANING_MINUTES`` to turn the auditorium around; movies without a
+duration are assumed to run ``SCHEDULE_DEFAULT_DURATION`` minutes. Showtimes
+on the same screen may not overlap.
+
+Intervals are kept in a ``ScreenIndex`` per screen per day (by start date),
+sorted by start alongside the running maximum of their ends, so finding an
+overlap is two binary searches even when showtimes already in the database
+overlap each other (e.g. from before scheduling was checked). A show can run past
+midnight, so a check also looks at the neighbouring days' indexes. A
+``Schedule`` loads the indexes for a date range in one query and then checks
+or places any number of showtimes without further queries:
+
+* ``check_showtime`` validates a single showtime (``Showtime.clean``, and so
+  the admin, uses it),
+* ``validate_slots`` checks a batch of proposed showtimes against the existing
+  ones and each other,
+* ``plan_schedule`` packs showtimes onto screens for a range of days, filling
+  each screen from opening time with back-to-back shows that end by closing
+  time, around whatever is already scheduled.
+"""
+import itertools
+from bisect import bisect_right
+from collections import defaultdict, namedtuple
+from datetime import date, time, timedelta
+
+from django.conf import settings
+
+from .models import Showtime
+
+MINUTES_PER_DAY = 24 * 60
+
+# A proposed showtime; movie_id may be None when only the run time matters
+Slot = namedtuple('Slot', ['screen', 'date', 'time', 'movie_id', 'duration'])
+
+
+class Conflict(namedtuple('Conflict', ['start', 'end', 'showtime'])):
+    """The interval a showtime (a pk, or a Slot not yet saved) occupies on a screen"""
+
+    def __str__(self):
+        owner = f"showtime {self.showtime}" if isinstance(self.showtime, int) else "another new showtime"
+        return f"the screen is taken by {owner} from {format_minute(self.start)} until {format_minute(self.end)}"
+
+
+def run_time(duration):
+    """Minutes a showing occupies its screen, cleaning included"""
+    return (duration or settings.SCHEDULE_DEFAULT_DURATION) + settings.SCHEDULE_CLEANING_MINUTES
+
+
+def to_minute(day, start):
+    return day.toordinal() * MINUTES_PER_DAY + start.hour * 60 + start.minute
+
+
+def from_minute(minute):
+    day, minute = divmod(minute, MINUTES_PER_DAY)
+    return date.fromordinal(day), time(minute // 60, minute % 60)
+
+
+def format_minute(minute):
+    day, start = from_minute(minute)
+    return f"{day} {start:%H:%M}"
+
+
+class ScreenIndex:
+    """[start, end) intervals (in minutes) of one screen on one day"""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.max_ends = []  # max_ends[i] is the latest end among the first i + 1 intervals
+        self.showtimes = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlapping(self, start, end):
+        """The earliest starting Conflict overlapping [start, end), if any"""
+        # Intervals starting before end overlap if they end after start; the
+        # first whose running maximum passes start is itself such an interval
+        i = bisect_right(self.max_ends, start)
+        if i == len(self.starts) or self.starts[i] >= end:
+            return None
+        return Conflict(self.starts[i], self.ends[i], self.showtimes[i])
+
+    def add(self, start, end, showtime):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.showtimes.insert(i, showtime)
+        self.max_ends.insert(i, max(end, self.max_ends[i - 1]) if i else end)
+        # Later running maxima only grow, so they stop changing at the first one past end
+        for k in range(i + 1, len(self.max_ends)):
+            if self.max_ends[k] >= end:
+                break
+            self.max_ends[k] = end
+
+
+class Schedule:
+    """ScreenIndexes by (screen, day) for a range of days"""
+
+    def __init__(self):
+        self.indexes = defaultdict(ScreenIndex)
+
+    @classmethod
+    def load(cls, date_from, date_to, screens=None, exclude=None):
+        """
+        The schedule of showtimes starting between date_from and date_to, plus
+        a day either side for shows running past midnight, in one query.
+        Cancelled showtimes and the exclude pk take up no screen time.
+        """
+        schedule = cls()
+        showtimes = Showtime.objects.filter(
+            date__gte=date_from - timedelta(days=1), date__lte=date_to + timedelta(days=1), is_cancelled=False,
+        )
+        if screens is not None:
+            showtimes = showtimes.filter(screen__in=list(screens))
+        if exclude is not None:
+            showtimes = showtimes.exclude(pk=exclude)
+        for pk, screen, day, start, duration in showtimes.values_list(
+            'pk', 'screen', 'date', 'time', 'movie__duration'
+        ).iterator():
+            schedule.add(screen, day, start, duration, pk)
+        return schedule
+
+    def conflict(self, screen, day, start, duration):
+        """The Conflict a showing of duration minutes would run into, if any"""
+        begin = to_minute(day, start)
+        end = begin + run_time(duration)
+        for offset in (-1, 0, 1):
+            index = self.indexes.get((screen, day + timedelta(days=offset)))
+            conflict = index.overlapping(begin, end) if index else None
+            if conflict:
+                return conflict
+        return None
+
+    def add(self, screen, day, start, duration, showtime):
+        begin = to_minute(day, start)
+        self.indexes[(screen, day)].add(begin, begin + run_time(duration), showtime)
+
+
+def check_showtime(showtime):
+    """The Conflict a (new or edited) showtime runs into on its screen, if any"""
+    schedule = Schedule.load(showtime.date, showtime.date, screens=[showtime.screen], exclude=showtime.pk)
+    return schedule.conflict(showtime.screen, showtime.date, showtime.time, showtime.movie.duration)
+
+
+def validate_slots(slots):
+    """
+    Check a batch of Slots against the existing showtimes and each other in
+    one pass. Returns {index of slot: Conflict}; the slots without a conflict
+    fit together.
+    """
+    if not slots:
+        return {}
+    schedule = Schedule.load(
+        min(slot.date for slot in slots), max(slot.date for slot in slots), screens={slot.screen for slot in slots},
+    )
+    conflicts = {}
+    for i, slot in enumerate(slots):
+        conflict = schedule.conflict(slot.screen, slot.date, slot.time, slot.duration)
+        if conflict:
+            conflicts[i] = conflict
+        else:
+            schedule.add(slot.screen, slot.date, slot.time, slot.duration, slot)
+    return conflicts
+
+
+def rotate():
+    """Default movie choice: cycle through the movies that fit"""
+    counter = itertools.count()
+    return lambda fitting: next(counter) % fitting
+
+
+def plan_schedule(movies, screens, date_from, days, opening=None, closing=None, choose=None, schedule=None):
+    """
+    Pack showings of movies onto screens for days starting at date_from and
+    return them as Slots (nothing is saved).
+
+    movies is a list of (movie_id, duration). Each screen is filled from
+    opening time: a show starts at the next free SCHEDULE_SLOT_MINUTES
+    boundary and every show ends by closing time (a closing time at or before
+    opening is after midnight). choose(fitting) picks one of the movies short
+    enough to fit in the time left, as an index below fitting into the
+    movies sorted by duration; by default the movies are rotated. Existing
+    showtimes are worked around; pass schedule to skip loading them.
+    """
+    opening = opening or settings.SCHEDULE_OPENING
+    closing = closing or settings.SCHEDULE_CLOSING
+    choose = choose or rotate()
+    step = settings.SCHEDULE_SLOT_MINUTES
+    if schedule is None:
+        schedule = Schedule.load(date_from, date_from + timedelta(days=days - 1), screens=screens)
+
+    # Sorted by duration, the movies that fit in the time left are a prefix
+    movies = sorted(movies, key=lambda movie: (movie[1] or settings.SCHEDULE_DEFAULT_DURATION, movie[0]))
+    durations = [duration or settings.SCHEDULE_DEFAULT_DURATION for _, duration in movies]
+    open_minutes = opening.hour * 60 + opening.minute
+    close_minutes = closing.hour * 60 + closing.minute
+    if close_minutes <= open_minutes:
+        close_minutes += MINUTES_PER_DAY
+
+    slots = []
+    for day in (date_from + timedelta(days=n) for n in range(days)):
+        base = day.toordinal() * MINUTES_PER_DAY
+        for screen in screens:
+            minute = base + open_minutes
+            while True:
+                minute = -(-minute // step) * step
+                fitting = bisect_right(durations, base + close_minutes - minute)
+                if not fitting:
+                    break
+                movie_id, duration = movies[choose(fitting)]
+                start_day, start = from_minute(minute)
+                conflict = schedule.conflict(screen, start_day, start, duration)
+                if conflict:
+                    minute = conflict.end
+                    continue
+                slot = Slot(screen, start_day, start, movie_id, duration)
+                schedule.add(screen, start_day, start, duration, slot)
+                slots.append(slot)
+                minute += run_time(duration)
+    return slots
@@ -0,0 +1,175 @@
+"""
+Full-text movie search.
+
+Searches title, director, cast, writers and descriptions through a real
+full-text index instead of ``icontains`` scans, ranks results by relevance,
+matches word prefixes ("dar kni" finds "The Dark Knight") and retries with
+spelling corrections when a term matches nothing.
+
+* PostgreSQL: ``Movie.search_vector`` is a weighted tsvector with a GIN index,
+  ranked with ``ts_rank``. Queries of stop words only ("the") are not in
+  the index and fall back to ``icontains`` matching.
+* SQLite: an FTS5 virtual table (``movies_movie_fts``) ranked with ``bm25``.
+
+Both indexes are kept in sync with the movies table by signals (see
+``signals.py``); ``rebuild_search_index`` refills them after bulk loads.
+Other databases fall back to ``icontains`` matching.
+"""
+import difflib
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+from .cache import catalogue_cached
+from .models import Movie
+
+FTS_TABLE = 'movies_movie_fts'
+# Indexed columns, most relevant first; the weights favour title matches
+SEARCH_FIELDS = ['title', 'director', 'cast', 'writers', 'short_description', 'description']
+SQLITE_WEIGHTS = [10.0, 5.0, 5.0, 5.0, 2.0, 1.0]
+# Fields whose words are used to correct misspelt search terms
+VOCABULARY_FIELDS = ['title', 'director', 'cast', 'writers']
+# Quoted column list; "cast" is an SQL keyword
+FTS_COLUMNS = ', '.join(f'"{field}"' for field in SEARCH_FIELDS)
+
+SEARCH_VECTOR = (
+    SearchVector('title', weight='A', config='english')
+    + SearchVector('director', 'cast', 'writers', weight='B', config='english')
+    + SearchVector('short_description', 'description', weight='C', config='english')
+)
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def index_movie(movie):
+    """Add or refresh a movie in the search index"""
+    if connection.vendor == 'postgresql':
+        Movie.objects.filter(pk=movie.pk).update(search_vector=SEARCH_VECTOR)
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, {FTS_COLUMNS}) "
+                f"VALUES (%s, {', '.join(['%s'] * len(SEARCH_FIELDS))})",
+                [movie.pk] + [getattr(movie, field) or '' for field in SEARCH_FIELDS],
+            )
+
+
+def unindex_movie(movie_id):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [movie_id])
+
+
+def rebuild_search_index():
+    """Recompute the whole search index, e.g. after loading fixtures or bulk inserts"""
+    if connection.vendor == 'postgresql':
+        Movie.objects.update(search_vector=SEARCH_VECTOR)
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            sources = ', '.join(f'COALESCE("{field}", \'\')' for field in SEARCH_FIELDS)
+            cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, {FTS_COLUMNS}) SELECT id, {sources} FROM movies_movie")
+
+
+def search_vocabulary():
+    """Words from names and titles in the catalogue, cached until a movie changes"""
+    def build():
+        words = set()
+        for values in Movie.objects.values_list(*VOCABULARY_FIELDS).iterator():
+            for value in values:
+                words.update(search_terms(value or ''))
+        return sorted(words)
+
+    return catalogue_cached('search-vocabulary', build)
+
+
+def correct_terms(terms):
+    """Replace unknown terms with their closest vocabulary word, if there is one"""
+    vocabulary = search_vocabulary()
+    known = set(vocabulary)
+    corrected = []
+    for term in terms:
+        if term in known or any(word.startswith(term) for word in vocabulary):
+            corrected.append(term)
+        else:
+            matches = difflib.get_close_matches(term, vocabulary, n=1, cutoff=0.7)
+            corrected.append(matches[0] if matches else term)
+    return corrected
+
+
+def search_movies(queryset, text):
+    """Filter queryset to movies matching text, ordered by relevance"""
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+
+    results = _search(queryset, terms)
+    if not results.exists():
+        corrected = correct_terms(terms)
+        if corrected != terms:
+            results = _search(queryset, corrected)
+    return results
+
+
+def _search(queryset, terms):
+    if connection.vendor == 'postgresql':
+        raw_query = ' & '.join(f'{term}:*' for term in terms)
+        if not _has_lexemes(raw_query):
+            # Only stop words ("the"), which the english index leaves out
+            return _contains_all(queryset, terms)
+        query = SearchQuery(raw_query, search_type='raw', config='english')
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F('search_vector'), query))
+            .order_by('-search_rank', 'id')
+        )
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        # Matched and ranked inside the movie query, so the other filters,
+        # the count and pagination all apply to every match
+        movie_id = f'{connection.ops.quote_name(Movie._meta.db_table)}.{connection.ops.quote_name("id")}'
+        return (
+            queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+            .annotate(search_rank=RawSQL(
+                f"SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {movie_id}",
+                [match], output_field=FloatField(),
+            ))
+            .order_by('search_rank', 'id')
+        )
+
+    return _contains_all(queryset, terms)
+
+
+def _has_lexemes(raw_query):
+    """Whether a PostgreSQL tsquery keeps any terms once stop words are dropped"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT numnode(to_tsquery('english', %s))", [raw_query])
+        return cursor.fetchone()[0] > 0
+
+
+def _contains_all(queryset, terms):
+    condition = Q()
+    for term in terms:
+        term_condition = Q()
+        for field in SEARCH_FIELDS:
+            term_condition |= Q(**{f'{field}__icontains': term})
+        condition &= term_condition
+    return queryset.filter(condition)
+
+
+class MovieSearchFilter(BaseFilterBackend):
+    """Drop-in replacement for SearchFilter backed by the full-text index"""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        return search_movies(queryset, text)
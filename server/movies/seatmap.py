@@ -0,0 +1,153 @@
+"""
+Compact bitmap seat maps.
+
+Seats in a layout are numbered row-major: seat ``<row><n>`` in the r-th row
+has index ``r * seats_per_row + (n - 1)``. A seat map is a Python int whose
+bit i is set when seat i is taken, so availability, counting and conflict
+checks are single bitwise operations.
+
+Seat maps are stored (and sent to clients) as little-endian bytes: byte k
+holds seats 8k..8k+7, lowest bit first. On the wire they are base64 encoded.
+
+``SeatGrid.best_seats`` picks the best block of adjacent free seats for a
+party. Every possible block of a given size is scored once per layout shape,
+for centrality (block centre against row centre) and row preference (rows
+about two thirds back from the screen, row A being nearest), and kept sorted
+by that score, so an allocation walks the list testing each block against the
+taken bitmap with one AND. Blocks that would strand a single free seat next
+to them are penalised, which keeps the remaining seats sellable.
+"""
+import base64
+from functools import lru_cache
+from itertools import compress
+from math import inf
+
+# Turns a '0'/'1' bit string into 0/1 bytes usable as itertools.compress selectors
+_BIT_SELECTORS = bytes.maketrans(b'01', b'\x00\x01')
+
+# Preferred row, as a fraction of the way from the front row to the back
+PREFERRED_ROW = 0.65
+# Score of one row away from the preferred row, in seats off the row centre
+ROW_WEIGHT = 2
+# Score of stranding one free seat between the block and a taken seat or the aisle
+ORPHAN_PENALTY = 3
+
+
+class InvalidSeatError(Exception):
+    """Raised when seat IDs do not exist in the showtime's seat layout"""
+
+    def __init__(self, seats):
+        self.seats = list(seats)
+        super().__init__(f"Seats do not exist: {', '.join(self.seats)}")
+
+
+class SeatGrid:
+    """Seat numbering for one layout shape"""
+
+    def __init__(self, rows, seats_per_row):
+        self.rows = tuple(rows)
+        self.seats_per_row = seats_per_row
+        self.seat_ids = tuple(f"{row}{num}" for row in self.rows for num in range(1, seats_per_row + 1))
+        self.index = {seat_id: i for i, seat_id in enumerate(self.seat_ids)}
+        self.size = len(self.seat_ids)
+        self.full = (1 << self.size) - 1
+        self._blocks = {}
+
+    def mask(self, seat_ids):
+        """Return the bitmap of seat_ids, raising InvalidSeatError for unknown seats"""
+        bitmap = 0
+        unknown = []
+        for seat_id in seat_ids:
+            i = self.index.get(seat_id)
+            if i is None:
+                unknown.append(seat_id)
+            else:
+                bitmap |= 1 << i
+        if unknown:
+            raise InvalidSeatError(unknown)
+        return bitmap
+
+    def seats(self, bitmap):
+        """Return the seat IDs whose bits are set, in layout order"""
+        bitmap &= self.full
+        if bitmap.bit_count() > 8:
+            # Dense maps: expand the bits once and let compress() pick the seats
+            bits = format(bitmap, f'0{self.size}b')[::-1].encode('ascii').translate(_BIT_SELECTORS)
+            return list(compress(self.seat_ids, bits))
+        seat_ids = []
+        while bitmap:
+            lowest = bitmap & -bitmap
+            seat_ids.append(self.seat_ids[lowest.bit_length() - 1])
+            bitmap ^= lowest
+        return seat_ids
+
+    def available(self, taken):
+        """Return the bitmap of seats not set in taken"""
+        return self.full & ~taken
+
+    def blocks(self, count):
+        """
+        Every block of count adjacent seats in a row, best first, as
+        (score, mask, left, beyond_left, right, beyond_right) where the last four
+        are the bits of the two seats either side of the block (0 past the row end).
+        """
+        if not 0 < count <= self.seats_per_row:
+            # No block that wide; not cached, so odd counts cannot grow the cache
+            return []
+        blocks = self._blocks.get(count)
+        if blocks is None:
+            per_row = self.seats_per_row
+            preferred_row = PREFERRED_ROW * (len(self.rows) - 1)
+            centre = (per_row - 1) / 2
+
+            def bit(row, seat):
+                return 1 << (row * per_row + seat) if 0 <= seat < per_row else 0
+
+            blocks = sorted(
+                (
+                    ROW_WEIGHT * abs(row - preferred_row) + abs(start + (count - 1) / 2 - centre),
+                    ((1 << count) - 1) << (row * per_row + start),
+                    bit(row, start - 1), bit(row, start - 2),
+                    bit(row, start + count), bit(row, start + count + 1),
+                )
+                for row in range(len(self.rows))
+                for start in range(per_row - count + 1)
+            )
+            self._blocks[count] = blocks
+        return blocks
+
+    def best_seats(self, taken, count):
+        """Return the bitmap of the best block of count adjacent free seats, or 0 if there is none"""
+        best, best_score = 0, inf
+        for score, mask, left, beyond_left, right, beyond_right in self.blocks(count):
+            if score >= best_score:
+                # Penalties only add to the score, so no later block can win
+                break
+            if mask & taken:
+                continue
+            # A free neighbour with a taken seat (or the row end) beyond it would be stranded
+            if left and not left & taken and (not beyond_left or beyond_left & taken):
+                score += ORPHAN_PENALTY
+            if right and not right & taken and (not beyond_right or beyond_right & taken):
+                score += ORPHAN_PENALTY
+            if score < best_score:
+                best, best_score = mask, score
+        return best
+
+    def to_bytes(self, bitmap):
+        return (bitmap & self.full).to_bytes((self.size + 7) // 8, 'little')
+
+    def encode(self, bitmap):
+        """Encode a bitmap in the base64 wire format"""
+        return base64.b64encode(self.to_bytes(bitmap)).decode('ascii')
+
+
+@lru_cache(maxsize=128)
+def get_grid(rows, seats_per_row):
+    """Return the (cached) SeatGrid for a comma separated row string"""
+    return SeatGrid(rows.split(','), seats_per_row)
+
+
+def from_bytes(data):
+    """Decode a stored seat map; BinaryField may hand back bytes or a memoryview"""
+    return int.from_bytes(bytes(data or b''), 'little')
@@ -1,77 +1,240 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Movie, SeatLayout, Showtime, Booking
+from rest_framework.exceptions import NotFound
+from .booking import (
+    BatchBookingError, BookingConflictError, HoldExpiredError, NoSeatsTogetherError, SeatUnavailableError,
+    ShowtimeCancelledError, book_batch, book_hold, hold_seats
+)
+from .models import Movie, SeatLayout, Showtime, Booking, SeatHold, MovieDailySales, ScreenDailySales
+from .seatmap import InvalidSeatError
+
+# Most showtimes a single group order may book
+MAX_BATCH_ITEMS = 50
+# Most adjacent seats a hold may ask to have picked
+MAX_PARTY = 20
+
+def check_distinct_seats(seats):
+    """Rejects a seat list naming any seat twice"""
+    repeated = sorted({seat for seat in seats if seats.count(seat) > 1})
+    if repeated:
+        raise serializers.ValidationError([f"Seat {seat} is selected more than once" for seat in repeated])
+    return seats
 
 class MovieSerializer(serializers.ModelSerializer):
     class Meta:
         model = Movie
-        fields = ['id', 'title', 'description', 'short_description', 'genre', 'duration', 'release_date', 'poster_url', 'created_at']
+        fields = ['id', 'title', 'description', 'short_description', 'genre', 'duration', 'release_date', 'poster_url', 'poster_variants', 'created_at']
 
 class MovieDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Movie
         fields = ['id', 'title', 'description', 'short_description', 'genre', 
                  'duration', 'release_date', 'language', 'country', 'director', 
-                 'cast', 'writers', 'poster_url', 'created_at'] 
+                 'cast', 'writers', 'poster_url', 'poster_variants', 'created_at'] 
 
 class SeatLayoutSerializer(serializers.ModelSerializer):
     class Meta:
         model = SeatLayout
         fields = ['id', 'name', 'rows', 'seats_per_row']
 
+# Read from the occupancy counters, so listings need no seat maps
+AVAILABILITY_FIELDS = ['capacity', 'booked_count', 'seats_left', 'is_sold_out', 'is_cancelled']
+
 class ShowtimeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Showtime
-        fields = ['id', 'movie', 'date', 'time', 'screen', 'seat_layout']
+        fields = ['id', 'movie', 'date', 'time', 'screen', 'seat_layout', *AVAILABILITY_FIELDS]
 
 class ShowtimeWithMovieSerializer(serializers.ModelSerializer):
     movie_details = MovieSerializer(source='movie', read_only=True)
     
     class Meta:
         model = Showtime
-        fields = ['id', 'movie', 'movie_details', 'date', 'time', 'screen', 'seat_layout']
+        fields = ['id', 'movie', 'movie_details', 'date', 'time', 'screen', 'seat_layout', *AVAILABILITY_FIELDS]
 
 class ShowtimeDetailSerializer(serializers.ModelSerializer):
     movie = MovieSerializer(read_only=True)
     seat_layout = SeatLayoutSerializer(read_only=True)
     available_seats = serializers.SerializerMethodField()
     booked_seats = serializers.SerializerMethodField()
+    seat_map = serializers.SerializerMethodField()
     
     class Meta:
         model = Showtime
-        fields = ['id', 'movie', 'date', 'time', 'screen', 'seat_layout', 'available_seats', 'booked_seats']
+        fields = ['id', 'movie', 'date', 'time', 'screen', 'seat_layout', *AVAILABILITY_FIELDS,
+                  'available_seats', 'booked_seats', 'seat_map', 'version']
     
     def get_available_seats(self, obj):
         return obj.get_available_seats()
     
     def get_booked_seats(self, obj):
         return obj.get_booked_seats()
+    
+    def get_seat_map(self, obj):
+        return obj.get_seat_map()
 
 class BookingSerializer(serializers.ModelSerializer):
     showtime = ShowtimeSerializer(read_only=True)
     
     class Meta:
         model = Booking
-        fields = ['id', 'user_email', 'user_name', 'showtime', 'seats', 'booking_time', 'amount_paid']
+        fields = ['id', 'user_email', 'user_name', 'showtime', 'seats', 'booking_time', 'amount_paid', 'status', 'cancelled_at']
         
+def seat_errors(error):
+    """Turn a booking engine exception into a seats validation error"""
+    if isinstance(error, SeatUnavailableError):
+        messages = [f"Seat {seat} is already booked" for seat in error.seats]
+    elif isinstance(error, InvalidSeatError):
+        messages = [f"Seat {seat} does not exist" for seat in error.seats]
+    elif isinstance(error, NoSeatsTogetherError):
+        messages = [f"There are no {error.count} seats together left, please pick seats yourself"]
+    else:
+        messages = ["These seats are in high demand, please try again"]
+    return serializers.ValidationError({'seats': messages})
+
+SHOWTIME_CANCELLED = "This showtime has been cancelled"
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    """Hold the given seats, or with ``count`` the best block of that many adjacent seats"""
+    count = serializers.IntegerField(min_value=1, max_value=MAX_PARTY, required=False, write_only=True)
+
+    class Meta:
+        model = SeatHold
+        fields = ['token', 'showtime', 'seats', 'count', 'user_email', 'expires_at']
+        read_only_fields = ['token', 'showtime', 'expires_at']
+        extra_kwargs = {'seats': {'required': False}}
+    
+    def validate_seats(self, value):
+        if not isinstance(value, list) or not value or not all(isinstance(seat, str) for seat in value):
+            raise serializers.ValidationError("Select at least one seat")
+        return value
+
+    def validate(self, attrs):
+        if ('seats' in attrs) == ('count' in attrs):
+            raise serializers.ValidationError("Give either seats or a count of seats to pick")
+        return attrs
+    
+    def create(self, validated_data):
+        try:
+            return hold_seats(
+                self.context['showtime_id'], validated_data.get('seats'), validated_data.get('user_email', ''),
+                count=validated_data.get('count'),
+            )
+        except Showtime.DoesNotExist:
+            raise NotFound("Showtime not found")
+        except ShowtimeCancelledError:
+            raise serializers.ValidationError({'showtime': [SHOWTIME_CANCELLED]})
+        except (SeatUnavailableError, InvalidSeatError, NoSeatsTogetherError, BookingConflictError) as e:
+            raise seat_errors(e)
+
 class BookingCreateSerializer(serializers.ModelSerializer):
+    """
+    Validates the request on its own; the showtime is only loaded once, under
+    the booking engine's lock, where the seats are checked against its seat map.
+    """
+    showtime = serializers.IntegerField(source='showtime_id')
+    hold = serializers.UUIDField(required=False, write_only=True)
+    
     class Meta:
         model = Booking
-        fields = ['user_email', 'user_name', 'showtime', 'seats', 'amount_paid']
+        fields = ['user_email', 'user_name', 'showtime', 'seats', 'amount_paid', 'hold']
         
     def validate_seats(self, value):
-        """Validate that the seats are available"""
-        showtime = self.initial_data.get('showtime')
-        if not showtime:
-            raise serializers.ValidationError("Showtime is required")
-            
+        if not isinstance(value, list) or not value or not all(isinstance(seat, str) for seat in value):
+            raise serializers.ValidationError("Select at least one seat")
+        return check_distinct_seats(value)
+
+    def create(self, validated_data):
+        hold = validated_data.pop('hold', None)
         try:
-            showtime_obj = Showtime.objects.get(id=showtime)
+            if hold:
+                return book_hold(hold, Booking(**validated_data))
+            return super().create(validated_data)
         except Showtime.DoesNotExist:
-            raise serializers.ValidationError("Invalid showtime")
-            
-        # Check if all seats are available
-        for seat in value:
-            if seat in showtime_obj.booked_seats:
-                raise serializers.ValidationError(f"Seat {seat} is already booked")
-                
-        return value 
\ No newline at end of file
+            raise serializers.ValidationError({'showtime': ["Invalid showtime"]})
+        except ShowtimeCancelledError:
+            raise serializers.ValidationError({'showtime': [SHOWTIME_CANCELLED]})
+        except HoldExpiredError as e:
+            raise serializers.ValidationError({'hold': [str(e)]})
+        except (SeatUnavailableError, InvalidSeatError, BookingConflictError) as e:
+            raise seat_errors(e)
+
+class BatchBookingItemSerializer(serializers.Serializer):
+    showtime = serializers.IntegerField()
+    seats = serializers.ListField(child=serializers.CharField(max_length=10), allow_empty=False)
+    amount_paid = serializers.DecimalField(max_digits=8, decimal_places=2, required=False)
+
+    def validate_seats(self, value):
+        return check_distinct_seats(value)
+
+class BatchBookingCreateSerializer(serializers.Serializer):
+    """A group order: one booking per item, all booked together or not at all"""
+    user_email = serializers.EmailField()
+    user_name = serializers.CharField(max_length=100)
+    items = BatchBookingItemSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_ITEMS)
+
+    def create(self, validated_data):
+        bookings = [
+            Booking(
+                user_email=validated_data['user_email'], user_name=validated_data['user_name'],
+                showtime_id=item['showtime'], seats=item['seats'],
+                **({'amount_paid': item['amount_paid']} if 'amount_paid' in item else {}),
+            )
+            for item in validated_data['items']
+        ]
+        try:
+            return book_batch(bookings)
+        except BatchBookingError as e:
+            # Per-item errors in the usual list layout: {} for the items that were fine
+            errors = [{} for _ in bookings]
+            for i, error in e.errors.items():
+                if isinstance(error, Showtime.DoesNotExist):
+                    errors[i] = {'showtime': ["Invalid showtime"]}
+                elif isinstance(error, ShowtimeCancelledError):
+                    errors[i] = {'showtime': [SHOWTIME_CANCELLED]}
+                else:
+                    errors[i] = seat_errors(error).detail
+            raise serializers.ValidationError({'items': errors})
+        except BookingConflictError as e:
+            raise serializers.ValidationError({'items': seat_errors(e).detail['seats']})
+
+class BookingCancelSerializer(serializers.Serializer):
+    # The email the booking was made with, as the booking history page knows it
+    user_email = serializers.EmailField()
+    refund = serializers.BooleanField(default=False)
+
+class ShowtimeCancelSerializer(serializers.Serializer):
+    refund = serializers.BooleanField(default=True)
+
+# Read from the sales rollups (see sales.py)
+SALES_FIELDS = ['capacity', 'tickets_sold', 'revenue', 'fill_rate']
+
+class ShowtimeSalesSerializer(serializers.ModelSerializer):
+    movie_title = serializers.CharField(source='movie.title', read_only=True)
+
+    class Meta:
+        model = Showtime
+        fields = ['id', 'date', 'time', 'screen', 'movie', 'movie_title', 'is_cancelled', *SALES_FIELDS]
+
+class MovieDailySalesSerializer(serializers.ModelSerializer):
+    movie_title = serializers.CharField(source='movie.title', read_only=True)
+
+    class Meta:
+        model = MovieDailySales
+        fields = ['date', 'movie', 'movie_title', 'showtimes', *SALES_FIELDS]
+
+class ScreenDailySalesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ScreenDailySales
+        fields = ['date', 'screen', 'showtimes', *SALES_FIELDS]
+
+class UpcomingShowtimesQuerySerializer(serializers.Serializer):
+    """Query params of the upcoming showtimes listing; start defaults to today"""
+    start = serializers.DateField(required=False)
+    days = serializers.IntegerField(required=False, min_value=1)
+    movie = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_days(self, value):
+        if value > settings.UPCOMING_MAX_DAYS:
+            raise serializers.ValidationError(f"Ensure this value is less than or equal to {settings.UPCOMING_MAX_DAYS}.")
+        return value
@@ -0,0 +1,100 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .booking import rebuild_layout_seat_maps
+from .cache import bump_catalogue_version, bump_schedule_version
+from .models import Movie, SeatLayout, Showtime
+from .posters import content_hash, generate_variants
+from .sales import refresh_daily_sales
+from .search import index_movie, unindex_movie
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_catalogue(sender, **kwargs):
+    """Any change to a movie invalidates the cached catalogue responses"""
+    bump_catalogue_version()
+
+
+@receiver(post_save, sender=Movie)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_movie(instance)
+
+
+@receiver(post_delete, sender=Movie)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_movie(instance.pk)
+
+
+@receiver(pre_save, sender=Movie)
+def hash_poster(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Hash a newly uploaded poster (or one never hashed) before it is stored"""
+    instance._poster_changed = False
+    if raw or not instance.poster or (update_fields is not None and 'poster' not in update_fields):
+        return
+    if instance.poster._committed and instance.poster_hash:
+        return
+    try:
+        digest = content_hash(instance.poster)
+    except OSError:
+        return  # Missing file; variants fall back to the original poster
+    instance._poster_changed = digest != instance.poster_hash
+    instance.poster_hash = digest
+
+
+@receiver(post_save, sender=Movie)
+def create_poster_variants(sender, instance, raw=False, **kwargs):
+    if not raw and getattr(instance, '_poster_changed', False):
+        try:
+            generate_variants(instance)
+        except OSError:
+            pass  # Unreadable image; the variant view retries on first request
+
+
+@receiver(post_save, sender=Showtime)
+@receiver(post_delete, sender=Showtime)
+def invalidate_upcoming(sender, update_fields=None, **kwargs):
+    """Schedule edits invalidate the cached upcoming showtimes; the booking engine's saves do so themselves"""
+    if update_fields is None:
+        bump_schedule_version()
+
+
+@receiver(pre_save, sender=Showtime)
+def remember_sales_day(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Note the day an edited showtime counted towards, in case it moves"""
+    instance._sales_day = None
+    if instance.pk and update_fields is None:
+        instance._sales_day = Showtime.objects.filter(pk=instance.pk).values('movie_id', 'screen', 'date').first()
+
+
+@receiver(post_save, sender=Showtime)
+@receiver(post_delete, sender=Showtime)
+def update_daily_sales(sender, instance, update_fields=None, **kwargs):
+    """
+    Keep the daily rollups' showtime counts and capacities in step with the
+    schedule; the booking engine's own saves (with update_fields) only move
+    sales, which it records itself.
+    """
+    if update_fields is not None:
+        return
+    refresh_daily_sales(instance)
+    day = getattr(instance, '_sales_day', None)
+    if day and (day['movie_id'], day['screen'], day['date']) != (instance.movie_id, instance.screen, instance.date):
+        refresh_daily_sales(Showtime(**day))
+
+
+@receiver(pre_save, sender=SeatLayout)
+def remember_layout_grid(sender, instance, raw=False, **kwargs):
+    """Note an edited layout's grid, in case its rows or seats per row change"""
+    instance._grid = None
+    if instance.pk and not raw:
+        instance._grid = SeatLayout.objects.filter(pk=instance.pk).values_list('rows', 'seats_per_row').first()
+
+
+@receiver(post_save, sender=SeatLayout)
+def rebuild_seat_maps(sender, instance, raw=False, **kwargs):
+    """Renumber the seat maps of the layout's showtimes when its grid changes"""
+    grid = getattr(instance, '_grid', None)
+    if not raw and grid and grid != (instance.rows, int(instance.seats_per_row)):
+        rebuild_layout_seat_maps(instance.pk)
@@ -1,3 +1,1451 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import threading
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+from PIL import Image
+from rest_framework.serializers import BaseSerializer
+
+from .metrics import RequestTimings, get_recorder
+from .posters import variant_name
+from .booking import (
+    BookingConflictError, SeatUnavailableError, ShowtimeCancelledError, _lock_showtimes, book_batch, book_hold,
+    cancel_booking, cancel_showtime, hold_seats, reconcile_occupancy, release_hold, reserve_seats,
+)
+from .realtime import InProcessBroker, set_broker
+from .sales import rebuild_sales
+from .search import rebuild_search_index
+from .scheduling import Schedule, Slot, plan_schedule, validate_slots
+from .models import Movie, SeatLayout, Showtime, Booking, SeatHold, SeatReservation, MovieDailySales, ScreenDailySales
+from .seatmap import InvalidSeatError, SeatGrid, from_bytes
+from .serializers import MAX_PARTY
+
+
+def create_showtime(rows="A,B,C,D", seats_per_row=10, **kwargs):
+    movie = Movie.objects.create(title="Test Movie", description="A test movie", poster="movie-posters/test.jpg")
+    layout = SeatLayout.objects.create(name="Standard", rows=rows, seats_per_row=seats_per_row)
+    return Showtime.objects.create(
+        movie=movie, date=date(2025, 6, 1), time=time(19, 0), screen="Screen 1", seat_layout=layout, **kwargs
+    )
+
+
+class BookingEngineTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+
+    def test_stale_seat_map_falls_back_to_reservation_rows(self):
+        reserve_seats(self.showtime.pk, ["A1"])
+        Showtime.objects.filter(pk=self.showtime.pk).update(seat_map=b"")
+        with self.assertRaises(SeatUnavailableError) as cm:
+            reserve_seats(self.showtime.pk, ["A1", "A2"])
+        self.assertEqual(cm.exception.seats, ["A1"])
+        self.assertFalse(SeatReservation.objects.filter(seat_id="A2").exists())
+
+    def test_unknown_showtime_is_a_validation_error(self):
+        response = self.client.post(reverse('booking-create'), {
+            "user_email": "a@example.com", "user_name": "A", "showtime": 0, "seats": ["A1"],
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"showtime": ["Invalid showtime"]})
+
+    def test_reserve_seats_bumps_version(self):
+        showtime = reserve_seats(self.showtime.pk, ["A1", "A2"])
+        self.assertEqual(showtime.get_booked_seats(), ["A1", "A2"])
+        self.assertEqual(showtime.version, 1)
+
+    def test_reserve_seats_rejects_booked_seats(self):
+        reserve_seats(self.showtime.pk, ["A1"])
+        with self.assertRaises(SeatUnavailableError) as ctx:
+            reserve_seats(self.showtime.pk, ["A2", "A1"])
+        self.assertEqual(ctx.exception.seats, ["A1"])
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.get_booked_seats(), ["A1"])
+
+    def test_booking_save_reserves_seats(self):
+        Booking.objects.create(user_email="a@example.com", user_name="A", showtime=self.showtime, seats=["B1"])
+        booking = Booking.objects.get()
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.get_booked_seats(), ["B1"])
+        self.assertEqual(list(booking.reservations.values_list('seat_id', flat=True)), ["B1"])
+
+    def test_unique_constraint_rejects_double_booking(self):
+        SeatReservation.objects.create(showtime=self.showtime, seat_id="C1")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            SeatReservation.objects.create(showtime=self.showtime, seat_id="C1")
+
+    def test_create_booking_api_conflict(self):
+        Booking.objects.create(user_email="a@example.com", user_name="A", showtime=self.showtime, seats=["B1"])
+        response = self.client.post(
+            reverse('booking-create'),
+            {"user_email": "b@example.com", "user_name": "B", "showtime": self.showtime.pk, "seats": ["B1"]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class BatchBookingTests(TestCase):
+    def setUp(self):
+        self.first = create_showtime()
+        self.second = create_showtime()
+        self.url = reverse('booking-batch')
+
+    def post(self, *items):
+        return self.client.post(self.url, {
+            "user_email": "group@example.com", "user_name": "School trip",
+            "items": [{"showtime": showtime, "seats": seats} for showtime, seats in items],
+        }, content_type="application/json")
+
+    def test_books_every_item_together(self):
+        response = self.post((self.second.pk, ["A1", "A2"]), (self.first.pk, ["B1"]), (self.second.pk, ["A3"]))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([b['seats'] for b in response.json()['bookings']], [["A1", "A2"], ["B1"], ["A3"]])
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.get_booked_seats(), ["A1", "A2", "A3"])
+        self.assertEqual(SeatReservation.objects.count(), 4)
+
+    def test_conflicts_are_reported_per_item_and_nothing_is_booked(self):
+        reserve_seats(self.first.pk, ["C1"])
+        response = self.post(
+            (self.second.pk, ["A1"]), (self.first.pk, ["C1", "C2"]), (0, ["A1"]), (self.second.pk, ["A1"]),
+            (self.second.pk, ["Z9"]),
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"items": [
+            {}, {"seats": ["Seat C1 is already booked"]}, {"showtime": ["Invalid showtime"]},
+            {"seats": ["Seat A1 is already booked"]}, {"seats": ["Seat Z9 does not exist"]},
+        ]})
+        self.assertEqual(Booking.objects.count(), 0)
+        self.assertEqual(SeatReservation.objects.count(), 1)
+
+    def test_repeated_seats_in_an_item_are_rejected(self):
+        response = self.post((self.first.pk, ["A1"]), (self.second.pk, ["B2", "B2"]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"items": [{}, {"seats": ["Seat B2 is selected more than once"]}]})
+        self.assertEqual(Booking.objects.count(), 0)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        with CaptureQueriesContext(connection) as few:
+            self.post((self.first.pk, ["A1"]))
+        with CaptureQueriesContext(connection) as many:
+            self.post(*[(showtime.pk, [f"{row}{n}"]) for showtime in (self.first, self.second)
+                        for row in "BCD" for n in range(1, 4)])
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(Booking.objects.count(), 19)
+
+    def test_locks_are_taken_in_id_order(self):
+        with CaptureQueriesContext(connection) as ctx:
+            _lock_showtimes([self.second.pk, self.first.pk, self.second.pk])
+        self.assertIn(f"IN ({self.first.pk}, {self.second.pk})", ctx.captured_queries[0]['sql'])
+
+
+class OccupancyTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime(rows="A,B", seats_per_row=2)
+
+    def test_counters_follow_bookings_and_holds(self):
+        self.assertEqual((self.showtime.capacity, self.showtime.booked_count), (4, 0))
+        reserve_seats(self.showtime.pk, ["A1", "A2"])
+        seat_hold = hold_seats(self.showtime.pk, ["B1", "B2"])
+        self.showtime.refresh_from_db()
+        self.assertEqual((self.showtime.booked_count, self.showtime.seats_left, self.showtime.is_sold_out), (4, 0, True))
+
+        release_hold(seat_hold.token)
+        self.showtime.refresh_from_db()
+        self.assertEqual((self.showtime.booked_count, self.showtime.is_sold_out), (2, False))
+
+    def test_saving_a_stale_instance_keeps_the_engine_fields(self):
+        stale = Showtime.objects.get(pk=self.showtime.pk)
+        booking = Booking.objects.create(user_email="a@example.com", user_name="A", showtime=self.showtime, seats=["A1", "A2"])
+        stale.time = time(21, 0)
+        stale.save()
+
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.time, time(21, 0))
+        self.assertEqual(self.showtime.get_booked_seats(), ["A1", "A2"])
+        self.assertEqual((self.showtime.booked_count, self.showtime.tickets_sold), (2, 2))
+        self.assertEqual(self.showtime.revenue, booking.amount_paid)
+        with self.assertRaises(SeatUnavailableError):
+            reserve_seats(self.showtime.pk, ["A1"])
+
+        cancel_showtime(self.showtime.pk)
+        stale.save()
+        stale.refresh_from_db()
+        self.assertTrue(stale.is_cancelled)
+        self.assertEqual(stale.booked_count, 0)
+
+    def test_switching_layouts_renumbers_the_seat_map(self):
+        reserve_seats(self.showtime.pk, ["B1"])
+        self.showtime.refresh_from_db()
+        self.showtime.seat_layout = SeatLayout.objects.create(name="Large", rows="A,B,C", seats_per_row=10)
+        self.showtime.save()
+
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.get_booked_seats(), ["B1"])
+        self.assertEqual((self.showtime.capacity, self.showtime.booked_count), (30, 1))
+        with self.assertRaises(SeatUnavailableError):
+            reserve_seats(self.showtime.pk, ["B1"])
+
+    def test_editing_a_layout_renumbers_its_showtimes(self):
+        reserve_seats(self.showtime.pk, ["B1"])
+        layout = self.showtime.seat_layout
+        layout.rows, layout.seats_per_row = "A,B,C", 10
+        layout.save()
+
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.get_booked_seats(), ["B1"])
+        self.assertEqual((self.showtime.capacity, self.showtime.booked_count), (30, 1))
+        self.assertEqual(ScreenDailySales.objects.get(screen="Screen 1").capacity, 30)
+
+    def test_listing_filters_on_seats_left(self):
+        full = create_showtime(rows="A", seats_per_row=2)
+        reserve_seats(full.pk, ["A1", "A2"])
+        url = reverse('showtime-list')
+        with self.assertNumQueries(2):  # The count and the page
+            response = self.client.get(url, {'available_min': 3})
+        self.assertEqual([s['id'] for s in response.json()['results']], [self.showtime.pk])
+        self.assertEqual(response.json()['results'][0]['seats_left'], 4)
+
+        response = self.client.get(url, {'sold_out': 'true'})
+        self.assertEqual([(s['id'], s['is_sold_out']) for s in response.json()['results']], [(full.pk, True)])
+        response = self.client.get(reverse('async-showtime-list'), {'available_min': 3})
+        self.assertEqual([s['id'] for s in response.json()['results']], [self.showtime.pk])
+
+    def test_out_of_range_seats_left_filters_are_rejected(self):
+        for url in (reverse('showtime-list'), reverse('async-showtime-list')):
+            for value in ('1e30', '-1', '100001'):
+                response = self.client.get(url, {'available_min': value})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('available_min', response.json())
+
+    def test_reconcile_fixes_drifted_counters(self):
+        reserve_seats(self.showtime.pk, ["A1"])
+        Showtime.objects.filter(pk=self.showtime.pk).update(capacity=0, booked_count=3, is_sold_out=True)
+        self.assertEqual(reconcile_occupancy(dry_run=True), [self.showtime.pk])
+
+        stdout = StringIO()
+        call_command('reconcile_occupancy', stdout=stdout)
+        self.assertIn('Reconciled occupancy of 1 showtimes', stdout.getvalue())
+        self.showtime.refresh_from_db()
+        self.assertEqual((self.showtime.capacity, self.showtime.booked_count, self.showtime.is_sold_out), (4, 1, False))
+        self.assertEqual(reconcile_occupancy(), [])
+
+
+class CancellationTests(TestCase):
+    def setUp(self):
+        self.broker = RecordingBroker()
+        set_broker(self.broker)
+        self.addCleanup(set_broker, None)
+        self.showtime = create_showtime()
+
+    def book(self, seats, email="a@example.com"):
+        return Booking.objects.create(user_email=email, user_name="A", showtime=self.showtime, seats=seats)
+
+    def cancel(self, booking, **data):
+        return self.client.post(
+            reverse('booking-cancel', args=[booking.pk]), {"user_email": booking.user_email, **data},
+            content_type="application/json",
+        )
+
+    def test_cancel_releases_seats_then_refund(self):
+        booking = self.book(["A1", "A2"])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.cancel(booking)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], "cancelled")
+        self.showtime.refresh_from_db()
+        self.assertEqual((self.showtime.get_booked_seats(), self.showtime.booked_count), ([], 0))
+        self.assertFalse(SeatReservation.objects.exists())
+        self.assertEqual(self.broker.events[-1][1]['released'], ["A1", "A2"])
+        # The seats can be booked again
+        self.book(["A1"])
+
+        self.assertEqual(self.cancel(booking).status_code, 400)
+        self.assertEqual(self.cancel(booking, refund=True).json()['status'], "refunded")
+        self.assertEqual(self.cancel(booking, refund=True).status_code, 400)
+
+    def test_cancel_needs_the_booking_email(self):
+        booking = self.book(["A1"])
+        response = self.client.post(
+            reverse('booking-cancel', args=[booking.pk]), {"user_email": "b@example.com"}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_cancel_showtime_is_set_based(self):
+        def cancel_with(count):
+            self.showtime = create_showtime()
+            for n in range(count):
+                self.book([f"B{n + 1}"])
+            hold_seats(self.showtime.pk, ["D1"])
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(cancel_showtime(self.showtime.pk), count)
+            return len(ctx)
+
+        self.assertEqual(cancel_with(1), cancel_with(8))
+        self.showtime.refresh_from_db()
+        self.assertTrue(self.showtime.is_cancelled)
+        self.assertEqual((self.showtime.get_booked_seats(), self.showtime.booked_count), ([], 0))
+        self.assertEqual(set(self.showtime.bookings.values_list('status', flat=True)), {Booking.REFUNDED})
+        self.assertFalse(self.showtime.holds.exists())
+        with self.assertRaises(ShowtimeCancelledError):
+            reserve_seats(self.showtime.pk, ["A1"])
+
+    def test_cancel_showtime_api_is_staff_only(self):
+        self.book(["A1"])
+        url = reverse('showtime-cancel', args=[self.showtime.pk])
+        self.assertEqual(self.client.post(url).status_code, 403)
+
+        staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.post(url, {"refund": False}, content_type="application/json")
+        self.assertEqual(response.json(), {"cancelled_bookings": 1})
+        self.assertEqual(self.showtime.bookings.get().status, Booking.CANCELLED)
+
+        response = self.client.post(reverse('booking-create'), {
+            "user_email": "a@example.com", "user_name": "A", "showtime": self.showtime.pk, "seats": ["A2"],
+        }, content_type="application/json")
+        self.assertEqual(response.json(), {"showtime": ["This showtime has been cancelled"]})
+
+
+class BookingExportTests(TestCase):
+    def setUp(self):
+        self.first = create_showtime()
+        self.second = create_showtime()
+        Movie.objects.filter(pk=self.second.movie_id).update(title='Second, "quoted" Movie')
+        self.bookings = [
+            Booking.objects.create(user_email=f"u{n}@example.com", user_name=f"User {n}",
+                                   showtime=showtime, seats=[f"A{n + 1}", f"B{n + 1}"])
+            for n, showtime in enumerate([self.first, self.second, self.first, self.second, self.first])
+        ]
+        Booking.objects.filter(pk=self.bookings[0].pk).update(booking_time=timezone.now() - timedelta(days=3))
+        self.client.force_login(User.objects.create_user("finance", password="pw", is_staff=True))
+
+    def export(self, file_format, **params):
+        response = self.client.get(reverse('booking-export', args=[file_format]), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export_is_denormalized_and_filterable(self):
+        response, body = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="bookings-', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual([int(row['booking_id']) for row in rows], [booking.pk for booking in self.bookings])
+        self.assertEqual(rows[1]['movie_title'], 'Second, "quoted" Movie')
+        self.assertEqual((rows[1]['seats'], rows[1]['seat_count'], rows[1]['amount_paid']), ("A2 B2", "2", "190.00"))
+        self.assertEqual((rows[1]['showtime_date'], rows[1]['screen'], rows[1]['status']), ("2025-06-01", "Screen 1", "confirmed"))
+
+        _, body = self.export('csv', movie=self.second.movie_id)
+        self.assertEqual(len(list(csv.DictReader(StringIO(body)))), 2)
+        _, body = self.export('csv', date_from=timezone.localdate(), showtime=self.first.pk)
+        self.assertEqual(len(list(csv.DictReader(StringIO(body)))), 2)
+        self.assertEqual(self.client.get(reverse('booking-export', args=['csv']), {'date_from': 'soon'}).status_code, 400)
+
+    def test_ndjson_export_reads_in_chunks_without_per_row_queries(self):
+        with override_settings(EXPORT_CHUNK_SIZE=2):
+            _, body = self.export('ndjson')
+            # Without server-side cursors the rows are read in keyset batches
+            with mock.patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}):
+                with CaptureQueriesContext(connection) as queries:
+                    _, batched = self.export('ndjson', status=Booking.CONFIRMED)
+        self.assertEqual(batched, body)
+        self.assertEqual(len([q for q in queries if 'movies_booking' in q['sql']]), 3)
+
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0]['seats'], ["A1", "B1"])
+        self.assertEqual(lines[0]['movie_title'], "Test Movie")
+        self.assertEqual(lines[0]['showtime_time'], "19:00:00")
+
+    def test_export_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse('booking-export', args=['xml'])).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('booking-export', args=['csv'])).status_code, 403)
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.first = create_showtime()
+        self.movie = self.first.movie
+        self.second = Showtime.objects.create(
+            movie=self.movie, date=self.first.date, time=time(22, 0), screen="Screen 2", seat_layout=self.first.seat_layout,
+        )
+
+    def rollups(self):
+        return (
+            list(Showtime.objects.order_by('pk').values_list('pk', 'tickets_sold', 'revenue')),
+            list(MovieDailySales.objects.order_by('movie', 'date').values_list('movie', 'date', 'showtimes', 'capacity', 'tickets_sold', 'revenue')),
+            list(ScreenDailySales.objects.order_by('screen', 'date').values_list('screen', 'date', 'showtimes', 'capacity', 'tickets_sold', 'revenue')),
+        )
+
+    def assertRollupsRebuild(self):
+        """The incrementally maintained rollups match a rebuild from scratch"""
+        incremental = self.rollups()
+        rebuild_sales()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_bookings_and_cancellations_keep_the_rollups_in_step(self):
+        day = MovieDailySales.objects.get(movie=self.movie, date=self.first.date)
+        self.assertEqual((day.showtimes, day.capacity, day.tickets_sold), (2, 80, 0))
+
+        kept = Booking.objects.create(user_email="a@example.com", user_name="A", showtime=self.first, seats=["A1", "A2", "A1"])
+        book_batch([
+            Booking(user_email="b@example.com", user_name="B", showtime_id=self.first.pk, seats=["B1"], amount_paid=150),
+            Booking(user_email="b@example.com", user_name="B", showtime_id=self.second.pk, seats=["B1", "B2"], amount_paid=300),
+        ])
+        hold = hold_seats(self.second.pk, ["C1"])
+        held = book_hold(hold.token, Booking(user_email="c@example.com", user_name="C", seats=["C1"], amount_paid=190))
+        cancel_booking(held.pk)
+        cancel_booking(held.pk, refund=True)  # Only the status changes
+
+        day.refresh_from_db()
+        self.assertEqual((day.tickets_sold, day.revenue, day.fill_rate), (5, Decimal("640.00"), 0.0625))
+        screen = ScreenDailySales.objects.get(screen="Screen 2", date=self.first.date)
+        self.assertEqual((screen.showtimes, screen.tickets_sold, screen.revenue), (1, 2, Decimal("300.00")))
+        self.assertRollupsRebuild()
+
+        cancel_showtime(self.second.pk)
+        day = MovieDailySales.objects.get(movie=self.movie, date=self.first.date)
+        self.assertEqual((day.showtimes, day.capacity, day.tickets_sold, day.revenue), (1, 40, 3, Decimal("340.00")))
+        self.assertEqual(kept.pk, Booking.objects.get(status=Booking.CONFIRMED, showtime=self.first, seats=["A1", "A2", "A1"]).pk)
+        self.assertRollupsRebuild()
+
+    def test_rollups_follow_schedule_changes_and_bulk_inserts(self):
+        Booking.objects.create(user_email="a@example.com", user_name="A", showtime=self.second, seats=["A1"])
+        self.second.refresh_from_db()
+        self.second.date += timedelta(days=1)
+        self.second.save()
+        self.assertEqual(MovieDailySales.objects.get(date=self.first.date).tickets_sold, 0)
+        self.assertEqual(MovieDailySales.objects.get(date=self.second.date).tickets_sold, 1)
+        self.assertRollupsRebuild()
+
+        # Showtimes inserted in bulk have no rollup rows until their first sale
+        extra = Showtime.objects.bulk_create([
+            Showtime(movie=self.movie, date=date(2025, 7, 1), time=time(10, 0), screen="Screen 3",
+                     seat_layout=self.first.seat_layout, capacity=40),
+            Showtime(movie=self.movie, date=date(2025, 7, 1), time=time(13, 0), screen="Screen 3",
+                     seat_layout=self.first.seat_layout, capacity=40),
+        ])
+        book_batch([
+            Booking(user_email="b@example.com", user_name="B", showtime_id=showtime.pk, seats=["A1", "A2"])
+            for showtime in extra
+        ])
+        day = MovieDailySales.objects.get(date=date(2025, 7, 1))
+        self.assertEqual((day.showtimes, day.capacity, day.tickets_sold), (2, 80, 4))
+        self.assertRollupsRebuild()
+
+    def test_reports_read_the_rollups(self):
+        for n in range(3):
+            Booking.objects.create(user_email="a@example.com", user_name="A", showtime=self.first, seats=[f"A{n + 1}"])
+        url = reverse('sales-report-movies')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create_user("finance", password="pw", is_staff=True))
+
+        # Session and user lookups, then one page of rollup rows (with a COUNT)
+        with self.assertNumQueries(4):
+            report = self.client.get(url, {"date_from": self.first.date, "date_to": self.first.date}).json()
+        self.assertEqual(report["results"], [{
+            "date": "2025-06-01", "movie": self.movie.pk, "movie_title": "Test Movie", "showtimes": 2,
+            "capacity": 80, "tickets_sold": 3, "revenue": "570.00", "fill_rate": 0.0375,
+        }])
+        screens = self.client.get(reverse('sales-report-screens'), {"screen": "Screen 1"}).json()["results"]
+        self.assertEqual([(row["screen"], row["tickets_sold"]) for row in screens], [("Screen 1", 3)])
+        showtimes = self.client.get(reverse('sales-report-showtimes'), {"movie": self.movie.pk}).json()["results"]
+        self.assertEqual([(row["id"], row["fill_rate"]) for row in showtimes], [(self.first.pk, 0.075), (self.second.pk, 0.0)])
+        self.assertEqual(self.client.get(url, {"date_from": "2025-06-02"}).json()["results"], [])
+
+
+@override_settings(SCHEDULE_CLEANING_MINUTES=20, SCHEDULE_SLOT_MINUTES=15, SCHEDULE_OPENING=time(10, 0),
+                   SCHEDULE_CLOSING=time(0, 30))
+class SchedulingTests(TestCase):
+    def setUp(self):
+        self.layout = SeatLayout.objects.create(name="Standard", rows="A,B", seats_per_row=10)
+        self.long = Movie.objects.create(title="Long", description="...", duration=160, poster="movie-posters/test.jpg")
+        self.short = Movie.objects.create(title="Short", description="...", duration=90, poster="movie-posters/test.jpg")
+        self.day = date(2025, 6, 1)
+
+    def showtime(self, start, movie=None, day=None, screen="Screen 1"):
+        return Showtime(movie=movie or self.long, date=day or self.day, time=start, screen=screen, seat_layout=self.layout)
+
+    def test_showtimes_may_not_overlap_on_a_screen(self):
+        self.showtime(time(19, 0)).save()
+        # 19:00 + 160 minutes + 20 minutes cleaning
+        with self.assertRaisesMessage(ValidationError, "taken by showtime 1 from 2025-06-01 19:00 until 2025-06-01 22:00"):
+            self.showtime(time(21, 45), movie=self.short).full_clean()
+        with self.assertRaises(ValidationError):
+            self.showtime(time(17, 40)).full_clean()
+        self.showtime(time(22, 0)).full_clean()
+        self.showtime(time(16, 0)).full_clean()
+        self.showtime(time(20, 0), screen="Screen 2").full_clean()
+        # Editing a showtime does not clash with itself
+        Showtime.objects.get().full_clean()
+
+        # Late shows block the next morning; cancelled ones block nothing
+        late = self.showtime(time(23, 30))
+        late.save()
+        with self.assertRaises(ValidationError):
+            self.showtime(time(2, 0), day=self.day + timedelta(days=1)).full_clean()
+        Showtime.objects.filter(pk=late.pk).update(is_cancelled=True)
+        self.showtime(time(2, 0), day=self.day + timedelta(days=1)).full_clean()
+
+    def test_existing_overlapping_showtimes_are_still_checked(self):
+        # Left overlapping by data loaded before scheduling was checked
+        long = Showtime.objects.bulk_create([
+            self.showtime(time(10, 0), movie=Movie.objects.create(title="Epic", description="...", duration=200)),
+        ])[0]
+        self.showtime(time(10, 10), movie=Movie.objects.create(title="Short", description="...", duration=20)).save()
+
+        with self.assertRaisesMessage(ValidationError, f"showtime {long.pk} from 2025-06-01 10:00 until 2025-06-01 13:40"):
+            self.showtime(time(12, 0), movie=self.short).full_clean()
+        self.assertEqual(validate_slots([Slot("Screen 1", self.day, time(12, 0), None, 90)])[0].showtime, long.pk)
+        self.showtime(time(13, 40), movie=self.short).full_clean()
+
+        schedule = Schedule()
+        for start, duration in [(600, 200), (610, 20), (1000, 10), (500, 50)]:
+            schedule.add("Screen 1", self.day, time(start // 60, start % 60), duration, start)
+        base = self.day.toordinal() * 24 * 60
+        self.assertEqual([end - base for end in schedule.indexes[("Screen 1", self.day)].max_ends], [570, 820, 820, 1030])
+        self.assertEqual(schedule.conflict("Screen 1", self.day, time(13, 0), 10).showtime, 600)
+        self.assertIsNone(schedule.conflict("Screen 1", self.day, time(13, 40), 10))
+
+    def test_validate_slots_in_one_pass(self):
+        self.showtime(time(10, 0)).save()
+        slots = [
+            Slot("Screen 1", self.day, time(12, 0), None, 90),   # Overlaps the existing 10:00 show
+            Slot("Screen 1", self.day, time(13, 0), None, 90),
+            Slot("Screen 1", self.day, time(14, 0), None, 90),   # Overlaps the slot above
+            Slot("Screen 2", self.day, time(12, 0), None, 90),
+        ]
+        with self.assertNumQueries(1):
+            conflicts = validate_slots(slots + [Slot(f"Screen {n}", self.day, time(10, 0), None, 90) for n in range(3, 500)])
+        self.assertEqual(sorted(conflicts), [0, 2])
+        self.assertEqual(conflicts[0].showtime, Showtime.objects.get().pk)
+        self.assertEqual(conflicts[2].showtime, slots[1])
+
+    def test_plan_packs_screens_around_existing_showtimes(self):
+        existing = self.showtime(time(15, 0), movie=self.short)
+        existing.save()
+        movies = [(self.long.pk, 160), (self.short.pk, 90)]
+        with self.assertNumQueries(1):
+            slots = plan_schedule(movies, ["Screen 1", "Screen 2"], self.day, 2)
+
+        schedule = Schedule.load(self.day, self.day + timedelta(days=1))
+        for slot in slots:
+            self.assertIsNone(schedule.conflict(slot.screen, slot.date, slot.time, slot.duration))
+            schedule.add(slot.screen, slot.date, slot.time, slot.duration, slot)
+            self.assertEqual(slot.time.minute % 15, 0)
+            end = datetime.combine(slot.date, slot.time) + timedelta(minutes=slot.duration)
+            self.assertLessEqual(end, datetime.combine(slot.date + timedelta(days=1), time(0, 30)))
+
+        first_day = [(slot.time, slot.movie_id) for slot in slots if slot.screen == "Screen 1" and slot.date == self.day]
+        self.assertEqual(first_day, [
+            (time(10, 0), self.short.pk), (time(12, 0), self.long.pk), (time(17, 0), self.long.pk),
+            (time(20, 0), self.short.pk), (time(22, 0), self.short.pk),
+        ])
+
+    def test_generate_schedule_command(self):
+        out = StringIO()
+        call_command('generate_schedule', start=self.day, days=2, screens=["Screen 1=Standard", "Screen 2=Standard"],
+                     dry_run=True, stdout=out)
+        self.assertIn("showtimes on 2 screens over 2 days", out.getvalue())
+        self.assertFalse(Showtime.objects.exists())
+
+        call_command('generate_schedule', start=self.day, days=2, screens=["Screen 1=Standard", "Screen 2=Standard"],
+                     stdout=StringIO())
+        created = Showtime.objects.count()
+        self.assertGreater(created, 8)
+        self.assertEqual(ScreenDailySales.objects.get(screen="Screen 1", date=self.day).capacity,
+                         Showtime.objects.filter(screen="Screen 1", date=self.day).count() * 20)
+        # A second run finds every screen full
+        call_command('generate_schedule', start=self.day, days=2, stdout=StringIO())
+        self.assertEqual(Showtime.objects.count(), created)
+
+
+class SeatMapTests(TestCase):
+    def test_seat_grid_bitmap_round_trip(self):
+        grid = SeatGrid(["A", "B"], 5)
+        mask = grid.mask(["A1", "B5", "A3"])
+        self.assertEqual(mask, 0b1000000101)
+        self.assertEqual(grid.seats(mask), ["A1", "A3", "B5"])
+        self.assertEqual(grid.seats(grid.available(mask)), ["A2", "A4", "A5", "B1", "B2", "B3", "B4"])
+        self.assertEqual(from_bytes(grid.to_bytes(mask)), mask)
+        self.assertEqual(grid.encode(mask), "BQI=")
+
+    def test_best_seats_prefers_centre_of_preferred_row(self):
+        grid = SeatGrid("ABCDEFGHIJ", 15)
+        self.assertEqual(grid.seats(grid.best_seats(0, 4)), ["G6", "G7", "G8", "G9"])
+        # Taken centre seats push the party to the next best row, not the aisle
+        taken = grid.mask(["G7", "G8"])
+        self.assertEqual(grid.seats(grid.best_seats(taken, 4)), ["F6", "F7", "F8", "F9"])
+        self.assertEqual(grid.best_seats(grid.full, 1), 0)
+        self.assertEqual(grid.best_seats(0, 16), 0)
+
+    def test_best_seats_avoids_stranding_single_seats(self):
+        grid = SeatGrid(["A"], 8)
+        # A3-A4 is the most central pair but would strand A2; A6-A7 fills a gap exactly
+        taken = grid.mask(["A1", "A5", "A8"])
+        self.assertEqual(grid.seats(grid.best_seats(taken, 2)), ["A6", "A7"])
+        self.assertEqual(grid.seats(grid.best_seats(taken, 3)), ["A2", "A3", "A4"])
+
+    def test_seat_grid_rejects_unknown_seats(self):
+        with self.assertRaises(InvalidSeatError) as ctx:
+            SeatGrid(["A"], 5).mask(["A1", "A6", "Z1"])
+        self.assertEqual(ctx.exception.seats, ["A6", "Z1"])
+
+    def test_booking_updates_seat_map(self):
+        showtime = create_showtime()
+        Booking.objects.create(user_email="a@example.com", user_name="A", showtime=showtime, seats=["B2", "A1"])
+        showtime = Showtime.objects.get(pk=showtime.pk)
+        self.assertEqual(showtime.get_booked_seats(), ["A1", "B2"])
+        self.assertTrue(showtime.is_seat_booked("B2"))
+        self.assertFalse(showtime.is_seat_booked("B3"))
+        self.assertEqual(len(showtime.get_available_seats()), 38)
+
+        response = self.client.get(reverse('showtime-detail', args=[showtime.pk]))
+        self.assertEqual(response.json()['seat_map'], showtime.get_seat_map())
+
+    def test_create_booking_api_rejects_unknown_seat(self):
+        showtime = create_showtime()
+        response = self.client.post(
+            reverse('booking-create'),
+            {"user_email": "b@example.com", "user_name": "B", "showtime": showtime.pk, "seats": ["Z1"]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"seats": ["Seat Z1 does not exist"]})
+
+    def test_create_booking_api_rejects_repeated_seats(self):
+        showtime = create_showtime()
+        response = self.client.post(
+            reverse('booking-create'),
+            {"user_email": "b@example.com", "user_name": "B", "showtime": showtime.pk, "seats": ["A1", "A1"]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"seats": ["Seat A1 is selected more than once"]})
+        self.assertEqual(Booking.objects.count(), 0)
+
+
+class SeatHoldTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+
+    def test_held_seats_are_unavailable(self):
+        response = self.client.post(
+            reverse('seat-hold-create', args=[self.showtime.pk]), {"seats": ["A1", "A2"]}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['seats'], ["A1", "A2"])
+
+        with self.assertRaises(SeatUnavailableError):
+            hold_seats(self.showtime.pk, ["A2", "A3"])
+        self.showtime.refresh_from_db()
+        self.assertTrue(self.showtime.is_seat_booked("A1"))
+
+    def test_hold_best_available_seats(self):
+        url = reverse('seat-hold-create', args=[self.showtime.pk])
+        first = self.client.post(url, {"count": 3}, content_type="application/json")
+        self.assertEqual(first.status_code, 201)
+        second = self.client.post(url, {"count": 3}, content_type="application/json")
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(len(set(first.json()['seats'] + second.json()['seats'])), 6)
+
+        response = self.client.post(url, {"count": 11}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("no 11 seats together", response.json()['seats'][0])
+        response = self.client.post(url, {"count": 2, "seats": ["A1"]}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_oversized_counts_are_rejected_without_caching(self):
+        url = reverse('seat-hold-create', args=[self.showtime.pk])
+        grid = self.showtime.seat_layout.get_grid()
+        grid._blocks.clear()
+        for count in (MAX_PARTY + 1, 10 ** 9):
+            response = self.client.post(url, {"count": count}, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('count', response.json())
+        for count in range(11, MAX_PARTY + 1):
+            self.assertEqual(self.client.post(url, {"count": count}, content_type="application/json").status_code, 400)
+        self.assertEqual(grid._blocks, {})
+
+    def test_seats_must_be_seat_ids(self):
+        url = reverse('seat-hold-create', args=[self.showtime.pk])
+        for seats in ([1, 2], [["A1"]], [{"seat": "A1"}], "A1"):
+            response = self.client.post(url, {"seats": seats}, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"seats": ["Select at least one seat"]})
+        self.assertEqual(SeatHold.objects.count(), 0)
+
+    def test_booking_converts_hold(self):
+        seat_hold = hold_seats(self.showtime.pk, ["C1", "C2"])
+        response = self.client.post(
+            reverse('booking-create'),
+            {"user_email": "a@example.com", "user_name": "A", "showtime": self.showtime.pk,
+             "seats": ["C2", "C1"], "hold": str(seat_hold.token)},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        booking = Booking.objects.get()
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(
+            set(booking.reservations.values_list('seat_id', 'state')),
+            {("C1", SeatReservation.BOOKED), ("C2", SeatReservation.BOOKED)},
+        )
+
+    def test_expired_hold_is_released_on_read(self):
+        seat_hold = hold_seats(self.showtime.pk, ["D1"])
+        SeatHold.objects.filter(pk=seat_hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        Showtime.objects.filter(pk=self.showtime.pk).update(holds_expire_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.client.get(reverse('showtime-detail', args=[self.showtime.pk]))
+        self.assertNotIn("D1", response.json()['booked_seats'])
+        self.assertFalse(SeatReservation.objects.exists())
+
+        response = self.client.post(
+            reverse('booking-create'),
+            {"user_email": "a@example.com", "user_name": "A", "showtime": self.showtime.pk,
+             "seats": ["D1"], "hold": str(seat_hold.token)},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('hold', response.json())
+
+    def test_release_hold(self):
+        seat_hold = hold_seats(self.showtime.pk, ["B5"])
+        response = self.client.delete(reverse('seat-hold-detail', args=[seat_hold.token]))
+        self.assertEqual(response.status_code, 204)
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.get_booked_seats(), [])
+
+
+class QueryCountTests(TestCase):
+    """Every endpoint must run a constant number of queries, however many rows it returns"""
+
+    def setUp(self):
+        self.showtime = create_showtime()
+
+    def add_rows(self, count):
+        for n in range(count):
+            movie = Movie.objects.create(title=f"Movie {n}", description="...", poster="movie-posters/test.jpg")
+            showtime = Showtime.objects.create(
+                movie=movie, date=date(2025, 6, 1), time=time(10, 0), screen="Screen 2",
+                seat_layout=self.showtime.seat_layout,
+            )
+            Booking.objects.create(
+                user_email="fan@example.com", user_name="Fan", showtime=showtime, seats=[f"A{n % 10 + 1}"]
+            )
+
+    def count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, **params):
+        self.add_rows(1)
+        few = self.count_queries(url, **params)
+        self.add_rows(8)
+        many = self.count_queries(url, **params)
+        self.assertEqual(few, many, f"{url} {params} went from {few} to {many} queries")
+
+    def test_movie_list(self):
+        self.assertConstantQueries(reverse('movie-list'))
+
+    def test_showtime_list(self):
+        self.assertConstantQueries(reverse('showtime-list'))
+
+    def test_showtime_list_with_movie_details(self):
+        self.assertConstantQueries(reverse('showtime-list'), movieDetails='true')
+
+    def test_booking_list(self):
+        self.assertConstantQueries(reverse('booking-list'), user_email="fan@example.com")
+
+    def test_detail_endpoints(self):
+        # One lookup for the conditional GET validator, one for the object
+        self.assertLessEqual(self.count_queries(reverse('movie-detail', args=[self.showtime.movie_id])), 2)
+        self.assertLessEqual(self.count_queries(reverse('showtime-detail', args=[self.showtime.pk])), 2)
+
+    def test_booking_create(self):
+        # Savepoint, lock and load the showtime (an UPDATE then a SELECT on
+        # SQLite, one SELECT ... FOR UPDATE elsewhere), insert the booking and
+        # its reservations, add the sale to the two daily rollups, save the
+        # showtime, release the savepoint
+        expected = 9 if connection.vendor == 'sqlite' else 8
+        for seats in (["A1"], ["B1", "B2", "B3", "B4"]):
+            with self.assertNumQueries(expected):
+                response = self.client.post(reverse('booking-create'), {
+                    "user_email": "a@example.com", "user_name": "A", "showtime": self.showtime.pk, "seats": seats,
+                }, content_type="application/json")
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json()['showtime']['id'], self.showtime.pk)
+
+
+class CatalogueCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.movie = Movie.objects.create(title="Cached Movie", description="...", poster="movie-posters/test.jpg")
+
+    def test_repeat_requests_are_served_from_cache(self):
+        url = reverse('movie-list')
+        self.client.get(url, {"search": "Cached  Movie"})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"search": " cached movie"})
+        self.assertEqual(response.json()['results'][0]['title'], "Cached Movie")
+
+        self.client.get(reverse('movie-detail', args=[self.movie.pk]))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('movie-detail', args=[self.movie.pk]))
+
+    def test_saving_a_movie_invalidates_the_cache(self):
+        self.client.get(reverse('movie-list'))
+        self.client.get(reverse('movie-detail', args=[self.movie.pk]))
+        self.movie.title = "Renamed Movie"
+        self.movie.save()
+
+        self.assertEqual(self.client.get(reverse('movie-list')).json()['results'][0]['title'], "Renamed Movie")
+        self.assertEqual(self.client.get(reverse('movie-detail', args=[self.movie.pk])).json()['title'], "Renamed Movie")
+
+        movie_id = self.movie.pk
+        self.movie.delete()
+        self.assertEqual(self.client.get(reverse('movie-list')).json()['count'], 0)
+        self.assertEqual(self.client.get(reverse('movie-detail', args=[movie_id])).status_code, 404)
+
+
+class UpcomingShowtimesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime()
+        self.other = Movie.objects.create(title="Another Movie", description="...", poster="movie-posters/test.jpg")
+        layout = self.showtime.seat_layout
+        for day, start, screen in [(2, time(21, 0), "Screen 1"), (2, time(14, 0), "Screen 2"), (3, time(12, 0), "Screen 1")]:
+            Showtime.objects.create(movie=self.other, date=date(2025, 6, day), time=start, screen=screen, seat_layout=layout)
+        # Cancelled or outside the window
+        Showtime.objects.create(movie=self.other, date=date(2025, 6, 3), time=time(20, 0), screen="Screen 9",
+                                seat_layout=layout, is_cancelled=True)
+        Showtime.objects.create(movie=self.other, date=date(2025, 6, 9), time=time(12, 0), screen="Screen 1", seat_layout=layout)
+        self.url = reverse('showtime-upcoming')
+
+    def get(self, **params):
+        return self.client.get(self.url, {'start': '2025-06-01', 'days': 7, **params})
+
+    def test_grouped_by_movie_and_date_from_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['start'], data['days']), ('2025-06-01', 7))
+        self.assertEqual([movie['title'] for movie in data['movies']], ["Another Movie", "Test Movie"])
+
+        another = data['movies'][0]
+        self.assertEqual(another['poster_url'], '/media/movie-posters/test.jpg')
+        self.assertEqual([day['date'] for day in another['dates']], ['2025-06-02', '2025-06-03'])
+        self.assertEqual([(show['time'], show['screen']) for show in another['dates'][0]['showtimes']],
+                         [('14:00:00', 'Screen 2'), ('21:00:00', 'Screen 1')])
+        self.assertEqual(data['movies'][1]['dates'], [{'date': '2025-06-01', 'showtimes': [{
+            'id': self.showtime.pk, 'time': '19:00:00', 'screen': 'Screen 1', 'capacity': 40, 'seats_left': 40,
+            'is_sold_out': False,
+        }]}])
+
+        # Served from the cache, and narrowed to one movie
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get().json(), data)
+            response = self.get(movie=self.showtime.movie_id)
+        self.assertEqual(response.json()['movies'], data['movies'][1:])
+        self.assertEqual([movie['title'] for movie in self.get(days=1).json()['movies']], ["Test Movie"])
+        self.assertEqual(len(self.get(days=9).json()['movies'][0]['dates']), 3)
+
+    def test_bookings_and_edits_invalidate_the_cache(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.showtime.pk, ["A1", "A2"])
+        movie = self.get().json()['movies'][1]
+        self.assertEqual(movie['dates'][0]['showtimes'][0]['seats_left'], 38)
+
+        self.showtime.refresh_from_db()
+        self.showtime.time = time(18, 0)
+        self.showtime.save()
+        self.assertEqual(self.get().json()['movies'][1]['dates'][0]['showtimes'][0]['time'], '18:00:00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_showtime(self.showtime.pk)
+        self.assertEqual(len(self.get().json()['movies']), 1)
+
+        self.other.title = "Renamed Movie"
+        self.other.save()
+        self.assertEqual(self.get().json()['movies'][0]['title'], "Renamed Movie")
+
+    @override_settings(UPCOMING_DAYS=14, UPCOMING_MAX_DAYS=31)
+    def test_window_defaults_to_today(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual((data['start'], data['days']), (timezone.localdate().isoformat(), 14))
+        self.assertEqual(self.get(days=0).status_code, 400)
+        self.assertEqual(self.get(days=32).status_code, 400)
+        self.assertEqual(self.get(start='2025-02-30').status_code, 400)
+
+
+def poster_upload(width=600, height=900, name="poster.png"):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class PosterVariantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def open_variant(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        return response, Image.open(BytesIO(b''.join(response.streaming_content)))
+
+    def test_upload_creates_webp_variants_named_by_content(self):
+        movie = Movie.objects.create(title="Poster", description="...", poster=poster_upload())
+        self.assertEqual(len(movie.poster_hash), 16)
+        for width in settings.POSTER_WIDTHS:
+            self.assertTrue(default_storage.exists(variant_name(movie.poster_hash, width)))
+
+        variants = self.client.get(reverse('movie-list')).json()['results'][0]['poster_variants']
+        self.assertEqual(list(variants), [str(width) for width in settings.POSTER_WIDTHS])
+        response, image = self.open_variant(variants['400'])
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual((image.format, image.size), ('WEBP', (400, 600)))
+        # Never scaled up past the original
+        self.assertEqual(self.open_variant(variants['800'])[1].size, (600, 900))
+
+        # Same content, same URLs; a new poster gets new ones
+        same = Movie.objects.create(title="Same", description="...", poster=poster_upload(name="copy.png"))
+        self.assertEqual(same.poster_hash, movie.poster_hash)
+        movie.poster = poster_upload(width=300, height=450)
+        movie.save()
+        self.assertNotEqual(movie.poster_hash, same.poster_hash)
+        self.assertNotEqual(self.client.get(reverse('movie-detail', args=[movie.pk])).json()['poster_variants'], variants)
+
+    def test_missing_variants_are_generated_on_first_request(self):
+        movie = Movie.objects.create(title="Poster", description="...", poster=poster_upload())
+        name = variant_name(movie.poster_hash, 200)
+        default_storage.delete(name)
+        self.assertEqual(self.open_variant(movie.poster_variants[200])[1].size, (200, 300))
+        self.assertTrue(default_storage.exists(name))
+
+        self.assertEqual(self.client.get(f'/api/movies/posters/{movie.poster_hash}/123.webp').status_code, 404)
+        self.assertEqual(self.client.get('/api/movies/posters/0123456789abcdef/200.webp').status_code, 404)
+
+    def test_command_hashes_existing_posters(self):
+        movie = Movie.objects.create(title="Poster", description="...", poster=poster_upload())
+        digest = movie.poster_hash
+        Movie.objects.create(title="Shared", description="...", poster=movie.poster.name)
+        Movie.objects.update(poster_hash='', updated_at=timezone.now() - timedelta(days=1))
+        stale = Movie.objects.get(pk=movie.pk).updated_at
+        for width in settings.POSTER_WIDTHS:
+            default_storage.delete(variant_name(digest, width))
+        # Posters that were never uploaded are reported, not fatal
+        Movie.objects.create(title="Missing", description="...", poster="movie-posters/missing.jpg")
+
+        out = StringIO()
+        call_command('generate_poster_variants', stdout=out, stderr=StringIO())
+        self.assertIn(f'Hashed 2 movies, wrote {len(settings.POSTER_WIDTHS)} variants of 1 posters, 1 unreadable', out.getvalue())
+        self.assertEqual(set(Movie.objects.exclude(title="Missing").values_list('poster_hash', flat=True)), {digest})
+        self.assertTrue(default_storage.exists(variant_name(digest, settings.POSTER_WIDTHS[0])))
+        # New poster URLs are new content for Last-Modified and showtime ETags
+        self.assertGreater(Movie.objects.get(pk=movie.pk).updated_at, stale)
+
+
+class MovieFilterTests(TestCase):
+    def test_year_filter_covers_the_whole_year(self):
+        cache.clear()
+        for day in [date(2019, 12, 31), date(2020, 1, 1), date(2020, 12, 31), date(2021, 1, 1)]:
+            Movie.objects.create(title=str(day), description="...", release_date=day, poster="movie-posters/test.jpg")
+
+        response = self.client.get(reverse('movie-list'), {"release_date": "2020", "ordering": "release_date"})
+        self.assertEqual([movie['title'] for movie in response.json()['results']], ["2020-01-01", "2020-12-31"])
+        self.assertEqual(self.client.get(reverse('movie-list'), {"release_date": "soon"}).json()['count'], 4)
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Ties and nulls in release_date exercise the composite key
+        for i in range(30):
+            Movie.objects.create(
+                title=f"Movie {i:02}", description="...", poster="movie-posters/test.jpg",
+                release_date=None if i % 7 == 0 else date(2020, 1 + i % 3, 1),
+            )
+        self.expected = list(
+            Movie.objects.order_by(F('release_date').asc(nulls_first=True), 'id').values_list('title', flat=True)
+        )
+
+    def walk(self, url, params):
+        titles, response = [], self.client.get(url, params).json()
+        titles.extend(movie['title'] for movie in response['results'])
+        while response['next']:
+            response = self.client.get(response['next']).json()
+            titles.extend(movie['title'] for movie in response['results'])
+        return titles, response
+
+    def test_cursor_pages_cover_every_row_once_in_both_directions(self):
+        titles, last_page = self.walk(reverse('movie-list'), {"pagination": "cursor"})
+        self.assertEqual(titles, self.expected)
+        self.assertNotIn('count', last_page)
+
+        back = []
+        response = last_page
+        while response['previous']:
+            response = self.client.get(response['previous']).json()
+            back = [movie['title'] for movie in response['results']] + back
+        self.assertEqual(back, self.expected[:len(back)])
+        self.assertEqual(len(back), len(self.expected) - len(last_page['results']))
+
+    def test_cursor_follows_ordering_param(self):
+        titles, _ = self.walk(reverse('movie-list'), {"pagination": "cursor", "ordering": "-title"})
+        self.assertEqual(titles, sorted(self.expected, reverse=True))
+
+    def test_cursor_pages_do_not_offset_or_count(self):
+        response = self.client.get(reverse('movie-list'), {"pagination": "cursor"}).json()
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response['next'])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+        self.assertNotIn('COUNT', queries[0]['sql'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(reverse('movie-list'), {"cursor": "bogus"}).status_code, 404)
+
+    def test_approximate_count(self):
+        response = self.client.get(reverse('movie-list'), {"count": "approximate"}).json()
+        self.assertEqual((response['count'], response['count_approximate']), (30, False))
+
+        with mock.patch('movies.pagination.APPROXIMATE_COUNT_LIMIT', 20):
+            cache.clear()
+            response = self.client.get(reverse('movie-list'), {"count": "approximate", "page": 3}).json()
+            self.assertTrue(response['count_approximate'])
+            # Pages past the estimate are still reachable
+            self.assertEqual(len(response['results']), 6)
+            self.assertIsNone(response['next'])
+
+            response = self.client.get(reverse('movie-list'), {"count": "approximate", "pagination": "cursor"}).json()
+            self.assertEqual((response['count'], response['count_approximate']), (20, True))
+
+    def test_booking_history_cursor(self):
+        showtime = create_showtime()
+        for seat in ["A1", "A2", "A3", "B1", "B2"]:
+            Booking.objects.create(user_email="fan@example.com", user_name="Fan", showtime=showtime, seats=[seat])
+        self.client.get(reverse('booking-list'), {"user_email": "fan@example.com"})
+        with mock.patch('movies.pagination.ListPagination.page_size', 2):
+            response = self.client.get(reverse('booking-list'), {"user_email": "fan@example.com", "pagination": "cursor"}).json()
+            seats = [booking['seats'][0] for booking in response['results']]
+            while response['next']:
+                response = self.client.get(response['next']).json()
+                seats.extend(booking['seats'][0] for booking in response['results'])
+        self.assertEqual(seats, ["B2", "B1", "A3", "A2", "A1"])
+
+
+@override_settings(PERF_METRICS_SAMPLE_RATE=1.0, PERF_METRICS_TOKEN='scrape-me')
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_recorder().reset()
+        self.showtime = create_showtime()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('movie-list'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries, 0 duplicates"')
+        self.assertRegex(timing, r'serializer;dur=[\d.]+')
+
+        with override_settings(PERF_METRICS_SAMPLE_RATE=0):
+            self.assertFalse(self.client.get(reverse('movie-list')).has_header('Server-Timing'))
+
+    def test_serializer_time_is_recorded_without_patching_drf(self):
+        self.assertEqual(BaseSerializer.data.fget.__module__, 'rest_framework.serializers')
+        self.client.get(reverse('movie-list'))
+        self.client.get(reverse('async-showtime-list'))
+        totals = get_recorder().totals
+        self.assertGreater(totals[('movie-list', 'GET')]['serializer'], 0)
+        self.assertGreater(totals[('async-showtime-list', 'GET')]['serializer'], 0)
+
+    def test_duplicate_queries_are_counted(self):
+        timings = RequestTimings()
+        with timings.capture_queries():
+            for _ in range(3):
+                list(Movie.objects.filter(pk=self.showtime.movie_id))
+            list(Movie.objects.filter(pk=self.showtime.movie_id + 1))
+        self.assertEqual((timings.query_count, timings.duplicate_queries), (4, 2))
+        self.assertGreater(timings.db, 0)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('movie-list'))
+        self.client.get(reverse('showtime-detail', args=[self.showtime.pk]))
+
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('movies_request_seconds_count{view="movie-list",method="GET"} 1', body)
+        self.assertIn('movies_request_seconds{view="showtime-detail",method="GET",quantile="0.95"}', body)
+        self.assertIn('movies_db_duplicate_queries_total{view="movie-list",method="GET"} 0', body)
+
+        staff = User.objects.create_user('ops', password='secret', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class MovieSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.knight = Movie.objects.create(
+            title="The Dark Knight", description="Batman faces the Joker.", director="Christopher Nolan",
+            cast="Christian Bale, Heath Ledger", poster="movie-posters/test.jpg",
+        )
+        self.inception = Movie.objects.create(
+            title="Inception", description="A thief steals secrets from dreams, like a dark knight of the mind.",
+            director="Christopher Nolan", cast="Leonardo DiCaprio", poster="movie-posters/test.jpg",
+        )
+
+    def search(self, text):
+        response = self.client.get(reverse('movie-list'), {"search": text})
+        return [movie['title'] for movie in response.json()['results']]
+
+    def test_searches_people_and_ranks_titles_first(self):
+        self.assertEqual(self.search("nolan"), ["The Dark Knight", "Inception"])
+        self.assertEqual(self.search("dicaprio"), ["Inception"])
+        self.assertEqual(self.search("dark knight"), ["The Dark Knight", "Inception"])
+
+    def test_prefixes_and_typos(self):
+        self.assertEqual(self.search("dar kni"), ["The Dark Knight", "Inception"])
+        self.assertEqual(self.search("incpetion"), ["Inception"])
+        self.assertEqual(self.search("christofer nolen"), ["The Dark Knight", "Inception"])
+        self.assertEqual(self.search("zzzz"), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.inception.title = "Interstellar"
+        self.inception.save()
+        self.assertEqual(self.search("interstellar"), ["Interstellar"])
+        self.knight.delete()
+        self.assertEqual(self.search("nolan"), ["Interstellar"])
+
+    def test_filters_apply_to_every_match(self):
+        # More better-ranked matches than any single page or cap would hold
+        Movie.objects.bulk_create([
+            Movie(title=f"Dark Knight {n}", description="...", genre="Action", poster="movie-posters/test.jpg")
+            for n in range(1200)
+        ])
+        comedy = Movie.objects.create(title="Office Party", description="A dark comedy.", genre="Comedy",
+                                      poster="movie-posters/test.jpg")
+        rebuild_search_index()
+        response = self.client.get(reverse('movie-list'), {"search": "dark", "genre": "Comedy"})
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(response.json()['results'][0]['id'], comedy.pk)
+        self.assertEqual(self.client.get(reverse('movie-list'), {"search": "dark"}).json()['count'], 1203)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime()
+
+    def test_showtime_etag_short_circuits_until_a_booking(self):
+        url = reverse('showtime-detail', args=[self.showtime.pk])
+        etag = self.client.get(url).headers['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Booking.objects.create(user_email="a@example.com", user_name="A", showtime=self.showtime, seats=["A1"])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertIn("A1", response.json()['booked_seats'])
+
+    def test_editing_a_showtime_changes_its_etag(self):
+        url = reverse('showtime-detail', args=[self.showtime.pk])
+        etag = self.client.get(url).headers['ETag']
+        self.showtime.refresh_from_db()
+        self.showtime.time = time(21, 30)
+        self.showtime.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['time'], '21:30:00')
+        async_response = self.client.get(reverse('async-showtime-detail', args=[self.showtime.pk]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(async_response.status_code, 200)
+
+    def test_movie_detail_last_modified(self):
+        url = reverse('movie-detail', args=[self.showtime.movie_id])
+        last_modified = self.client.get(url).headers['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+class AsyncEndpointTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+
+    async def test_showtime_list_matches_sync_endpoint(self):
+        params = {'movie': self.showtime.movie_id, 'movieDetails': 'true'}
+        response = await self.async_client.get(reverse('async-showtime-list'), params)
+        expected = await self.async_client.get(reverse('showtime-list'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected.json())
+
+        response = await self.async_client.get(reverse('async-showtime-list'), {'date': '2025-02-30'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date', response.json())
+
+    async def test_showtime_list_pagination_and_filters_match_sync_endpoint(self):
+        await Showtime.objects.abulk_create([
+            Showtime(movie_id=self.showtime.movie_id, date=date(2025, 6, 2), time=time(10 + n, 0), screen=f"Screen {n}",
+                     seat_layout_id=self.showtime.seat_layout_id, capacity=40, booked_count=n * 2)
+            for n in range(1, 14)
+        ])
+
+        async def compare(params):
+            response = await self.async_client.get(reverse('async-showtime-list'), params)
+            expected = await self.async_client.get(reverse('showtime-list'), params)
+            # Links point back at the endpoint that served them
+            body = json.loads(response.content.decode().replace('/async/showtimes/', '/showtimes/'))
+            self.assertEqual((response.status_code, body), (expected.status_code, expected.json()))
+            return body
+
+        page = await compare({'pagination': 'cursor', 'count': 'approximate'})
+        self.assertEqual((page['count'], len(page['results'])), (14, 12))
+        page = await compare({'cursor': parse_qs(urlsplit(page['next']).query)['cursor'][0]})
+        self.assertEqual(len(page['results']), 2)
+        await compare({'date': '2025-06-02', 'available_min': 20, 'sold_out': 'false'})
+        await compare({'count': 'approximate', 'page': 2})
+        await compare({'cursor': 'garbage'})
+        await compare({'available_min': -1})
+
+    async def test_showtime_detail_honours_etag(self):
+        url = reverse('async-showtime-detail', args=[self.showtime.pk])
+        response = await self.async_client.get(url)
+        expected = await self.async_client.get(reverse('showtime-detail', args=[self.showtime.pk]))
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response.headers['ETag'], expected.headers['ETag'])
+
+        response = await self.async_client.get(url, headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get(reverse('async-showtime-detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_booking_create(self):
+        url = reverse('async-booking-create')
+        data = {'user_email': 'a@example.com', 'user_name': 'A', 'showtime': self.showtime.pk, 'seats': ['A1', 'A2']}
+        response = await self.async_client.post(url, data, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['seats'], ['A1', 'A2'])
+
+        response = await self.async_client.post(url, {**data, 'seats': ['A2']}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('already booked', response.json()['seats'][0])
+        response = await self.async_client.post(url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class RecordingBroker:
+    """Local stand-in broker that records published events"""
+
+    def __init__(self):
+        self.events = []
+
+    def publish(self, showtime_id, event):
+        self.events.append((showtime_id, event))
+
+
+class SeatEventTests(TestCase):
+    def setUp(self):
+        self.broker = RecordingBroker()
+        set_broker(self.broker)
+        self.addCleanup(set_broker, None)
+        self.showtime = create_showtime()
+
+    def test_committed_changes_publish_deltas(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user_email="a@example.com", user_name="A", showtime=self.showtime, seats=["A1"])
+        with self.captureOnCommitCallbacks(execute=True):
+            seat_hold = hold_seats(self.showtime.pk, ["A2"])
+        with self.captureOnCommitCallbacks(execute=True):
+            release_hold(seat_hold.token)
+
+        deltas = [(e['booked'], e['held'], e['released']) for _, e in self.broker.events]
+        self.assertEqual(deltas, [(["A1"], [], []), ([], ["A2"], []), ([], [], ["A2"])])
+        versions = [e['version'] for _, e in self.broker.events]
+        self.assertEqual(versions, sorted(versions))
+
+    def test_failed_booking_publishes_nothing(self):
+        reserve_seats(self.showtime.pk, ["A1"])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(SeatUnavailableError):
+                reserve_seats(self.showtime.pk, ["A1", "A2"])
+        self.assertEqual(len(callbacks), 0)
+
+    def test_wsgi_stream_sends_snapshot(self):
+        reserve_seats(self.showtime.pk, ["A1"])
+        response = self.client.get(reverse('showtime-events', args=[self.showtime.pk]))
+        body = b"".join(response.streaming_content).decode()
+        self.assertIn("event: snapshot", body)
+        self.assertIn('"seat_map": "AQAAAAA="', body)
+
+    def test_in_process_broker_fans_out_across_threads(self):
+        broker = InProcessBroker()
+
+        async def listen():
+            async with broker.subscribe(7) as queue:
+                threading.Thread(target=broker.publish, args=(7, {"booked": ["A1"]})).start()
+                return await asyncio.wait_for(queue.get(), timeout=2)
+
+        self.assertEqual(asyncio.run(listen()), {"booked": ["A1"]})
+        self.assertEqual(broker._subscribers, {})
+
+
+class SampleDataTests(TestCase):
+    def generate(self, seed):
+        call_command(
+            'create_dependency_data', movies=3, days=2, screens=5, bookings=200, seed=seed, batch_size=64, stdout=StringIO()
+        )
+        return list(Booking.objects.order_by('id').values_list('user_email', 'showtime__screen', 'seats'))
+
+    def test_bulk_generator_is_reproducible_and_consistent(self):
+        bookings = self.generate(seed=42)
+        self.assertEqual(len(bookings), 200)
+        self.assertEqual(Movie.objects.count(), 3)
+        # Every screen is packed with at least four shows a day, none overlapping
+        self.assertGreaterEqual(Showtime.objects.count(), 2 * 5 * 4)
+        schedule = Schedule()
+        for showtime in Showtime.objects.select_related('movie').order_by('date', 'time'):
+            self.assertIsNone(schedule.conflict(showtime.screen, showtime.date, showtime.time, showtime.movie.duration))
+            schedule.add(showtime.screen, showtime.date, showtime.time, showtime.movie.duration, showtime.pk)
+        self.assertEqual(self.generate(seed=42), bookings)
+
+        # Seat maps, reservation rows and booking seats all agree
+        for showtime in Showtime.objects.select_related('seat_layout'):
+            reserved = SeatReservation.objects.filter(showtime=showtime).values_list('seat_id', flat=True)
+            booked = [seat for seats in showtime.bookings.values_list('seats', flat=True) for seat in seats]
+            self.assertEqual(sorted(showtime.get_booked_seats()), sorted(reserved))
+            self.assertEqual(sorted(reserved), sorted(booked))
+
+        # New bookings after a bulk load still get fresh ids
+        showtime = Showtime.objects.first()
+        booking = Booking.objects.create(
+            user_email="late@example.com", user_name="Late", showtime=showtime, seats=showtime.get_available_seats()[:1]
+        )
+        self.assertGreater(booking.pk, Booking.objects.exclude(pk=booking.pk).latest('id').pk)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    THREADS = 100
+
+    def test_no_seat_is_sold_twice(self):
+        showtime = create_showtime(rows="A", seats_per_row=12)
+        seats = showtime.seat_layout.get_all_seats()
+        barrier = threading.Barrier(self.THREADS)
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def book(n):
+            # Every thread wants an overlapping pair of seats
+            wanted = [seats[n % len(seats)], seats[(n + 1) % len(seats)]]
+            try:
+                barrier.wait()
+                Booking.objects.create(
+                    user_email=f"user{n}@example.com", user_name=f"User {n}", showtime_id=showtime.pk, seats=wanted
+                )
+                outcome = 'booked'
+            except SeatUnavailableError:
+                outcome = 'unavailable'
+            except BookingConflictError:
+                outcome = 'conflict'
+            finally:
+                connection.close()
+            with lock:
+                outcomes[outcome] += 1
+
+        threads = [threading.Thread(target=book, args=(n,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(outcomes.values()), self.THREADS)
+        self.assertGreater(outcomes['booked'], 0)
+
+        sold = Counter(seat for booking in Booking.objects.all() for seat in booking.seats)
+        self.assertTrue(all(count == 1 for count in sold.values()), sold)
+
+        showtime.refresh_from_db()
+        self.assertEqual(sorted(showtime.get_booked_seats()), sorted(sold))
+        self.assertEqual(Booking.objects.count(), outcomes['booked'])
+
+
+class BenchmarkCommandTests(TransactionTestCase):
+    def test_benchmark_api_reports_every_scenario(self):
+        create_showtime()
+        output = os.path.join(tempfile.mkdtemp(), 'results.json')
+        call_command('benchmark_api', requests=12, concurrency=3, seed=1, output=output, stdout=StringIO())
+
+        with open(output) as f:
+            results = json.load(f)
+        self.assertEqual(
+            set(results['scenarios']), {'catalogue', 'showtimes', 'seat-map', 'booking-rush', 'best-available'}
+        )
+        for name, stats in results['scenarios'].items():
+            self.assertEqual(stats['requests'], 12)
+            self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+            # The in-memory test database can report reads as locked while
+            # the rush is writing, so only the read-only scenarios must be clean
+            if name not in ('booking-rush', 'best-available'):
+                self.assertEqual(stats['error_rate'], 0, stats)
+        self.assertFalse(results['scenarios']['booking-rush']['oversold'])
+        self.assertFalse(results['scenarios']['best-available']['oversold'])
+        # The rush showtimes are removed afterwards
+        self.assertEqual(Showtime.objects.count(), 1)
+
+        stdout = StringIO()
+        call_command('benchmark_api', requests=4, scenario=['seat-map'], compare=output, stdout=stdout)
+        self.assertIn('seat-map: p50_ms', stdout.getvalue())
+
+    def test_benchmark_api_async_mode(self):
+        create_showtime()
+        output = os.path.join(tempfile.mkdtemp(), 'results.json')
+        call_command(
+            'benchmark_api', requests=8, concurrency=2, scenario=['showtimes', 'seat-map'], use_async=True,
+            output=output, stdout=StringIO(),
+        )
+
+        with open(output) as f:
+            results = json.load(f)
+        self.assertEqual(results['mode'], 'async')
+        for stats in results['scenarios'].values():
+            self.assertEqual(stats['error_rate'], 0, stats)
+            # Counted from the Server-Timing header
+            self.assertGreater(stats['queries_max'], 0)
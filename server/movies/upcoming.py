@@ -0,0 +1,82 @@
+"""
+Upcoming showtimes grouped by movie and date.
+
+The upcoming shows and movie detail pages need every showtime of the next
+couple of weeks, grouped by movie and then by date. Rather than one paginated
+showtime list request per movie and date, ``upcoming_showtimes`` reads the
+whole window in one query (joined to the movie, as tuples, ordered the way it
+is grouped) and groups the rows in one pass.
+
+The grouped listing is cached per window (first day and number of days) under
+the catalogue and schedule versions (see ``cache.py``), so bookings and edits
+to movies or showtimes invalidate it at once.
+"""
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import get_catalogue_version, get_schedule_version
+from .models import Movie, Showtime
+from .posters import variant_urls
+
+MOVIE_COLUMNS = ['movie_id', 'movie__title', 'movie__genre', 'movie__duration', 'movie__short_description',
+                 'movie__poster', 'movie__poster_hash']
+SHOWTIME_COLUMNS = ['id', 'date', 'time', 'screen', 'capacity', 'booked_count', 'is_sold_out']
+
+
+def upcoming_showtimes(start, days):
+    """
+    The showtimes from start for days days, excluding cancelled ones, as a
+    list of movies (by title), each with its dates and each date with its
+    showtimes in time order.
+    """
+    rows = Showtime.objects.filter(
+        date__gte=start, date__lt=start + timedelta(days=days), is_cancelled=False,
+    ).order_by('movie__title', 'movie_id', 'date', 'time', 'screen', 'id').values_list(
+        *MOVIE_COLUMNS, *SHOWTIME_COLUMNS
+    )
+    width = len(MOVIE_COLUMNS)
+    storage = Movie._meta.get_field('poster').storage
+
+    movies = []
+    for (movie_id, title, genre, duration, short_description, poster, poster_hash), showtimes in groupby(
+        rows.iterator(), key=lambda row: row[:width]
+    ):
+        movies.append({
+            'id': movie_id,
+            'title': title,
+            'genre': genre,
+            'duration': duration,
+            'short_description': short_description,
+            'poster_url': storage.url(poster) if poster else None,
+            'poster_variants': variant_urls(poster_hash) if poster else {},
+            'dates': [
+                {'date': day.isoformat(), 'showtimes': [showtime_entry(row[width:]) for row in day_rows]}
+                for day, day_rows in groupby(showtimes, key=lambda row: row[width + 1])
+            ],
+        })
+    return movies
+
+
+def showtime_entry(row):
+    pk, _, start, screen, capacity, booked_count, is_sold_out = row
+    return {
+        'id': pk,
+        'time': start.isoformat(),
+        'screen': screen,
+        'capacity': capacity,
+        'seats_left': max(capacity - booked_count, 0),
+        'is_sold_out': is_sold_out,
+    }
+
+
+def cached_upcoming_showtimes(start, days):
+    """upcoming_showtimes, cached until the next booking or catalogue or schedule edit"""
+    key = f'movies:upcoming:{get_catalogue_version()}:{get_schedule_version()}:{start.isoformat()}:{days}'
+    movies = cache.get(key)
+    if movies is None:
+        movies = upcoming_showtimes(start, days)
+        cache.set(key, movies, settings.CATALOGUE_CACHE_TIMEOUT)
+    return movies
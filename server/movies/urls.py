@@ -1,15 +1,37 @@
 from django.urls import path
 from .views import (
     MovieListAPIView, MovieDetailAPIView,
-    ShowtimeListAPIView, ShowtimeDetailAPIView,
-    BookingListAPIView, BookingCreateAPIView
+    ShowtimeListAPIView, ShowtimeDetailAPIView, UpcomingShowtimesAPIView,
+    BookingListAPIView, BookingExportAPIView, BookingCreateAPIView, BatchBookingCreateAPIView, BookingCancelAPIView,
+    ShowtimeCancelAPIView,
+    SeatHoldCreateAPIView, SeatHoldDetailAPIView,
+    ShowtimeSalesReportAPIView, MovieDailySalesReportAPIView, ScreenDailySalesReportAPIView,
+    showtime_events, metrics, poster_variant,
+    async_showtime_list, async_showtime_detail, async_booking_create
 )
 
 urlpatterns = [
     path('', MovieListAPIView.as_view(), name='movie-list'),
     path('<int:pk>/', MovieDetailAPIView.as_view(), name='movie-detail'),
     path('showtimes/', ShowtimeListAPIView.as_view(), name='showtime-list'),
+    path('showtimes/upcoming/', UpcomingShowtimesAPIView.as_view(), name='showtime-upcoming'),
     path('showtimes/<int:pk>/', ShowtimeDetailAPIView.as_view(), name='showtime-detail'),
+    path('showtimes/<int:pk>/events/', showtime_events, name='showtime-events'),
+    path('showtimes/<int:pk>/holds/', SeatHoldCreateAPIView.as_view(), name='seat-hold-create'),
+    path('showtimes/<int:pk>/cancel/', ShowtimeCancelAPIView.as_view(), name='showtime-cancel'),
+    path('holds/<uuid:token>/', SeatHoldDetailAPIView.as_view(), name='seat-hold-detail'),
     path('bookings/', BookingListAPIView.as_view(), name='booking-list'),
+    path('bookings/export.<str:file_format>', BookingExportAPIView.as_view(), name='booking-export'),
     path('bookings/create/', BookingCreateAPIView.as_view(), name='booking-create'),
+    path('bookings/batch/', BatchBookingCreateAPIView.as_view(), name='booking-batch'),
+    path('bookings/<int:pk>/cancel/', BookingCancelAPIView.as_view(), name='booking-cancel'),
+    path('reports/sales/showtimes/', ShowtimeSalesReportAPIView.as_view(), name='sales-report-showtimes'),
+    path('reports/sales/movies/', MovieDailySalesReportAPIView.as_view(), name='sales-report-movies'),
+    path('reports/sales/screens/', ScreenDailySalesReportAPIView.as_view(), name='sales-report-screens'),
+    path('metrics/', metrics, name='metrics'),
+    path('posters/<str:digest>/<int:width>.webp', poster_variant, name='poster-variant'),
+    # Native async versions for ASGI deployments
+    path('async/showtimes/', async_showtime_list, name='async-showtime-list'),
+    path('async/showtimes/<int:pk>/', async_showtime_detail, name='async-showtime-detail'),
+    path('async/bookings/create/', async_booking_create, name='async-booking-create'),
 ] 
\ No newline at end of file
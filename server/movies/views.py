@@ -1,16 +1,82 @@
-from rest_framework import generics, status
+import asyncio
+import hashlib
+import hmac
+import json
+from datetime import date, datetime, timedelta
+
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import APIException, ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters as rest_filters
 from rest_framework.response import Response
-from .models import Movie, Showtime, Booking
+from .booking import (
+    BookingStatusError, HoldExpiredError, cancel_booking, cancel_showtime, release_hold, run_locked
+)
+from .cache import CatalogueCacheMixin, catalogue_cached
+from .export import FORMATS as EXPORT_FORMATS, aiterate, export_bookings
+from .metrics import SerializerTimingMixin, get_recorder, serializer_data
+from .posters import IMMUTABLE_CACHE_CONTROL, generate_variants, variant_name
+from .pagination import ListPagination
+from .realtime import get_broker
+from .search import MovieSearchFilter
+from .upcoming import cached_upcoming_showtimes
+from .models import Movie, Showtime, Booking, SeatHold, MovieDailySales, ScreenDailySales
 from .serializers import (
     MovieSerializer, MovieDetailSerializer, 
     ShowtimeSerializer, ShowtimeDetailSerializer,
     ShowtimeWithMovieSerializer,
-    BookingSerializer, BookingCreateSerializer
+    BookingSerializer, BookingCreateSerializer, BatchBookingCreateSerializer,
+    BookingCancelSerializer, ShowtimeCancelSerializer,
+    SeatHoldSerializer,
+    ShowtimeSalesSerializer, MovieDailySalesSerializer, ScreenDailySalesSerializer,
+    UpcomingShowtimesQuerySerializer
 )
 from django_filters import rest_framework as filters
-from django.db.models import Q
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_GET, require_POST
+
+
+def movie_last_modified(request, pk):
+    return catalogue_cached(
+        f'last-modified:{pk}',
+        lambda: Movie.objects.filter(pk=pk).values_list('updated_at', flat=True).first(),
+    )
+
+
+SHOWTIME_ETAG_FIELDS = (
+    'version', 'holds_expire_at', 'date', 'time', 'screen', 'is_cancelled', 'movie__updated_at',
+    'seat_layout_id', 'seat_layout__name', 'seat_layout__rows', 'seat_layout__seats_per_row',
+)
+
+
+def showtime_etag(request, pk):
+    """
+    Strong ETag for a showtime detail response, from one indexed lookup.
+
+    The version bumps on every booking, hold and release; the showtime's own
+    columns cover edits made with a plain save(), and the movie and layout
+    parts cover edits to the data embedded in the response.
+    """
+    return etag_from_row(pk, Showtime.objects.filter(pk=pk).values_list(*SHOWTIME_ETAG_FIELDS).first())
+
+
+def etag_from_row(pk, row):
+    if row is None:
+        return None
+    version, holds_expire_at, *content = row
+    # Lapsed holds are released by the view, which changes the response
+    if holds_expire_at is not None and holds_expire_at <= timezone.now():
+        return None
+    return hashlib.md5(repr((pk, version, *content)).encode('utf-8')).hexdigest()
 
 
 class MovieFilter(filters.FilterSet):
@@ -19,11 +85,12 @@ class MovieFilter(filters.FilterSet):
     def filter_by_year(self, queryset, name, value):
         try:
             year = int(value)
-            # Filter movies by the specified year
+            # Filter movies by the specified year as a plain date range so
+            # the release_date indexes can be used
             return queryset.filter(
-                Q(release_date__year=year)
+                release_date__gte=date(year, 1, 1), release_date__lt=date(year + 1, 1, 1)
             )
-        except (ValueError, TypeError):
+        except (ValueError, TypeError, OverflowError):
             # If the value is not a valid year, return the original queryset
             return queryset
     
@@ -31,21 +98,86 @@ class MovieFilter(filters.FilterSet):
         model = Movie
         fields = ['genre', 'release_date']
 
-class MovieListAPIView(generics.ListAPIView):
-    queryset = Movie.objects.all()
+# Upper bound of the seats asked for by ?available_min, well past any screen
+MAX_AVAILABLE_MIN = 100_000
+
+class ShowtimeFilter(filters.FilterSet):
+    # Served from the occupancy counters, so listings stay one indexed query
+    available_min = filters.NumberFilter(method='filter_available_min', min_value=0, max_value=MAX_AVAILABLE_MIN)
+    sold_out = filters.BooleanFilter(field_name='is_sold_out')
+
+    def filter_available_min(self, queryset, name, value):
+        return queryset.filter(capacity__gte=F('booked_count') + int(value), is_cancelled=False)
+
+    class Meta:
+        model = Showtime
+        fields = ['movie', 'date', 'available_min', 'sold_out']
+
+class BookingExportFilter(filters.FilterSet):
+    # Booking dates in the server's time zone, as a range on booking_time
+    date_from = filters.DateFilter(method='filter_booked_from')
+    date_to = filters.DateFilter(method='filter_booked_to')
+    movie = filters.NumberFilter(field_name='showtime__movie')
+    showtime_date = filters.DateFilter(field_name='showtime__date')
+
+    def filter_booked_from(self, queryset, name, value):
+        return queryset.filter(booking_time__gte=start_of_day(value))
+
+    def filter_booked_to(self, queryset, name, value):
+        return queryset.filter(booking_time__lt=start_of_day(value + timedelta(days=1)))
+
+    class Meta:
+        model = Booking
+        fields = ['date_from', 'date_to', 'movie', 'showtime', 'showtime_date', 'status']
+
+class SalesReportFilter(filters.FilterSet):
+    # Showtime dates, inclusive
+    date_from = filters.DateFilter(field_name='date', lookup_expr='gte')
+    date_to = filters.DateFilter(field_name='date', lookup_expr='lte')
+
+class ShowtimeSalesFilter(SalesReportFilter):
+    class Meta:
+        model = Showtime
+        fields = ['date_from', 'date_to', 'movie', 'screen']
+
+class MovieDailySalesFilter(SalesReportFilter):
+    class Meta:
+        model = MovieDailySales
+        fields = ['date_from', 'date_to', 'movie']
+
+class ScreenDailySalesFilter(SalesReportFilter):
+    class Meta:
+        model = ScreenDailySales
+        fields = ['date_from', 'date_to', 'screen']
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+class MovieListAPIView(CatalogueCacheMixin, SerializerTimingMixin, generics.ListAPIView):
+    # Only the columns MovieSerializer renders; skips cast/writers text blobs
+    queryset = Movie.objects.only(
+        'id', 'title', 'description', 'short_description', 'genre',
+        'duration', 'release_date', 'poster', 'poster_hash', 'created_at'
+    )
     serializer_class = MovieSerializer
-    filter_backends = [DjangoFilterBackend, rest_filters.SearchFilter, rest_filters.OrderingFilter]
+    # Search results come back ranked by relevance unless ?ordering= is given
+    filter_backends = [DjangoFilterBackend, MovieSearchFilter, rest_filters.OrderingFilter]
     filterset_class = MovieFilter
-    search_fields = ['title', 'description']
     ordering_fields = ['release_date', 'title']
+    pagination_class = ListPagination
+    keyset_ordering = ('release_date', 'id')
+    cache_query_params = ('genre', 'release_date', 'search', 'ordering', 'page', 'pagination', 'cursor', 'count')
     
-class MovieDetailAPIView(generics.RetrieveAPIView):
-    queryset = Movie.objects.all()
+@method_decorator(condition(last_modified_func=movie_last_modified), name='get')
+class MovieDetailAPIView(CatalogueCacheMixin, SerializerTimingMixin, generics.RetrieveAPIView):
+    queryset = Movie.objects.defer('search_vector')
     serializer_class = MovieDetailSerializer
 
-class ShowtimeListAPIView(generics.ListAPIView):
+class ShowtimeListAPIView(SerializerTimingMixin, generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['movie', 'date']
+    filterset_class = ShowtimeFilter
+    pagination_class = ListPagination
+    keyset_ordering = ('date', 'time', 'id')
     
     def get_serializer_class(self):
         # Use ShowtimeWithMovieSerializer if movieDetails=true in query params
@@ -54,23 +186,83 @@ class ShowtimeListAPIView(generics.ListAPIView):
         return ShowtimeSerializer
     
     def get_queryset(self):
-        return Showtime.objects.all()
+        # The seat map is only needed by the detail view
+        queryset = Showtime.objects.defer('seat_map').order_by('date', 'time', 'id')
+        if self.get_serializer_class() is ShowtimeWithMovieSerializer:
+            queryset = queryset.select_related('movie').defer('movie__cast', 'movie__writers')
+        return queryset
 
-class ShowtimeDetailAPIView(generics.RetrieveAPIView):
-    queryset = Showtime.objects.all()
+@method_decorator(condition(etag_func=showtime_etag), name='get')
+class ShowtimeDetailAPIView(SerializerTimingMixin, generics.RetrieveAPIView):
+    queryset = Showtime.objects.select_related('movie', 'seat_layout')
     serializer_class = ShowtimeDetailSerializer
     lookup_field = 'pk'
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Seat availability changes constantly: always revalidate with the ETag
+        patch_cache_control(response, no_cache=True)
+        return response
+    
+    def get_object(self):
+        showtime = super().get_object()
+        # Lazily release lapsed seat holds so they show up as available again
+        if showtime.has_expired_holds():
+            run_locked(showtime.pk, lambda locked: None)
+            showtime = super().get_object()
+        return showtime
 
-class BookingListAPIView(generics.ListAPIView):
+class UpcomingShowtimesAPIView(generics.GenericAPIView):
+    """
+    Every showtime of the next days grouped by movie and date, from one query
+    and cached per window; ?movie= narrows it to one movie's showtimes.
+    """
+    serializer_class = UpcomingShowtimesQuerySerializer
+
+    def get(self, request):
+        params = self.get_serializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        start = params.validated_data.get('start') or timezone.localdate()
+        days = params.validated_data.get('days') or settings.UPCOMING_DAYS
+        movies = cached_upcoming_showtimes(start, days)
+        if 'movie' in params.validated_data:
+            movies = [movie for movie in movies if movie['id'] == params.validated_data['movie']]
+        return Response({'start': start, 'days': days, 'movies': movies})
+
+class BookingListAPIView(SerializerTimingMixin, generics.ListAPIView):
     serializer_class = BookingSerializer
+    pagination_class = ListPagination
+    keyset_ordering = ('-booking_time', '-id')
     
     def get_queryset(self):
         user_email = self.request.query_params.get('user_email', None)
         if user_email:
-            return Booking.objects.filter(user_email=user_email)
+            return (
+                Booking.objects.filter(user_email=user_email)
+                .select_related('showtime').defer('showtime__seat_map')
+                .order_by('-booking_time', '-id')
+            )
         return Booking.objects.none()
 
-class BookingCreateAPIView(generics.CreateAPIView):
+class BookingExportAPIView(generics.GenericAPIView):
+    """Staff only: every booking matching the filters, streamed as CSV or NDJSON"""
+    queryset = Booking.objects.all()
+    permission_classes = [permissions.IsAdminUser]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = BookingExportFilter
+
+    def get(self, request, file_format):
+        if file_format not in EXPORT_FORMATS:
+            raise Http404("Unknown export format")
+        chunks = export_bookings(self.filter_queryset(self.get_queryset()), file_format)
+        if isinstance(request._request, ASGIRequest):
+            chunks = aiterate(chunks)
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[file_format])
+        response['Content-Disposition'] = f'attachment; filename="bookings-{timezone.localdate():%Y%m%d}.{file_format}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class BookingCreateAPIView(SerializerTimingMixin, generics.CreateAPIView):
     serializer_class = BookingCreateSerializer
     
     def create(self, request, *args, **kwargs):
@@ -78,7 +270,249 @@ class BookingCreateAPIView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         
-        # Return the created booking with full details
-        booking = Booking.objects.get(id=serializer.instance.id)
-        response_serializer = BookingSerializer(booking)
-        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        # Return the created booking with full details; the instance already
+        # carries the showtime it was booked on, so nothing is read back
+        response_serializer = BookingSerializer(serializer.instance)
+        return Response(serializer_data(response_serializer), status=status.HTTP_201_CREATED)
+
+class BatchBookingCreateAPIView(SerializerTimingMixin, generics.CreateAPIView):
+    """Book seats on several showtimes in one request; see booking.book_batch"""
+    serializer_class = BatchBookingCreateSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        bookings = serializer.save()
+        return Response({'bookings': serializer_data(BookingSerializer(bookings, many=True))}, status=status.HTTP_201_CREATED)
+
+class BookingCancelAPIView(SerializerTimingMixin, generics.GenericAPIView):
+    """Cancel (and optionally refund) a booking, releasing its seats"""
+    serializer_class = BookingCancelSerializer
+    queryset = Booking.objects.all()
+
+    def post(self, request, pk):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not Booking.objects.filter(pk=pk, user_email=serializer.validated_data['user_email']).exists():
+            raise Http404("No Booking matches the given query.")
+        try:
+            booking = cancel_booking(pk, refund=serializer.validated_data['refund'])
+        except BookingStatusError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializer_data(BookingSerializer(booking)))
+
+class ShowtimeCancelAPIView(generics.GenericAPIView):
+    """Staff only: cancel a showtime and all of its bookings"""
+    serializer_class = ShowtimeCancelSerializer
+    queryset = Showtime.objects.all()
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, pk):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            cancelled = cancel_showtime(pk, refund=serializer.validated_data['refund'])
+        except Showtime.DoesNotExist:
+            raise Http404("No Showtime matches the given query.")
+        return Response({'cancelled_bookings': cancelled})
+
+class SalesReportAPIView(SerializerTimingMixin, generics.ListAPIView):
+    """
+    Staff only: sales and fill rates read from the rollups in sales.py, so a
+    report costs the same however many bookings there are.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    filter_backends = [DjangoFilterBackend]
+    pagination_class = ListPagination
+    keyset_ordering = ('date', 'id')
+
+class ShowtimeSalesReportAPIView(SalesReportAPIView):
+    queryset = Showtime.objects.select_related('movie').only(
+        'date', 'time', 'screen', 'movie', 'movie__title', 'is_cancelled', 'capacity', 'tickets_sold', 'revenue'
+    ).order_by('date', 'time', 'id')
+    serializer_class = ShowtimeSalesSerializer
+    filterset_class = ShowtimeSalesFilter
+    keyset_ordering = ('date', 'time', 'id')
+
+class MovieDailySalesReportAPIView(SalesReportAPIView):
+    queryset = MovieDailySales.objects.select_related('movie').only(
+        'date', 'movie', 'movie__title', 'showtimes', 'capacity', 'tickets_sold', 'revenue'
+    ).order_by('date', 'id')
+    serializer_class = MovieDailySalesSerializer
+    filterset_class = MovieDailySalesFilter
+
+class ScreenDailySalesReportAPIView(SalesReportAPIView):
+    queryset = ScreenDailySales.objects.order_by('date', 'id')
+    serializer_class = ScreenDailySalesSerializer
+    filterset_class = ScreenDailySalesFilter
+
+class SeatHoldCreateAPIView(SerializerTimingMixin, generics.CreateAPIView):
+    serializer_class = SeatHoldSerializer
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['showtime_id'] = self.kwargs['pk']
+        return context
+
+class SeatHoldDetailAPIView(SerializerTimingMixin, generics.RetrieveDestroyAPIView):
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    lookup_field = 'token'
+    
+    def destroy(self, request, *args, **kwargs):
+        try:
+            release_hold(self.kwargs['token'])
+        except HoldExpiredError:
+            pass  # Already expired and swept, nothing left to release
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def sse_message(event, data, retry=None):
+    """Format one server-sent event"""
+    message = f"event: {event}\ndata: {json.dumps(data)}\n"
+    if retry is not None:
+        message = f"retry: {retry}\n" + message
+    return message + "\n"
+
+async def seat_snapshot(pk):
+    showtime = await Showtime.objects.select_related('seat_layout').filter(pk=pk).afirst()
+    return {'showtime': pk, 'version': showtime.version, 'seat_map': showtime.get_seat_map()}
+
+async def seat_event_stream(pk):
+    # Subscribe before taking the snapshot so no change can slip in between;
+    # clients ignore deltas whose version is not newer than the snapshot
+    async with get_broker().subscribe(pk) as queue:
+        yield sse_message('snapshot', await seat_snapshot(pk))
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.SEAT_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+            else:
+                yield sse_message('seats', event)
+
+async def showtime_events(request, pk):
+    """Server-sent events stream of seat availability deltas for a showtime"""
+    if not await Showtime.objects.filter(pk=pk).aexists():
+        raise Http404("Showtime not found")
+
+    if not isinstance(request, ASGIRequest):
+        # A long-lived stream would tie up a WSGI worker: send the current
+        # snapshot and let EventSource reconnect after the retry interval
+        snapshot = sse_message('snapshot', await seat_snapshot(pk), retry=settings.SEAT_EVENTS_HEARTBEAT * 1000)
+        return StreamingHttpResponse([snapshot], content_type='text/event-stream')
+
+    response = StreamingHttpResponse(seat_event_stream(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+
+def metrics(request):
+    """Request metrics in Prometheus text format, for staff or a scraper holding PERF_METRICS_TOKEN"""
+    token = settings.PERF_METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (
+        (request.user.is_active and request.user.is_staff)
+        or (token and hmac.compare_digest(authorization, f'Bearer {token}'))
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(get_recorder().render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_GET
+def poster_variant(request, digest, width):
+    """A resized WebP poster, generated on first request and cached forever after"""
+    if width not in settings.POSTER_WIDTHS:
+        raise Http404
+    name = variant_name(digest, width)
+    if not default_storage.exists(name):
+        movie = Movie.objects.only('poster', 'poster_hash').filter(poster_hash=digest).first()
+        if movie is None:
+            raise Http404
+        try:
+            generate_variants(movie, [width])
+        except OSError:
+            raise Http404
+    response = FileResponse(default_storage.open(name), content_type='image/webp')
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+# Async endpoints
+#
+# Native async versions of the hot read endpoints and of booking creation for
+# ASGI deployments (see asgi.py). The showtime detail read uses the async ORM,
+# so a request waiting on the database does not hold a worker thread. The
+# showtime list runs the sync view's filters and pagination, and the booking
+# engine needs a transaction, which the async ORM does not support, so each of
+# those runs in one thread hop. Responses match the sync endpoints.
+
+def showtime_list_body(request):
+    """
+    The ShowtimeListAPIView response to request as (body, status): the same
+    queryset, filters and pagination, run in the calling thread.
+    """
+    view = ShowtimeListAPIView()
+    view.setup(request)
+    view.request = view.initialize_request(request)
+    view.format_kwarg = None
+    try:
+        page = view.paginate_queryset(view.filter_queryset(view.get_queryset()))
+        return view.get_paginated_response(view.get_serializer(page, many=True).data).data, 200
+    except APIException as e:
+        # As DRF's exception handler renders it
+        return e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}, e.status_code
+
+@require_GET
+async def async_showtime_list(request):
+    body, status_code = await sync_to_async(showtime_list_body)(request)
+    return JsonResponse(body, status=status_code, safe=False)
+
+@require_GET
+async def async_showtime_detail(request, pk):
+    row = await Showtime.objects.filter(pk=pk).values_list(*SHOWTIME_ETAG_FIELDS).afirst()
+    if row is None:
+        return JsonResponse({'detail': 'No Showtime matches the given query.'}, status=404)
+    etag = etag_from_row(pk, row)
+    if etag is not None:
+        etag = f'"{etag}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            patch_cache_control(response, no_cache=True)
+            return response
+
+    showtimes = Showtime.objects.select_related('movie', 'seat_layout')
+    showtime = await showtimes.aget(pk=pk)
+    if showtime.has_expired_holds():
+        await sync_to_async(run_locked)(pk, lambda locked: None)
+        showtime = await showtimes.aget(pk=pk)
+
+    response = JsonResponse(serializer_data(ShowtimeDetailSerializer(showtime)))
+    if etag is not None:
+        response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+def create_booking(data):
+    """Validate and book in the calling thread; returns (body, status)"""
+    serializer = BookingCreateSerializer(data=data)
+    try:
+        serializer.is_valid(raise_exception=True)
+        # Seat conflicts are only found by the booking engine, during save
+        booking = serializer.save()
+    except ValidationError as e:
+        return e.detail, status.HTTP_400_BAD_REQUEST
+    return serializer_data(BookingSerializer(booking)), status.HTTP_201_CREATED
+
+@csrf_exempt
+@require_POST
+async def async_booking_create(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'detail': 'JSON parse error'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'non_field_errors': ['Invalid data. Expected a dictionary.']}, status=400)
+    body, status_code = await sync_to_async(create_booking)(data)
+    return JsonResponse(body, status=status_code)
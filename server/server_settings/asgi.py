@@ -2,6 +2,17 @@
 ASGI config for server_settings project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serving through it (e.g. ``uvicorn server_settings.asgi:application``) is
+required for the live seat event streams at
+``/api/movies/showtimes/<pk>/events/``; under WSGI they fall back to a
+single snapshot per request. The ``/api/movies/async/...`` endpoints run
+natively async here, so throughput scales with concurrent requests rather
+than with the number of worker threads.
+
+Under ASGI each request runs its database work on its own thread, so
+connections cannot be reused across requests and persistent connections
+are turned off (``DB_CONN_MAX_AGE=0``) unless set explicitly. Put a pooler
+such as PgBouncer in front of PostgreSQL instead (``POSTGRES_POOLER=pgbouncer``).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -12,5 +23,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server_settings.settings')
+# Connections opened on per-request threads would never be reused or closed
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
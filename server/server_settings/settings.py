@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+from datetime import time
 from pathlib import Path
 
 from corsheaders.defaults import default_headers
@@ -52,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'movies.metrics.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -103,6 +105,12 @@ if all([
             'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
             'HOST': os.environ.get('POSTGRES_HOST'),
             'PORT': os.environ.get('POSTGRES_PORT'),
+            # Keep connections open between requests instead of reconnecting
+            # every time; health checks drop ones the server has closed
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            # Server-side cursors do not survive PgBouncer transaction pooling
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('POSTGRES_POOLER') == 'pgbouncer',
         }
     }
 else:
@@ -111,10 +119,32 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
         }
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at e.g.
+# django.core.cache.backends.filebased.FileBasedCache or
+# django.core.cache.backends.redis.RedisCache to share it between workers
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'stratforge-movies'),
+    }
+}
+
+# Seconds a cached movie catalogue response is kept (edits invalidate it immediately)
+CATALOGUE_CACHE_TIMEOUT = int(os.environ.get('CATALOGUE_CACHE_TIMEOUT', 300))
+
+# Days the upcoming showtimes listing covers by default, and at most
+UPCOMING_DAYS = 14
+UPCOMING_MAX_DAYS = 31
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -161,6 +191,9 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
     'dnt',  # Do Not Track - privacy preference
 ]
 
+# Let the client read the validators used for conditional GETs
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified', 'Server-Timing']
+
 # Allow credentials if we're sending cookies/auth headers
 CORS_ALLOW_CREDENTIALS = True
 
@@ -174,6 +207,11 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
+# Widths of the resized WebP poster variants (see movies/posters.py); the
+# catalogue cards are about 400px wide on a 1x screen
+POSTER_WIDTHS = [200, 400, 800]
+POSTER_WEBP_QUALITY = int(os.environ.get('POSTER_WEBP_QUALITY', 80))
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
@@ -185,6 +223,38 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 12
 }
 
+# How long seats picked on the seat selection page stay held during checkout
+SEAT_HOLD_MINUTES = int(os.environ.get('SEAT_HOLD_MINUTES', 10))
+
+# Screen scheduling (see movies/scheduling.py): minutes to turn a screen around
+# after a show, the run time assumed for movies without a duration, the grid
+# show start times are rounded up to, and the day's opening and closing times
+# (shows end by closing; a closing time before opening is after midnight)
+SCHEDULE_CLEANING_MINUTES = int(os.environ.get('SCHEDULE_CLEANING_MINUTES', 20))
+SCHEDULE_DEFAULT_DURATION = 150
+SCHEDULE_SLOT_MINUTES = 15
+SCHEDULE_OPENING = time(10, 0)
+SCHEDULE_CLOSING = time(0, 30)
+
+# Live seat availability events (served over ASGI, see asgi.py). The default
+# broker fans out in-process; point this at another broker class to share
+# events between server processes.
+SEAT_EVENTS_BROKER = os.environ.get('SEAT_EVENTS_BROKER', 'movies.realtime.InProcessBroker')
+# Seconds between keep-alive comments on an idle event stream
+SEAT_EVENTS_HEARTBEAT = int(os.environ.get('SEAT_EVENTS_HEARTBEAT', 15))
+
+# Rows fetched (and encoded) per chunk by the streaming booking export
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+# Request performance metrics (see movies/metrics.py). The fraction of
+# requests timed; keep it low in production, 0 turns sampling off.
+PERF_METRICS_SAMPLE_RATE = float(os.environ.get('PERF_METRICS_SAMPLE_RATE', 1.0 if DEBUG else 0.01))
+# Recent samples kept per process for the latency quantiles
+PERF_METRICS_BUFFER_SIZE = int(os.environ.get('PERF_METRICS_BUFFER_SIZE', 1000))
+# Bearer token that lets a Prometheus scraper read /api/movies/metrics/
+# without a staff session; unset means staff only
+PERF_METRICS_TOKEN = os.environ.get('PERF_METRICS_TOKEN', '')
+
 # if not DEBUG:
 #     # Production specific settings
 #     # STATIC_ROOT is important for collectstatic in production